@@ -0,0 +1,265 @@
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic_registry import FixtureRegistry, SyntheticRegistry
+
+# Bytes written between two bandwidth-cap sleeps
+WRITE_CHUNK_SIZE = 16 * 1024
+
+
+class RegistryFaults:
+    """
+    Network conditions a LocalRegistryServer imposes on every request.
+
+    Args:
+    latency (float): Seconds to wait before answering each request
+    jitter (float): Extra random delay of up to this many seconds
+    bandwidth (int): Bytes per second each response body is sent at (default: unlimited)
+    error_rate (float): Fraction of requests answered with a 500
+    throttle_rate (float): Fraction of requests answered with a 429
+    retry_after (int): Retry-After seconds sent with 429 responses
+    seed (int): Seed deciding which requests fail, so runs are repeatable
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Decide the fate of one request.
+
+        Returns:
+        tuple: (delay in seconds, forced status code or None)
+        """
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return delay, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return delay, 500
+        return delay, None
+
+
+class _RegistryRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so client connection pooling is observable
+
+    def setup(self):
+        super().setup()
+        self.server.stats.connection_opened()
+
+    def finish(self):
+        super().finish()
+        self.server.stats.connection_closed()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        delay, forced_status = server.faults.draw()
+        server.stats.request_started()
+        try:
+            if delay:
+                time.sleep(delay)
+            if forced_status == 429:
+                self._send(None, 429, b'{"error":"Too many requests"}', 'application/json',
+                           {'Retry-After': str(server.faults.retry_after)})
+                return
+            if forced_status:
+                self._send(None, forced_status, b'{"error":"Internal server error"}', 'application/json')
+                return
+
+            kind, status, body, content_type = server.registry.route(urlsplit(self.path).path,
+                                                                     self.headers.get('Accept'))
+            headers = {}
+            if kind == 'packument':
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                headers['ETag'] = etag
+                headers['Vary'] = 'Accept'
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(kind, 304, b'', None, headers)
+                    return
+            self._send(kind, status, body, content_type, headers)
+        finally:
+            server.stats.request_finished()
+
+    def _send(self, kind, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        # Recorded before the headers are flushed, so a client that has its response sees it counted
+        self.server.stats.record(kind, status, len(body))
+        self.end_headers()
+
+        bandwidth = self.server.faults.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for offset in range(0, len(body), WRITE_CHUNK_SIZE):
+            chunk = body[offset:offset + WRITE_CHUNK_SIZE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+
+class ServerStats:
+    """Thread-safe request, status, byte and connection counters of a LocalRegistryServer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {'packument': 0, 'version': 0, 'tarball': 0, 'other': 0}
+            self.statuses = {}
+            self.bytes_sent = 0
+            self.connections = 0
+            self._open_connections = 0
+            self._in_flight = 0
+            self.max_concurrent_requests = 0
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+            self._open_connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self._open_connections -= 1
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+            self.max_concurrent_requests = max(self.max_concurrent_requests, self._in_flight)
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def record(self, kind, status, num_bytes):
+        with self._lock:
+            self.requests[kind or 'other'] += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_sent += num_bytes
+
+    def snapshot(self):
+        """
+        Returns:
+        dict: 'requests' by kind (with 'total'), 'statuses', 'bytes_sent', 'connections'
+        and 'max_concurrent_requests'
+        """
+        with self._lock:
+            requests = dict(self.requests)
+            requests['total'] = sum(requests.values())
+            return {
+                'requests': requests,
+                'statuses': dict(self.statuses),
+                'bytes_sent': self.bytes_sent,
+                'connections': self.connections,
+                'max_concurrent_requests': self.max_concurrent_requests,
+            }
+
+
+class LocalRegistryServer:
+    """
+    An npm-compatible registry on localhost, served from a FixtureRegistry.
+
+    Packuments (with ETags, so conditional requests get 304s), single-version
+    documents and tarballs are served over real HTTP/1.1 with keep-alive, through the
+    network conditions set by `faults`. Point NPM_REGISTRY_URL at `url` to install
+    from it.
+
+    Args:
+    registry (FixtureRegistry): Packages to serve; its tarball URLs are rebased onto the server
+    faults (RegistryFaults): Latency, bandwidth and failure settings (default: none)
+    host (str): Interface to bind
+    port (int): Port to bind; 0 picks a free one
+    """
+
+    def __init__(self, registry, faults=None, host='127.0.0.1', port=0):
+        self.registry = registry
+        self.faults = faults or RegistryFaults()
+        self.stats = ServerStats()
+        self._httpd = ThreadingHTTPServer((host, port), _RegistryRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.registry = registry
+        self._httpd.faults = self.faults
+        self._httpd.stats = self.stats
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        registry.rebase(self.url)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='local-registry', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a fixture or synthetic npm registry on localhost')
+    parser.add_argument('--fixtures', help='Directory of <name>.json packuments to serve')
+    parser.add_argument('--nodes', type=int, default=100, help='Packages in the generated registry')
+    parser.add_argument('--fanout', type=int, default=3, help='Dependencies per generated package')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the generated registry and the faults')
+    parser.add_argument('--payload-size', type=int, default=0, help='Filler bytes per tarball')
+    parser.add_argument('--port', type=int, default=4873, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay of up to this many seconds')
+    parser.add_argument('--bandwidth', type=int, help='Bytes per second per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with a 429')
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        registry = FixtureRegistry.from_directory(args.fixtures, payload_size=args.payload_size)
+    else:
+        registry = SyntheticRegistry(nodes=args.nodes, fanout=args.fanout, payload_size=args.payload_size,
+                                     seed=args.seed)
+    faults = RegistryFaults(latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth,
+                            error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=args.seed)
+    server = LocalRegistryServer(registry, faults, port=args.port)
+    print(f"Serving {len(registry.packuments)} packages at {server.url}")
+    print(f"Install from it with: NPM_REGISTRY_URL={server.url} python main.py install")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(server.stats.snapshot())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from benchmarks.registry_server import LocalRegistryServer, RegistryFaults
+from benchmarks.synthetic_registry import InProcessSession, SyntheticRegistry
+from src.dependency_resolver import DependencyResolver
+from src.installation_animator import InstallationAnimator
+import src.utils.npm_api as npm_api
+
+RESULTS_VERSION = 1
+
+SCENARIOS = {
+    'small': {'nodes': 50, 'fanout': 3},
+    'wide': {'nodes': 1500, 'fanout': 2, 'diamonds': 0.1},
+    'diamond': {'nodes': 800, 'fanout': 5, 'diamonds': 0.8},
+    'churn': {'nodes': 150, 'fanout': 3, 'versions': 3, 'churn': 0.3},
+    'cycles': {'nodes': 400, 'fanout': 3, 'cycles': 25},
+}
+
+# Relative slowdown or memory growth tolerated before a run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def run_install(registry, jobs=1, workdir=None, server=None):
+    """
+    Resolve and install the registry's project with DependencyResolver, end to end.
+
+    Without a server, registry traffic is answered in process, so the run measures the
+    resolver, installer, cache and validator rather than the network. With one, every
+    request goes over HTTP through a fresh connection pool. The project, node_modules
+    and shared cache live in a temporary directory, so every run is cold.
+
+    Args:
+    registry (FixtureRegistry): Registry and project to install
+    jobs (int): Worker count passed to the resolver
+    workdir (str): Directory to create the temporary project in (default: system temp)
+    server (LocalRegistryServer): Running server for registry, to install over HTTP
+
+    Returns:
+    dict: 'nodes' resolved, 'installed', 'wall_seconds', 'nodes_per_second', 'requests'
+    by kind and 'bytes_served' by the registry; over HTTP also 'connections' opened, the
+    response 'statuses' and the adaptive 'concurrency' limits the run ended with
+    """
+    if server is None:
+        session = InProcessSession(registry)
+        network = patch.object(npm_api, 'get_session', lambda: session)
+    else:
+        server.stats.reset()
+        # The resolver reads the registry from the environment; the patch restores npm_api afterwards
+        network = patch.multiple(npm_api, NPM_REGISTRY_URL=npm_api.NPM_REGISTRY_URL, _session=None)
+
+    project_dir = tempfile.mkdtemp(prefix='pydep-bench-', dir=workdir)
+    try:
+        package_json_path = os.path.join(project_dir, 'package.json')
+        with open(package_json_path, 'w') as f:
+            json.dump(registry.package_json(), f)
+
+        environment = {'PYDEP_CACHE_DIR': os.path.join(project_dir, 'cache')}
+        if server is not None:
+            environment['NPM_REGISTRY_URL'] = server.url
+        with patch.dict(os.environ, environment), network, \
+                open(os.devnull, 'w') as devnull:
+            resolver = DependencyResolver(package_json_path, os.path.join(project_dir, 'node_modules'), jobs=jobs)
+            resolver.animator = InstallationAnimator('quiet', stream=devnull)
+            # Warnings (e.g. about the generated cycles) are expected and not part of the measurement
+            with patch('sys.stderr', devnull):
+                start = time.perf_counter()
+                resolved, installation_order = resolver.resolve_and_install_dependencies(visualize=False)
+                wall_seconds = time.perf_counter() - start
+            if server is not None:
+                concurrency = npm_api.get_concurrency_stats()
+                npm_api.get_session().close()
+    finally:
+        shutil.rmtree(project_dir, ignore_errors=True)
+
+    result = {
+        'nodes': len(resolved),
+        'installed': len(installation_order),
+        'wall_seconds': round(wall_seconds, 4),
+        'nodes_per_second': round(len(resolved) / wall_seconds, 1) if wall_seconds else None,
+    }
+    if server is None:
+        result.update(requests=session.request_counts(), bytes_served=session.bytes_served)
+    else:
+        stats = server.stats.snapshot()
+        result.update(requests=stats['requests'], bytes_served=stats['bytes_sent'], connections=stats['connections'],
+                      statuses={str(status): count for status, count in sorted(stats['statuses'].items())},
+                      concurrency=concurrency)
+    return result
+
+
+def run_scenario(params, jobs=1, repeat=3, measure_memory=True, workdir=None, network=None):
+    """
+    Benchmark one registry shape.
+
+    Wall time is the fastest of `repeat` untraced runs; peak memory comes from one
+    extra run under tracemalloc, which is too slow to time.
+
+    Args:
+    params (dict): SyntheticRegistry keyword arguments
+    jobs (int): Worker count passed to the resolver
+    repeat (int): Number of timed runs
+    measure_memory (bool): Also record peak Python heap usage
+    workdir (str): Directory for the temporary projects
+    network (dict): RegistryFaults keyword arguments; when given, installs go over HTTP
+    to a LocalRegistryServer with those conditions
+
+    Returns:
+    dict: The scenario's parameters and measurements
+    """
+    registry = SyntheticRegistry(**params)
+    server = LocalRegistryServer(registry, RegistryFaults(**network)).start() if network is not None else None
+    try:
+        runs = [run_install(registry, jobs=jobs, workdir=workdir, server=server) for _ in range(max(1, repeat))]
+        best = min(runs, key=lambda run: run['wall_seconds'])
+        result = {'params': registry.params, 'jobs': jobs, 'network': network, **best}
+
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                run_install(registry, jobs=jobs, workdir=workdir, server=server)
+                result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    finally:
+        if server is not None:
+            server.stop()
+    return result
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    List the regressions of a benchmark run against a baseline run.
+
+    Time and memory may grow by `tolerance` (a fraction) before they count. Request
+    counts and the size of the resolved graph are deterministic for a given seed, so
+    any increase in requests or any change in node count is reported.
+
+    Args:
+    results (dict): Output of run_benchmarks
+    baseline (dict): Earlier output of run_benchmarks
+    tolerance (float): Allowed relative growth of time and memory
+
+    Returns:
+    list: Human-readable regression messages; empty if there are none
+    """
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if (previous.get('params'), previous.get('jobs'), previous.get('network')) != \
+                (current.get('params'), current.get('jobs'), current.get('network')):
+            regressions.append(f"{name}: parameters differ from the baseline; re-record it")
+            continue
+        if current['nodes'] != previous['nodes']:
+            regressions.append(f"{name}: resolved {current['nodes']} nodes, baseline resolved {previous['nodes']}")
+        if current['requests']['total'] > previous['requests']['total']:
+            regressions.append(f"{name}: {current['requests']['total']} registry requests, "
+                               f"baseline made {previous['requests']['total']}")
+        for metric in ('wall_seconds', 'peak_memory_bytes'):
+            if metric in current and previous.get(metric):
+                limit = previous[metric] * (1 + tolerance)
+                if current[metric] > limit:
+                    regressions.append(f"{name}: {metric} {current[metric]} exceeds baseline "
+                                       f"{previous[metric]} by more than {tolerance:.0%}")
+    return regressions
+
+
+def run_benchmarks(scenarios, jobs=1, repeat=3, measure_memory=True, seed=0, workdir=None, network=None, log=None):
+    """
+    Run several scenarios and collect their results in the JSON results format.
+
+    Args:
+    scenarios (dict): Scenario name -> SyntheticRegistry keyword arguments
+    jobs (int): Worker count passed to the resolver
+    repeat (int): Number of timed runs per scenario
+    measure_memory (bool): Also record peak Python heap usage
+    seed (int): Seed used by scenarios that do not set their own
+    workdir (str): Directory for the temporary projects
+    network (dict): RegistryFaults keyword arguments, to install over HTTP from a local server
+    log: Text stream progress lines are written to (default: none)
+
+    Returns:
+    dict: {'version', 'python', 'platform', 'scenarios': {name: result}}
+    """
+    results = {
+        'version': RESULTS_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': {},
+    }
+    for name, params in scenarios.items():
+        result = run_scenario({'seed': seed, **params}, jobs=jobs, repeat=repeat, measure_memory=measure_memory,
+                              workdir=workdir, network=network)
+        results['scenarios'][name] = result
+        if log:
+            log.write(format_result(name, result) + '\n')
+            log.flush()
+    return results
+
+
+def format_result(name, result):
+    line = (f"{name}: {result['nodes']} nodes in {result['wall_seconds']:.3f}s "
+            f"({result['nodes_per_second']} nodes/s), {result['requests']['total']} requests")
+    if 'bytes_served' in result:
+        line += f", {result['bytes_served'] / (1024 * 1024):.1f} MB"
+    if 'connections' in result:
+        line += f" over {result['connections']} connections"
+    if 'concurrency' in result:
+        line += ", limits " + " / ".join(f"{kind} {limit['limit']}" for kind, limit in result['concurrency'].items())
+    if 'peak_memory_bytes' in result:
+        line += f", peak {result['peak_memory_bytes'] / (1024 * 1024):.1f} MB"
+    return line
+
+
+def _scenario_from_args(args):
+    custom = {key: getattr(args, key) for key in ('nodes', 'fanout', 'versions', 'churn', 'diamonds', 'cycles',
+                                                   'roots', 'payload_size')
+              if getattr(args, key) is not None}
+    if custom:
+        return {'custom': custom}
+    names = args.scenario or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}")
+    return {name: SCENARIOS[name] for name in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark resolving and installing synthetic dependency graphs')
+    parser.add_argument('--scenario', action='append', help=f"Scenario to run (repeatable): {', '.join(SCENARIOS)}")
+    parser.add_argument('--nodes', type=int, help='Run a custom scenario with this many packages')
+    parser.add_argument('--fanout', type=int, help='Dependencies per package (custom scenario)')
+    parser.add_argument('--versions', type=int, help='Major versions per package (custom scenario)')
+    parser.add_argument('--churn', type=float, help='Chance of depending on an older major (custom scenario)')
+    parser.add_argument('--diamonds', type=float, help='Chance of depending on a shared package (custom scenario)')
+    parser.add_argument('--cycles', type=int, help='Number of cycle-closing edges (custom scenario)')
+    parser.add_argument('--roots', type=int, help='Number of top-level dependencies (custom scenario)')
+    parser.add_argument('--payload-size', type=int, help='Filler bytes per tarball (custom scenario)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated registries')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Worker count passed to the resolver')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per scenario; the fastest is kept')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run')
+    parser.add_argument('--server', action='store_true',
+                        help='Install over HTTP from a local registry server instead of in process')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server delay per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Extra random server delay of up to this many seconds')
+    parser.add_argument('--bandwidth', type=int, help='Server bytes per second per response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests the server fails with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests the server answers with 429')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Fail if results regress against this earlier results file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative growth of time and memory against the baseline')
+    args = parser.parse_args(argv)
+
+    network = None
+    if args.server:
+        network = {'latency': args.latency, 'jitter': args.jitter, 'bandwidth': args.bandwidth,
+                   'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate, 'seed': args.seed}
+    results = run_benchmarks(_scenario_from_args(args), jobs=args.jobs, repeat=args.repeat,
+                             measure_memory=not args.no_memory, seed=args.seed, network=network, log=sys.stdout)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  REGRESSION {regression}", file=sys.stderr)
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
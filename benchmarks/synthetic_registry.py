@@ -0,0 +1,376 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import tarfile
+import threading
+import zlib
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+DEFAULT_REGISTRY_URL = 'https://registry.npmjs.org'
+
+ABBREVIATED_MEDIA_TYPE = 'application/vnd.npm.install-v1+json'
+
+# Fields the registry keeps in abbreviated (install-v1) packuments
+ABBREVIATED_VERSION_FIELDS = ('name', 'version', 'deprecated', 'dependencies', 'optionalDependencies',
+                              'devDependencies', 'bundleDependencies', 'peerDependencies', 'peerDependenciesMeta',
+                              'bin', 'directories', 'dist', 'engines', 'cpu', 'os', '_hasShrinkwrap',
+                              'hasInstallScript')
+
+# Real packages name their docs inconsistently and many ship no LICENSE; tarballs cycle through these
+DOC_LAYOUTS = (('README.md', 'LICENSE'), ('readme.md', 'license'), ('README',), ())
+
+
+def _tar_add(tar, name, data):
+    info = tarfile.TarInfo(f"package/{name}")
+    info.size = len(data)
+    info.mode = 0o644
+    info.mtime = 0  # fixed, so the same package always packs to the same bytes
+    tar.addfile(info, io.BytesIO(data))
+
+
+def build_tarball(name, version, dependencies, payload_size=0):
+    """
+    Pack a minimal npm package tarball.
+
+    Besides package.json it holds the README and LICENSE files of one of DOC_LAYOUTS,
+    picked from the package name, so some packages have neither.
+
+    Args:
+    name (str): Package name
+    version (str): Package version
+    dependencies (dict): Dependency ranges written to its package.json
+    payload_size (int): Size of an extra index.js file, to make downloads heavier
+
+    Returns:
+    bytes: The gzipped tarball, identical for identical arguments
+    """
+    manifest = json.dumps({'name': name, 'version': version, 'dependencies': dependencies}, indent=2)
+    buffer = io.BytesIO()
+    # gzip stores a timestamp too; zero it for reproducible bytes
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=1, mtime=0) as gz, \
+            tarfile.open(fileobj=gz, mode='w') as tar:
+        _tar_add(tar, 'package.json', manifest.encode())
+        for doc in DOC_LAYOUTS[zlib.crc32(name.encode()) % len(DOC_LAYOUTS)]:
+            _tar_add(tar, doc, f"{name}\n".encode())
+        if payload_size:
+            _tar_add(tar, 'index.js', (f"// {name}@{version}\n".encode() * (payload_size // 16 + 1))[:payload_size])
+    return buffer.getvalue()
+
+
+def sri_integrity(data):
+    return 'sha512-' + base64.b64encode(hashlib.sha512(data).digest()).decode()
+
+
+def abbreviate_packument(packument):
+    """
+    Reduce a full packument to the abbreviated document the registry serves for
+    Accept: application/vnd.npm.install-v1+json.
+
+    Args:
+    packument (dict): Full packument
+
+    Returns:
+    dict: name, modified, dist-tags and the install-relevant fields of every version
+    """
+    versions = {version: {field: info[field] for field in ABBREVIATED_VERSION_FIELDS if field in info}
+                for version, info in packument['versions'].items()}
+    abbreviated = {'name': packument['name'], 'dist-tags': packument['dist-tags'], 'versions': versions}
+    modified = packument.get('time', {}).get('modified')
+    if modified:
+        abbreviated['modified'] = modified
+    return abbreviated
+
+
+class FixtureRegistry:
+    """
+    Serves a fixed set of packuments together with tarballs packed from them.
+
+    Each version's 'dist' is filled in with a tarball URL under base_url and the
+    integrity of the tarball that will be served for it, so installs verify end to end.
+
+    Args:
+    packuments (dict): Package name -> packument with at least 'versions'
+    base_url (str): Registry URL the tarball URLs point at
+    payload_size (int): Bytes of filler added to every tarball
+    root_dependencies (dict): Dependencies of the project package_json() describes
+    (default: every package at 'latest')
+    """
+
+    def __init__(self, packuments, base_url=DEFAULT_REGISTRY_URL, payload_size=0, root_dependencies=None):
+        self.base_url = base_url.rstrip('/')
+        self.payload_size = payload_size
+        self._tarballs = {}
+        self._tarballs_lock = threading.Lock()
+        self.packuments = {name: self._complete(name, packument) for name, packument in packuments.items()}
+        self.root_dependencies = root_dependencies or {name: 'latest' for name in self.packuments}
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        """
+        Load the packuments stored as <name>.json files in directory.
+
+        A scoped package's file may be named with its scope folded in (e.g. '@s__pkg.json');
+        the package name is always taken from the document's 'name'.
+
+        Args:
+        directory (str): Fixture directory
+        **kwargs: Passed on to the constructor
+
+        Returns:
+        FixtureRegistry: Registry serving the fixtures
+        """
+        packuments = {}
+        for file_name in sorted(os.listdir(directory)):
+            if file_name.endswith('.json'):
+                with open(os.path.join(directory, file_name), 'r') as f:
+                    packument = json.load(f)
+                packuments[packument['name']] = packument
+        return cls(packuments, **kwargs)
+
+    def save(self, directory):
+        """Write every packument to directory in the format from_directory reads."""
+        os.makedirs(directory, exist_ok=True)
+        for name, packument in self.packuments.items():
+            with open(os.path.join(directory, name.replace('/', '__') + '.json'), 'w') as f:
+                json.dump(packument, f, indent=2)
+
+    def _tarball_url(self, name, version):
+        return f"{self.base_url}/{name}/-/{name.split('/')[-1]}-{version}.tgz"
+
+    def _complete(self, name, packument):
+        versions = {}
+        for version, info in packument['versions'].items():
+            info = {**info, 'name': name, 'version': version, 'dependencies': info.get('dependencies', {})}
+            tarball = self.tarball(name, version, info['dependencies'])
+            info['dist'] = {'tarball': self._tarball_url(name, version), 'integrity': sri_integrity(tarball)}
+            versions[version] = info
+        dist_tags = packument.get('dist-tags') or {'latest': list(versions)[-1]}
+        return {**packument, 'name': name, 'dist-tags': dist_tags, 'versions': versions}
+
+    def rebase(self, base_url):
+        """Point every tarball URL at another registry URL, e.g. a local server's address."""
+        self.base_url = base_url.rstrip('/')
+        for name, packument in self.packuments.items():
+            for version, info in packument['versions'].items():
+                info['dist']['tarball'] = self._tarball_url(name, version)
+
+    def tarball(self, name, version, dependencies=None):
+        """Return the tarball bytes of name@version, packing it on first use."""
+        key = (name, version)
+        with self._tarballs_lock:
+            data = self._tarballs.get(key)
+        if data is None:
+            if dependencies is None:
+                dependencies = self.packuments[name]['versions'][version]['dependencies']
+            data = build_tarball(name, version, dependencies, self.payload_size)
+            with self._tarballs_lock:
+                self._tarballs[key] = data
+        return data
+
+    def package_json(self):
+        return {'name': 'synthetic-project', 'version': '1.0.0', 'dependencies': dict(self.root_dependencies)}
+
+    def route(self, path, accept=None):
+        """
+        Answer a registry request path the way registry.npmjs.org would.
+
+        Handles '/<name>' (packument), '/<name>/<version>' (one version's metadata)
+        and '/<name>/-/<file>.tgz' (tarball). Packuments are abbreviated when the
+        Accept header asks for application/vnd.npm.install-v1+json.
+
+        Args:
+        path (str): URL path, with or without a leading slash
+        accept (str): Accept request header, if any
+
+        Returns:
+        tuple: (kind, status code, body bytes, content type), where kind is
+        'packument', 'version', 'tarball' or None for unknown paths
+        """
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        if parts and parts[0].startswith('@') and len(parts) > 1:
+            parts = [f"{parts[0]}/{parts[1]}"] + parts[2:]
+        if not parts or parts[0] not in self.packuments:
+            return None, 404, b'{"error":"Not found"}', 'application/json'
+
+        packument = self.packuments[parts[0]]
+        if len(parts) == 1:
+            if accept and ABBREVIATED_MEDIA_TYPE in accept:
+                return 'packument', 200, json.dumps(abbreviate_packument(packument)).encode(), ABBREVIATED_MEDIA_TYPE
+            return 'packument', 200, json.dumps(packument).encode(), 'application/json'
+        if len(parts) == 2:
+            version = packument['dist-tags'].get(parts[1], parts[1])
+            if version in packument['versions']:
+                return 'version', 200, json.dumps(packument['versions'][version]).encode(), 'application/json'
+        if len(parts) == 3 and parts[1] == '-':
+            prefix = f"{parts[0].split('/')[-1]}-"
+            version = parts[2][len(prefix):-len('.tgz')] if parts[2].startswith(prefix) else None
+            if version in packument['versions']:
+                return 'tarball', 200, self.tarball(parts[0], version), 'application/octet-stream'
+        return None, 404, b'{"error":"Not found"}', 'application/json'
+
+
+class SyntheticRegistry(FixtureRegistry):
+    """
+    A generated npm registry whose dependency graph shape is set by a few knobs.
+
+    Packages are named pkg-00000, pkg-00001, ... and the first `roots` of them are the
+    project's dependencies. Every other package is depended on at least once, and edges
+    only point to higher-numbered packages except for the `cycles` back edges added on
+    purpose. The same seed and parameters always produce the same registry.
+
+    Args:
+    nodes (int): Number of packages
+    fanout (int): Dependencies per package
+    versions (int): Major versions published per package (each with two minors)
+    churn (float): Chance that a dependency range asks for an older major, which puts
+    several versions of a package into the graph
+    diamonds (float): Chance that a dependency is drawn from packages already depended
+    on, so subtrees are shared instead of every edge reaching a new package
+    cycles (int): Number of back edges that close dependency cycles
+    roots (int): Number of top-level dependencies
+    payload_size (int): Bytes of filler added to every tarball
+    seed (int): Random seed
+    base_url (str): Registry URL the packuments point their tarball URLs at
+    """
+
+    def __init__(self, nodes=100, fanout=3, versions=2, churn=0.0, diamonds=0.3, cycles=0, roots=10,
+                 payload_size=0, seed=0, base_url=DEFAULT_REGISTRY_URL):
+        if nodes < 1 or versions < 1:
+            raise ValueError("A synthetic registry needs at least one package and one version")
+        self.params = {'nodes': nodes, 'fanout': fanout, 'versions': versions, 'churn': churn,
+                       'diamonds': diamonds, 'cycles': cycles, 'roots': min(roots, nodes),
+                       'payload_size': payload_size, 'seed': seed}
+        self.names = [f"pkg-{i:05d}" for i in range(nodes)]
+        self._rng = random.Random(seed)
+        self.dependencies = self._generate_edges()
+        super().__init__({name: self._build_packument(name) for name in self.names}, base_url=base_url,
+                         payload_size=payload_size,
+                         root_dependencies={name: f"^{versions}.0.0" for name in self.names[:self.params['roots']]})
+
+    def _generate_edges(self):
+        params = self.params
+        nodes, rng = params['nodes'], self._rng
+        edges = {i: [] for i in range(nodes)}
+        referenced = []  # package indices something already depends on, for diamonds
+        next_new = params['roots']
+        for i in range(nodes):
+            chosen = set()
+            for _ in range(params['fanout']):
+                shared = [j for j in referenced[-64:] if j > i and j not in chosen]
+                if shared and rng.random() < params['diamonds']:
+                    j = rng.choice(shared)
+                elif next_new < nodes:
+                    j = next_new
+                    next_new += 1
+                elif i + 1 < nodes:
+                    j = rng.randrange(i + 1, nodes)
+                else:
+                    continue
+                if j not in chosen:
+                    chosen.add(j)
+                    edges[i].append(j)
+                    referenced.append(j)
+        for _ in range(params['cycles'] if nodes > 1 else 0):
+            low, high = sorted(rng.sample(range(nodes), 2))
+            if low not in edges[high]:
+                edges[high].append(low)
+        return {self.names[i]: [self.names[j] for j in targets] for i, targets in edges.items()}
+
+    def _dependency_ranges(self, name, major):
+        # Ranges are drawn per version, so older versions can pull in older majors
+        rng = random.Random(f"{self.params['seed']}:{name}:{major}")
+        versions = self.params['versions']
+        ranges = {}
+        for dep in self.dependencies[name]:
+            wanted = versions
+            if versions > 1 and rng.random() < self.params['churn']:
+                wanted = rng.randrange(1, versions)
+            ranges[dep] = f"^{wanted}.0.0"
+        return ranges
+
+    def _build_packument(self, name):
+        # Descriptive fields give full documents the weight real ones have next to abbreviated ones
+        description = f"Synthetic package {name} for resolver benchmarks"
+        versions = {}
+        time = {'created': '2020-01-01T00:00:00.000Z'}
+        for major in range(1, self.params['versions'] + 1):
+            dependencies = self._dependency_ranges(name, major)
+            for minor in (0, 1):
+                version = f"{major}.{minor}.0"
+                versions[version] = {
+                    'dependencies': dependencies, 'description': description, 'main': 'index.js',
+                    'license': 'MIT', 'scripts': {'test': 'node test.js'}, 'keywords': ['synthetic', 'benchmark'],
+                    'repository': {'type': 'git', 'url': f"git+https://example.com/{name}.git"},
+                    'maintainers': [{'name': 'bench', 'email': 'bench@example.com'}],
+                    '_npmUser': {'name': 'bench', 'email': 'bench@example.com'},
+                    'readme': f"# {name}\n\n{description}.\n" * 8,
+                }
+                time[version] = f"2020-{major % 12 + 1:02d}-{minor + 1:02d}T00:00:00.000Z"
+        time['modified'] = max(time.values())
+        return {'name': name, 'description': description, 'dist-tags': {'latest': f"{self.params['versions']}.1.0"},
+                'versions': versions, 'time': time, 'readme': f"# {name}\n\n{description}.\n" * 64,
+                'license': 'MIT'}
+
+
+class _Response:
+    """The subset of requests.Response that npm_api reads."""
+
+    def __init__(self, url, status_code, body, content_type):
+        self.url = url
+        self.status_code = status_code
+        self.content = body
+        self.headers = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+        self.raw = io.BytesIO(body)
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InProcessSession:
+    """
+    Stands in for the shared requests.Session and answers from a FixtureRegistry.
+
+    Counts requests by kind so benchmarks can report how many round trips an
+    install would have made.
+
+    Args:
+    registry (FixtureRegistry): Registry to answer from
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        self.requests = {'packument': 0, 'version': 0, 'tarball': 0, 'other': 0}
+        self.bytes_served = 0
+
+    def get(self, url, headers=None, stream=False, **kwargs):
+        kind, status, body, content_type = self.registry.route(urlsplit(url).path, (headers or {}).get('Accept'))
+        with self._lock:
+            self.requests[kind or 'other'] += 1
+            self.bytes_served += len(body)
+        return _Response(url, status, body, content_type)
+
+    def request_counts(self):
+        with self._lock:
+            counts = dict(self.requests)
+        counts['total'] = sum(counts.values())
+        return counts
@@ -1,8 +1,16 @@
 import argparse
 import os
+import sys
 from src.package_manager import BasicNodeJSPackageManager
+from src.cache_manager import parse_size
 from src.commands.add import setup_add_parser
-from src.commands.install import setup_install_parser
+from src.commands.install import fetch_timeout, network_mode, progress_mode, setup_install_parser
+from src.commands.cache import setup_cache_parser
+from src.commands.tree import setup_tree_parser
+from src.commands.verify import setup_verify_parser
+from src.dependency_resolver import InstallError
+from src.lock_file_manager import LockFileError
+from src.utils.npm_api import OfflineError
 
 
 def main():
@@ -11,6 +19,9 @@ def main():
 
     setup_add_parser(subparsers)
     setup_install_parser(subparsers)
+    setup_cache_parser(subparsers)
+    setup_verify_parser(subparsers)
+    setup_tree_parser(subparsers)
 
     args = parser.parse_args()
 
@@ -24,7 +35,16 @@ def main():
         else:
             print("Error: No packages specified for add command.")
     elif args.command == 'install':
-        manager.install(visualize=not args.no_visualize, force_visualize=args.force_visualize)
+        cache_max_size = parse_size(args.cache_max_size) if args.cache_max_size else None
+        try:
+            manager.install(visualize=not args.no_visualize, force_visualize=args.force_visualize, jobs=args.jobs,
+                            link_method=args.link_method, cache_max_size=cache_max_size, frozen=args.frozen,
+                            progress=progress_mode(args), network_mode=network_mode(args), profile=args.profile,
+                            fetch_timeout=fetch_timeout(args))
+        except (LockFileError, OfflineError, InstallError) as e:
+            sys.exit(f"Error: {e}")
+    elif args.command in ('cache', 'verify', 'tree'):
+        args.func(args)
     elif args.command:
         print(f"Error: Unknown command '{args.command}'")
     else:
@@ -1,16 +1,85 @@
 import os
 import hashlib
+import json
+import re
 import shutil
+import threading
+
+from src.content_store import ContentStore
+from src.utils.file_operations import atomic_write_json, file_lock
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(size):
+    """
+    Parse a human-readable byte size such as '500M' or '2G'.
+
+    Args:
+    size (str): Size with an optional K/M/G/T suffix (powers of 1024)
+
+    Returns:
+    int: Number of bytes
+
+    Raises:
+    ValueError: If the size cannot be parsed
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*$', str(size), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(num_bytes):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}" if unit != 'B' else f"{num_bytes} B"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+
+def get_default_cache_dir():
+    """
+    Return the user-level cache directory shared by every project on the machine.
+
+    PYDEP_CACHE_DIR takes precedence; otherwise the platform's per-user cache
+    location is used (XDG_CACHE_HOME or ~/.cache on POSIX, LOCALAPPDATA on Windows).
+
+    Returns:
+    str: Path of the cache directory
+    """
+    if os.environ.get('PYDEP_CACHE_DIR'):
+        return os.path.expanduser(os.environ['PYDEP_CACHE_DIR'])
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'pydep', 'Cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pydep')
 
 
 class CacheManager:
-    def __init__(self, cache_dir):
+    """
+    Package cache safe to share between concurrent processes.
+
+    Entries are published atomically (written to a temporary file, then renamed),
+    downloads of the same package are serialized with a per-package lock, and
+    eviction takes an exclusive lock that excludes concurrent readers.
+    """
+
+    def __init__(self, cache_dir, link_method='auto', max_size=None):
         self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
+        self.index_dir = os.path.join(cache_dir, 'index')
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.store = ContentStore(os.path.join(cache_dir, 'store'))
+        self.link_method = link_method
+        self._link_method_lock = threading.Lock()
+        self.max_size = max_size
+        self.usage_path = os.path.join(cache_dir, 'usage.json')
+        self.locks_dir = os.path.join(cache_dir, 'locks')
+        self.cache_lock_path = os.path.join(self.locks_dir, 'cache.lock')
 
     def get_cache_path(self, package_name, version):
         cache_key = f"{package_name}@{version}"
-        return os.path.join(self.cache_dir, hashlib.md5(cache_key.encode()).hexdigest())
+        return os.path.join(self.index_dir, hashlib.md5(cache_key.encode()).hexdigest() + '.json')
 
     def is_cached(self, package_name, version):
         cache_path = self.get_cache_path(package_name, version)
@@ -22,10 +91,295 @@ class CacheManager:
             return cache_path
         return None
 
-    def cache_package(self, package_name, version, package_path):
+    def package_lock(self, package_name, version):
+        """
+        Lock serializing work on one package across processes, so it is downloaded once.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+        """
+        cache_key = hashlib.md5(f"{package_name}@{version}".encode()).hexdigest()
+        return file_lock(os.path.join(self.locks_dir, cache_key + '.lock'))
+
+    def staging_path(self, package_name, version):
+        """
+        Return a fresh directory path to extract a download into before import_package.
+
+        It lies inside the cache, on the store's filesystem, so importing moves the files
+        instead of copying them.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+        """
+        cache_key = hashlib.md5(f"{package_name}@{version}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, 'staging', f"{cache_key}.{os.getpid()}.{threading.get_ident()}")
+
+    def cache_package(self, package_name, version, package_path, integrity=None, move=False):
+        """
+        Add a package directory to the cache.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+        package_path (str): Directory holding the package's files; copied unless move is set
+        integrity (str): SRI integrity of the tarball the files were extracted from
+        move (bool): Let the store take the files over, leaving package_path to be deleted
+        """
+        with file_lock(self.cache_lock_path, shared=True):
+            self._publish(package_name, version, package_path, integrity, move)
+
+    def _publish(self, package_name, version, package_path, integrity, move):
+        files = self.store.add_directory(package_path, move=move)
+        entry = {'name': package_name, 'version': version, 'integrity': integrity, 'files': files}
+        atomic_write_json(self.get_cache_path(package_name, version), entry)
+        return entry
+
+    def import_package(self, package_name, version, staging_dir, target_dir, integrity=None):
+        """
+        Move a freshly extracted package into the cache, then install it at target_dir.
+
+        The project gets its files from the store the same way a cache hit does, so with
+        the 'copy' or 'reflink' method it never shares them with the cache.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+        staging_dir (str): Extracted package, e.g. at staging_path(); emptied by the import
+        target_dir (str): Directory the package should appear at (e.g. node_modules/<name>)
+        integrity (str): SRI integrity of the tarball the files were extracted from
+
+        Returns:
+        dict: The new cache entry
+        """
+        # One shared lock over both steps, so the entry cannot be evicted in between
+        with file_lock(self.cache_lock_path, shared=True):
+            entry = self._publish(package_name, version, staging_dir, integrity, move=True)
+            self._materialize(entry['files'], target_dir)
+        return entry
+
+    def get_package_entry(self, package_name, version):
+        """
+        Return the cache index entry of a package.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+
+        Returns:
+        dict: 'files' (relative path -> digest, size, executable) and the tarball
+        'integrity' it was extracted from, or None if the package is not cached
+        """
+        try:
+            with open(self.get_cache_path(package_name, version), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def resolve_link_method(self, target_dir):
+        # Download workers place packages concurrently; the first one probes for everyone
+        with self._link_method_lock:
+            if self.link_method == 'auto':
+                self.link_method = self.store.detect_link_method(target_dir)
+            return self.link_method
+
+    def materialize_package(self, package_name, version, target_dir):
+        """
+        Install a cached package into target_dir from the content-addressable store.
+
+        Args:
+        package_name (str): Name of the package
+        version (str): Version of the package
+        target_dir (str): Directory the package should appear at (e.g. node_modules/<name>)
+
+        Returns:
+        bool: True once the package is in place; False if it is not cached, e.g. because
+        another process evicted it after is_cached() was checked
+        """
         cache_path = self.get_cache_path(package_name, version)
-        shutil.copytree(package_path, cache_path)
+        # Eviction holds the lock exclusively, so the entry read here keeps its files until we are done
+        with file_lock(self.cache_lock_path, shared=True):
+            try:
+                with open(cache_path, 'r') as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                return False
+            self._materialize(entry['files'], target_dir)
+            # The index file's mtime doubles as the entry's last access time for LRU eviction
+            os.utime(cache_path)
+        return True
+
+    def _materialize(self, files, target_dir):
+        method = self.resolve_link_method(os.path.dirname(target_dir))
+        self.store.materialize(files, target_dir, method)
+
+    def _load_entries(self):
+        entries = []
+        with os.scandir(self.index_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith('.json'):
+                    continue
+                try:
+                    with open(dir_entry.path, 'r') as f:
+                        data = json.load(f)
+                    entries.append((dir_entry.stat().st_mtime, dir_entry.path, data))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        return entries
+
+    def _stored_files(self):
+        sizes = {}
+        for root, dirs, files in os.walk(self.store.files_dir):
+            for filename in files:
+                if filename.endswith('.tmp'):
+                    continue
+                digest = os.path.basename(root) + filename
+                sizes[digest] = os.path.getsize(os.path.join(root, filename))
+        return sizes
+
+    def _write_usage(self, total_bytes):
+        atomic_write_json(self.usage_path, {'bytes': total_bytes})
+
+    def _read_usage(self):
+        try:
+            with open(self.usage_path, 'r') as f:
+                return json.load(f)['bytes']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get_stats(self):
+        """
+        Summarize the cache contents.
+
+        Only reads the cache; the recorded usage is left to the installs that change it.
+
+        Returns:
+        dict: packages, files, bytes and max_size of the cache
+        """
+        with file_lock(self.cache_lock_path, shared=True):
+            entries = self._load_entries()
+            sizes = self._stored_files()
+        total_bytes = sum(sizes.values())
+        return {
+            'packages': len(entries),
+            'files': len(sizes),
+            'bytes': total_bytes,
+            'logical_bytes': sum(f['size'] for _, _, data in entries for f in data['files'].values()),
+            'max_size': self.max_size,
+        }
+
+    def prune(self, max_size):
+        """
+        Evict least recently used packages until the store fits in max_size bytes.
+
+        Files are reference counted across all cached packages, so only files no
+        remaining package uses are deleted.
+
+        Args:
+        max_size (int): Byte budget for the store
+
+        Returns:
+        dict: Number of evicted packages and freed bytes
+        """
+        with file_lock(self.cache_lock_path):
+            return self._prune(max_size)
+
+    def _prune(self, max_size):
+        entries = sorted(self._load_entries(), key=lambda entry: entry[0])
+        sizes = self._stored_files()
+        refcounts = dict.fromkeys(sizes, 0)
+        for _, _, data in entries:
+            for file_info in data['files'].values():
+                if file_info['digest'] in refcounts:
+                    refcounts[file_info['digest']] += 1
+
+        usage = sum(sizes.values())
+        # Files no package references any more are always reclaimed
+        freed = [digest for digest, count in refcounts.items() if count == 0]
+        usage -= sum(sizes[digest] for digest in freed)
+
+        evicted = []
+        for _, path, data in entries:
+            if usage <= max_size:
+                break
+            evicted.append(path)
+            for file_info in data['files'].values():
+                digest = file_info['digest']
+                if digest not in refcounts:
+                    continue
+                refcounts[digest] -= 1
+                if refcounts[digest] == 0:
+                    freed.append(digest)
+                    usage -= sizes[digest]
+
+        for path in evicted:
+            os.remove(path)
+        freed_bytes = 0
+        for digest in freed:
+            try:
+                os.remove(self.store.file_path(digest))
+                freed_bytes += sizes[digest]
+            except FileNotFoundError:
+                pass
+
+        self._write_usage(usage)
+        self.store.bytes_added = 0
+        return {'evicted': len(evicted), 'freed_bytes': freed_bytes}
+
+    def enforce_budget(self):
+        """
+        Incrementally keep the cache within max_size after an install.
+
+        The store is only rescanned when the last recorded usage plus the bytes
+        added by this process exceed the budget. The recorded usage is read and
+        updated under the exclusive cache lock, so concurrent installs add up
+        instead of overwriting each other's totals.
+
+        Returns:
+        dict: Result of prune, or None if nothing had to be evicted
+        """
+        if self.max_size is None:
+            return None
+        with file_lock(self.cache_lock_path):
+            usage = self._read_usage()
+            if usage is not None and usage + self.store.bytes_added <= self.max_size:
+                self._write_usage(usage + self.store.bytes_added)
+                self.store.bytes_added = 0
+                return None
+            return self._prune(self.max_size)
+
+    def verify(self):
+        """
+        Rehash every stored file and drop corrupted content.
+
+        Packages whose index references a missing or corrupted file are removed from
+        the cache so they are downloaded again on the next install.
+
+        Returns:
+        dict: Number of checked files, corrupted files and removed packages
+        """
+        with file_lock(self.cache_lock_path):
+            return self._verify()
+
+    def _verify(self):
+        corrupted = set()
+        sizes = self._stored_files()
+        for digest in sizes:
+            path = self.store.file_path(digest)
+            if self.store.hash_file(path) != digest:
+                corrupted.add(digest)
+                os.remove(path)
+
+        removed = 0
+        for _, path, data in self._load_entries():
+            if any(f['digest'] in corrupted or f['digest'] not in sizes for f in data['files'].values()):
+                os.remove(path)
+                removed += 1
+
+        return {'files': len(sizes), 'corrupted': len(corrupted), 'removed_packages': removed}
 
     def clear_cache(self):
         shutil.rmtree(self.cache_dir)
-        os.makedirs(self.cache_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.store = ContentStore(self.store.store_dir)
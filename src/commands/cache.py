@@ -0,0 +1,75 @@
+from src.cache_manager import CacheManager, format_size, get_default_cache_dir, parse_size
+
+
+def cache_stats(cache_manager):
+    """
+    Print a summary of the package cache.
+
+    Args:
+    cache_manager (CacheManager): The cache to inspect
+    """
+    stats = cache_manager.get_stats()
+    print(f"Cache directory: {cache_manager.cache_dir}")
+    print(f"Packages: {stats['packages']}")
+    print(f"Unique files: {stats['files']}")
+    print(f"Disk usage: {format_size(stats['bytes'])} "
+          f"(packages total {format_size(stats['logical_bytes'])} before deduplication)")
+    if stats['max_size'] is not None:
+        print(f"Budget: {format_size(stats['max_size'])}")
+
+
+def cache_prune(cache_manager, max_size):
+    """
+    Evict least recently used packages until the cache fits in max_size.
+
+    Args:
+    cache_manager (CacheManager): The cache to prune
+    max_size (int): Byte budget to prune down to
+    """
+    result = cache_manager.prune(max_size)
+    print(f"Evicted {result['evicted']} packages, freed {format_size(result['freed_bytes'])}")
+
+
+def cache_verify(cache_manager):
+    """
+    Rehash the cache contents and drop anything corrupted.
+
+    Args:
+    cache_manager (CacheManager): The cache to verify
+    """
+    result = cache_manager.verify()
+    print(f"Checked {result['files']} files: {result['corrupted']} corrupted, "
+          f"{result['removed_packages']} packages removed from the cache")
+
+
+def cache_command(args):
+    """
+    Command-line interface for the cache command.
+
+    Args:
+    args (argparse.Namespace): Parsed command-line arguments
+    """
+    cache_manager = CacheManager(get_default_cache_dir())
+
+    if args.cache_command == 'stats':
+        cache_stats(cache_manager)
+    elif args.cache_command == 'prune':
+        cache_prune(cache_manager, parse_size(args.max_size))
+    elif args.cache_command == 'verify':
+        cache_verify(cache_manager)
+    else:
+        print("Error: Specify a cache command: stats, prune or verify.")
+
+
+def setup_cache_parser(subparsers):
+    cache_parser = subparsers.add_parser('cache', help='Inspect and maintain the package cache')
+    cache_subparsers = cache_parser.add_subparsers(dest='cache_command', help='Cache commands')
+
+    cache_subparsers.add_parser('stats', help='Show cache size and contents')
+
+    prune_parser = cache_subparsers.add_parser('prune', help='Evict least recently used packages')
+    prune_parser.add_argument('--max-size', required=True, help='Size to prune the cache down to (e.g. 500M, 2G)')
+
+    cache_subparsers.add_parser('verify', help='Rehash cached files and drop corrupted entries')
+
+    cache_parser.set_defaults(func=cache_command)
@@ -1,8 +1,18 @@
-from src.dependency_resolver import DependencyResolver
+import sys
+
+from src.cache_manager import parse_size
+from src.content_store import LINK_METHODS
+from src.dependency_resolver import DependencyResolver, InstallError
+from src.lock_file_manager import LockFileError
+from src.utils.npm_api import OfflineError
+from src.utils.profiler import Profiler, configure_profiler
+
+DEFAULT_PROFILE_PATH = 'pydep-profile.json'
 
 
 def install_packages(package_json_path, node_modules_path, specific_packages=None, visualize=True,
-                     force_visualize=False):
+                     force_visualize=False, jobs=1, link_method='auto', cache_max_size=None, frozen=False,
+                     progress='fancy', network_mode='online', profile=None, fetch_timeout=None):
     """
     Install packages listed in package.json or specific packages if provided.
 
@@ -12,14 +22,43 @@ def install_packages(package_json_path, node_modules_path, specific_packages=Non
     specific_packages (list): List of specific packages to install (optional)
     visualize (bool): Whether to visualize the dependency tree (default True)
     force_visualize (bool): Whether to force visualization even for large trees (default False)
+    jobs (int): Most concurrent registry requests of each kind; the actual limit adapts (default 1)
+    link_method (str): How cached files are placed in node_modules: auto, reflink, hardlink or copy
+    cache_max_size (int): Byte budget for the package cache; least recently used packages are evicted
+    frozen (bool): Install exactly what the lock file records without resolving (default False)
+    progress (str): How progress is reported: fancy, quiet or ndjson (default fancy)
+    network_mode (str): 'online', 'prefer-offline' (use cached metadata without revalidating)
+    or 'offline' (never use the network) (default online)
+    profile (str): Write a Chrome trace of the install to this path and print a timing summary to stderr
+    fetch_timeout (float): Seconds a registry request may wait for data (default: fetch-timeout from .npmrc)
+
+    Raises:
+    LockFileError: If a frozen install cannot be performed from the lock file
+    OfflineError: If an offline install needs something that is not cached
+    InstallError: If packages could not be resolved or installed
     """
-    resolver = DependencyResolver(package_json_path, node_modules_path)
-    resolved_dependencies, installation_order = resolver.resolve_and_install_dependencies(
-        specific_packages=specific_packages,
-        visualize=(visualize or force_visualize),
-        force_visualize=force_visualize
-    )
+    profiler = Profiler() if profile else None
+    resolver = DependencyResolver(package_json_path, node_modules_path, jobs=jobs, link_method=link_method,
+                                  cache_max_size=cache_max_size, progress=progress, network_mode=network_mode,
+                                  profiler=profiler, fetch_timeout=fetch_timeout)
+    try:
+        if frozen:
+            resolved_dependencies, installation_order = resolver.install_frozen()
+        else:
+            resolved_dependencies, installation_order = resolver.resolve_and_install_dependencies(
+                specific_packages=specific_packages,
+                visualize=(visualize or force_visualize),
+                force_visualize=force_visualize
+            )
+    except Exception:
+        resolver.animator.close()
+        raise
+    finally:
+        if profiler is not None:
+            _write_profile(resolver, profiler, profile)
 
+    if progress != 'fancy':
+        return
     if resolved_dependencies:
         print("\nInstallation completed. Resolved dependencies:")
         for package, version in installation_order:
@@ -28,6 +67,14 @@ def install_packages(package_json_path, node_modules_path, specific_packages=Non
         print("No packages were installed.")
 
 
+def _write_profile(resolver, profiler, path):
+    configure_profiler(None)
+    resolver.record_profile_counters()
+    profiler.write_chrome_trace(path)
+    print(f"\n{profiler.format_summary()}\n\nChrome trace written to {path} "
+          f"(open it in chrome://tracing or ui.perfetto.dev)", file=sys.stderr)
+
+
 def install_command(args):
     """
     Command-line interface for the install command.
@@ -38,14 +85,49 @@ def install_command(args):
     package_json_path = 'package.json'
     node_modules_path = 'node_modules'
 
-    if args.packages:
-        print(f"Installing specific packages: {', '.join(args.packages)}")
-        install_packages(package_json_path, node_modules_path, specific_packages=args.packages,
-                         visualize=not args.no_visualize, force_visualize=args.force_visualize)
-    else:
-        print("Installing all packages from package.json")
-        install_packages(package_json_path, node_modules_path,
-                         visualize=not args.no_visualize, force_visualize=args.force_visualize)
+    if args.frozen and args.packages:
+        sys.exit("Error: --frozen installs the whole lock file and does not take package names")
+
+    progress = progress_mode(args)
+    mode = network_mode(args)
+    try:
+        if args.packages:
+            if progress == 'fancy':
+                print(f"Installing specific packages: {', '.join(args.packages)}")
+            install_packages(package_json_path, node_modules_path, specific_packages=args.packages,
+                             visualize=not args.no_visualize, force_visualize=args.force_visualize, jobs=args.jobs,
+                             link_method=args.link_method, cache_max_size=_cache_max_size(args), progress=progress,
+                             network_mode=mode, profile=args.profile, fetch_timeout=fetch_timeout(args))
+        else:
+            if progress == 'fancy':
+                print("Installing all packages from package.json")
+            install_packages(package_json_path, node_modules_path,
+                             visualize=not args.no_visualize, force_visualize=args.force_visualize, jobs=args.jobs,
+                             link_method=args.link_method, cache_max_size=_cache_max_size(args), frozen=args.frozen,
+                             progress=progress, network_mode=mode, profile=args.profile,
+                             fetch_timeout=fetch_timeout(args))
+    except (LockFileError, OfflineError, InstallError) as e:
+        sys.exit(f"Error: {e}")
+
+
+def progress_mode(args):
+    if args.ndjson:
+        return 'ndjson'
+    return 'quiet' if args.quiet else 'fancy'
+
+
+def network_mode(args):
+    if args.offline:
+        return 'offline'
+    return 'prefer-offline' if args.prefer_offline else 'online'
+
+
+def fetch_timeout(args):
+    return args.fetch_timeout / 1000 if args.fetch_timeout else None
+
+
+def _cache_max_size(args):
+    return parse_size(args.cache_max_size) if args.cache_max_size else None
 
 
 def setup_install_parser(subparsers):
@@ -54,4 +136,31 @@ def setup_install_parser(subparsers):
     install_parser.add_argument('--no-visualize', action='store_true', help='Disable dependency tree visualization')
     install_parser.add_argument('--force-visualize', action='store_true',
                                 help='Force visualization even for large dependency trees')
+    install_parser.add_argument('-j', '--jobs', type=int, default=32,
+                                help='Most concurrent registry requests of each kind (metadata, tarballs); the '
+                                     'actual limit adapts to how the registry responds (default 32)')
+    install_parser.add_argument('--link-method', choices=LINK_METHODS, default='auto',
+                                help='How packages are placed from the cache into node_modules (default auto)')
+    install_parser.add_argument('--cache-max-size',
+                                help='Evict least recently used cache entries above this size (e.g. 2G)')
+    install_parser.add_argument('--frozen', action='store_true',
+                                help='Install exactly what package-lock.json records, without contacting the '
+                                     'registry for metadata; fail if package.json has changed')
+    install_parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_PATH, metavar='PATH',
+                                help='Time every install phase, write a Chrome trace to PATH '
+                                     f'(default {DEFAULT_PROFILE_PATH}) and print a summary')
+    install_parser.add_argument('--fetch-timeout', type=int, metavar='MS',
+                                help='Milliseconds to wait for the registry to answer or send more data '
+                                     'before retrying (default: fetch-timeout from .npmrc, else 300000)')
+    network_group = install_parser.add_mutually_exclusive_group()
+    network_group.add_argument('--prefer-offline', action='store_true',
+                               help='Use cached metadata and tarballs without revalidating; '
+                                    'only fetch what is not cached')
+    network_group.add_argument('--offline', action='store_true',
+                               help='Never contact the registry; fail if anything needed is not cached')
+    output_group = install_parser.add_mutually_exclusive_group()
+    output_group.add_argument('-q', '--quiet', action='store_true',
+                              help='Print nothing but warnings and errors (for CI)')
+    output_group.add_argument('--ndjson', action='store_true',
+                              help='Stream progress events as newline-delimited JSON on stdout')
     install_parser.set_defaults(func=install_command)
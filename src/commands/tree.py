@@ -0,0 +1,61 @@
+import os
+import sys
+
+import src.dependency_visualizer as visualizer
+from src.lock_file_manager import LockFileError, LockFileManager
+
+
+def show_tree(project_root, fmt='text', depth=None, focus=None, out=None):
+    """
+    Render or export the dependency graph recorded in the lock file.
+
+    Args:
+    project_root (str): Directory containing package-lock.json
+    fmt (str): 'text' for a tree, or one of the visualizer's export formats
+    depth (int): Deepest level of the text tree (default: unlimited)
+    focus (str): Only include paths leading to and below this package
+    out: Text stream to write to (default: stdout)
+
+    Raises:
+    LockFileError: If the lock file is missing or does not record the graph
+    """
+    resolved_dependencies = LockFileManager(project_root).get_locked_graph()['resolved_dependencies']
+    if fmt == 'text':
+        visualizer.visualize_dependency_tree(resolved_dependencies, depth=depth, focus=focus, out=out)
+    else:
+        visualizer.export_dependency_graph(resolved_dependencies, fmt, out=out, focus=focus)
+
+
+def tree_command(args):
+    """
+    Command-line interface for the tree command.
+
+    Args:
+    args (argparse.Namespace): Parsed command-line arguments
+    """
+    if args.installed:
+        visualizer.visualize_installation_tree('node_modules', sizes=args.sizes)
+        return
+
+    try:
+        if args.output:
+            with open(args.output, 'w') as out:
+                show_tree(os.getcwd(), fmt=args.format, depth=args.depth, focus=args.focus, out=out)
+        else:
+            show_tree(os.getcwd(), fmt=args.format, depth=args.depth, focus=args.focus)
+    except LockFileError as e:
+        sys.exit(f"Error: {e}")
+
+
+def setup_tree_parser(subparsers):
+    tree_parser = subparsers.add_parser('tree', help='Show or export the dependency graph from the lock file')
+    tree_parser.add_argument('--depth', type=int, help='Deepest level to show (top-level packages are 0)')
+    tree_parser.add_argument('--focus', help="Only show paths to and below a package ('name' or 'name@version')")
+    tree_parser.add_argument('--format', choices=('text',) + visualizer.EXPORT_FORMATS, default='text',
+                             help='Output format (default text)')
+    tree_parser.add_argument('-o', '--output', help='Write to a file instead of stdout')
+    tree_parser.add_argument('--installed', action='store_true',
+                             help='Show the packages present in node_modules instead of the locked graph')
+    tree_parser.add_argument('--sizes', action='store_true',
+                             help='With --installed, show file counts and disk usage per package')
+    tree_parser.set_defaults(func=tree_command)
@@ -0,0 +1,80 @@
+import json
+import os
+import sys
+
+from src.cache_manager import CacheManager, get_default_cache_dir
+from src.lock_file_manager import LockFileError, LockFileManager
+from src.package_validator import PackageValidator
+
+
+def verify_installation(project_root, node_modules_path, jobs=8):
+    """
+    Validate every package of the installed tree in one pass.
+
+    The layout, tarball integrities and parent edges come from the lock file, so
+    nested installs are checked where the resolver put them. File contents are
+    compared with the package cache entries they were installed from.
+
+    Args:
+    project_root (str): Directory containing package-lock.json
+    node_modules_path (str): Path to the node_modules directory
+    jobs (int): Number of packages verified concurrently
+
+    Returns:
+    dict: Report as returned by PackageValidator.verify_tree
+
+    Raises:
+    LockFileError: If the lock file is missing or does not record the layout
+    """
+    graph = LockFileManager(project_root).get_locked_graph()
+    cache_manager = CacheManager(get_default_cache_dir())
+
+    expected_entries = {}
+    integrities = {}
+    for key, dist in graph['package_dists'].items():
+        entry = cache_manager.get_package_entry(*key)
+        if entry is not None:
+            expected_entries[key] = entry
+        integrities[key] = dist['integrity']
+
+    validator = PackageValidator(node_modules_path, jobs=jobs)
+    return validator.verify_tree(graph['install_targets'], expected_entries, integrities)
+
+
+def print_report(report):
+    for failure in report['failures']:
+        print(f"✗ {failure['package']}@{failure['version']} ({failure['path']})")
+        for error in failure['errors']:
+            print(f"    {error}")
+    print(f"Verified {report['verified']}/{report['packages']} packages "
+          f"({report['files_hashed']} files hashed, {report['files_reused']} unchanged since last check)")
+    if report['unchecked_contents']:
+        print(f"{report['unchecked_contents']} packages are no longer cached; their file contents were not checked")
+
+
+def verify_command(args):
+    """
+    Command-line interface for the verify command.
+
+    Args:
+    args (argparse.Namespace): Parsed command-line arguments
+    """
+    try:
+        report = verify_installation(os.getcwd(), 'node_modules', jobs=args.jobs)
+    except LockFileError as e:
+        sys.exit(f"Error: {e}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if report['failures']:
+        sys.exit(1)
+
+
+def setup_verify_parser(subparsers):
+    verify_parser = subparsers.add_parser('verify', help='Check the installed packages against the lock file')
+    verify_parser.add_argument('-j', '--jobs', type=int, default=8,
+                               help='Number of packages verified concurrently (default 8)')
+    verify_parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    verify_parser.set_defaults(func=verify_command)
@@ -0,0 +1,180 @@
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+
+from src.utils.hash_stamps import hash_file
+
+LINK_METHODS = ('auto', 'reflink', 'hardlink', 'copy')
+
+# ioctl request number for FICLONE on Linux (btrfs, xfs, bcachefs, ...)
+_FICLONE = 0x40049409
+
+
+def _reflink(src, dst):
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "reflink is only supported on Linux")
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+    shutil.copymode(src, dst)
+
+
+def _hardlink(src, dst):
+    os.link(src, dst)
+
+
+def _copy(src, dst):
+    shutil.copy2(src, dst)
+
+
+_LINKERS = {'reflink': _reflink, 'hardlink': _hardlink, 'copy': _copy}
+
+
+class ContentStore:
+    """
+    Content-addressable file store.
+
+    Every file is stored once under the SHA-256 of its contents, so identical files
+    shared by different packages or versions take disk space only once. Packages are
+    described by an index of relative path -> digest and materialized by reflinking,
+    hardlinking or copying the stored files.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.files_dir = os.path.join(store_dir, 'files')
+        self.bytes_added = 0
+        os.makedirs(self.files_dir, exist_ok=True)
+
+    def file_path(self, digest):
+        return os.path.join(self.files_dir, digest[:2], digest[2:])
+
+    def hash_file(self, path):
+        return hash_file(path)
+
+    def add_file(self, path, move=False):
+        """
+        Add a file to the store, deduplicating it against existing content.
+
+        The store keeps its own copy (a reflink where the filesystem supports it), so
+        later changes to path never reach the stored content.
+
+        Args:
+        path (str): File to add
+        move (bool): Take path over instead of copying it, e.g. from a staging directory
+
+        Returns:
+        str: Hex SHA-256 digest of the file
+        """
+        digest = self.hash_file(path)
+
+        stored_path = self.file_path(digest)
+        if os.path.exists(stored_path):
+            return digest
+
+        os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+        tmp_path = f"{stored_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if move:
+                os.rename(path, tmp_path)
+            else:
+                _reflink(path, tmp_path)
+        except OSError:
+            _copy(path, tmp_path)
+        os.replace(tmp_path, stored_path)
+        self.bytes_added += os.path.getsize(stored_path)
+        return digest
+
+    def add_directory(self, directory, move=False):
+        """
+        Add every regular file below directory to the store.
+
+        Args:
+        directory (str): Package directory to import
+        move (bool): Take the files over instead of copying them
+
+        Returns:
+        dict: Relative path -> {'digest', 'size', 'executable'}
+        """
+        files = {}
+        for root, dirs, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                st = os.lstat(path)
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                files[os.path.relpath(path, directory).replace(os.sep, '/')] = {
+                    'digest': self.add_file(path, move=move),
+                    'size': st.st_size,
+                    'executable': bool(st.st_mode & stat.S_IXUSR),
+                }
+        return files
+
+    def detect_link_method(self, target_dir):
+        """
+        Find the cheapest way to get files from the store into target_dir.
+
+        Reflinks are tried first, then hardlinks; copying always works.
+
+        Args:
+        target_dir (str): A directory on the filesystem packages will be installed to
+
+        Returns:
+        str: 'reflink', 'hardlink' or 'copy'
+        """
+        os.makedirs(target_dir, exist_ok=True)
+        probe_src = os.path.join(self.store_dir, f".probe-{os.getpid()}")
+        probe_dst = os.path.join(target_dir, f".pydep-probe-{os.getpid()}")
+        with open(probe_src, 'wb') as f:
+            f.write(b'probe')
+        try:
+            for method in ('reflink', 'hardlink'):
+                try:
+                    _LINKERS[method](probe_src, probe_dst)
+                    return method
+                except OSError:
+                    continue
+                finally:
+                    if os.path.lexists(probe_dst):
+                        os.unlink(probe_dst)
+            return 'copy'
+        finally:
+            os.unlink(probe_src)
+
+    def materialize(self, files, target_dir, method='copy'):
+        """
+        Recreate a package directory from its file index.
+
+        Falls back to copying file by file if the chosen method fails (for example a
+        hardlink across filesystems).
+
+        Args:
+        files (dict): Index returned by add_directory
+        target_dir (str): Package directory to create
+        method (str): 'reflink', 'hardlink' or 'copy'
+        """
+        if os.path.islink(target_dir):
+            os.unlink(target_dir)
+        elif os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        os.makedirs(target_dir)
+
+        linker = _LINKERS[method]
+        for relative_path, entry in files.items():
+            dst = os.path.join(target_dir, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            src = self.file_path(entry['digest'])
+            try:
+                linker(src, dst)
+            except OSError:
+                _copy(src, dst)
+            if method == 'copy':
+                os.chmod(dst, 0o755 if entry.get('executable') else 0o644)
@@ -1,38 +1,80 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
+import shutil
 import time
 
-from src.cache_manager import CacheManager
-from src.lock_file_manager import LockFileManager
+from src.cache_manager import CacheManager, format_size, get_default_cache_dir
+from src.lock_file_manager import LockFileError, LockFileManager
+from src.install_state import InstallState
 from src.installation_animator import InstallationAnimator
+from src.layout_planner import plan_layout
 from src.package_validator import PackageValidator
 import src.dependency_visualizer as visualizer
 from src.utils.file_operations import create_directory, read_package_json
-from src.utils.npm_api import download_package, fetch_package_info, get_latest_satisfying_version
+from src.utils.tarball import dist_integrity
+from src.utils.npm_api import (OfflineError, configure_concurrency, configure_packument_cache, configure_registry,
+                               download_package, fetch_package_info, get_client_stats, get_concurrency_stats,
+                               get_latest_satisfying_version, get_packument_cache_stats)
+from src.utils.profiler import configure_profiler, get_profiler
+from src.utils.registry_client import AdaptiveLimit
+from src.utils.registry_config import load_registry_config
+
+# Registry requests of each kind in flight at the start; the adaptive limits grow it up to jobs
+INITIAL_CONCURRENCY = 8
+
+
+class InstallError(Exception):
+    """Raised when packages could not be resolved or installed, instead of leaving a partial tree."""
 
 
 class DependencyResolver:
-    def __init__(self, package_json_path, node_modules_path):
+    def __init__(self, package_json_path, node_modules_path, jobs=1, link_method='auto', cache_max_size=None,
+                 progress='fancy', network_mode='online', profiler=None, fetch_timeout=None):
         self.package_json_path = package_json_path
         self.node_modules_path = node_modules_path
+        self.jobs = jobs
         self.resolved_dependencies = OrderedDict()
         self.installed_packages = set()
         self.top_level_packages = OrderedDict()
-        self.cache_manager = CacheManager(os.path.join(os.path.dirname(node_modules_path), '.package_cache'))
+        self.package_json = None  # package.json the graph was resolved from
+        self.cache_manager = CacheManager(get_default_cache_dir(),
+                                          link_method=link_method, max_size=cache_max_size)
+        configure_packument_cache(os.path.join(self.cache_manager.cache_dir, 'metadata'))
+        configure_profiler(profiler)
+        self.profiler = get_profiler()
+        registry_config = load_registry_config(os.path.dirname(package_json_path))
+        if fetch_timeout is not None:
+            registry_config.fetch_timeout = fetch_timeout
+        configure_registry(registry_config, network_mode)
+        initial = min(INITIAL_CONCURRENCY, max(1, jobs))
+        configure_concurrency(AdaptiveLimit(initial=initial, max_limit=max(1, jobs)),
+                              AdaptiveLimit(initial=initial, max_limit=max(1, jobs), latency_tolerance=None))
         self.lock_file_manager = LockFileManager(os.path.dirname(package_json_path))
         self.resolution_stack = set()
         self.resolution_order = []  # To maintain the order for circular dependency reporting
-        self.package_validator = PackageValidator(node_modules_path)
-        self.animator = InstallationAnimator()
+        self.package_validator = PackageValidator(node_modules_path, jobs=max(1, jobs))
+        self.install_state = InstallState(node_modules_path)
+        self.animator = InstallationAnimator(progress)
         self.installation_order = []
+        self._version_cache = {}  # (package, version_req) -> resolved version
+        self._info_cache = {}  # (package, version) -> registry package info
+        self.locked_packages = {}  # (package, version) -> package info recorded in the lock file
+        self.package_dists = {}  # (package, version) -> registry 'dist' (tarball URL, integrity)
+        self._downloaded = {}  # (package, version) -> result of a pipelined download
+        self._fresh = set()  # packages downloaded, integrity-checked and cached in this run
+        self.expanded_packages = set()  # nodes whose sub-dependencies have been resolved
+        self.resolution_stats = {'expanded': 0, 'reused': 0}
+        self.failures = OrderedDict()  # 'package@version' -> why it could not be resolved or installed
+        self._client_stats_start = get_client_stats()
 
     def resolve_and_install_dependencies(self, specific_packages=None, visualize=True, force_visualize=False):
-        package_json = read_package_json(self.package_json_path)
+        package_json = self.package_json = read_package_json(self.package_json_path)
         dependencies = package_json.get('dependencies', {})
         dev_dependencies = package_json.get('devDependencies', {})
 
         if self.lock_file_manager.is_lock_file_current(self.package_json_path) and not specific_packages:
-            print("Lock file is up to date. Using locked versions.")
+            self.animator.log("Lock file is up to date. Using locked versions.")
             locked_dependencies = self.lock_file_manager.read_lock_file()['dependencies']
             dependencies_to_install = OrderedDict(locked_dependencies)
         else:
@@ -42,15 +84,15 @@ class DependencyResolver:
                     dependencies.get(pkg) or dev_dependencies.get(pkg))
                 if len(dependencies_to_install) != len(specific_packages):
                     missing = [pkg for pkg in specific_packages if pkg not in dependencies_to_install]
-                    print(f"Warning: The following packages are not in package.json: {', '.join(missing)}")
+                    self.animator.warn(f"Warning: The following packages are not in package.json: {', '.join(missing)}")
             else:
                 dependencies_to_install = OrderedDict(dependencies)
                 dependencies_to_install.update(dev_dependencies)
 
         self.resolve_dependencies(dependencies_to_install)
-        self.install_resolved_dependencies()
+        self.install_resolved_dependencies(prune=not specific_packages)
 
-        if visualize:
+        if visualize and self.animator.mode == 'fancy':
             node_count = self.count_tree_nodes()
             if visualizer.should_visualize(node_count, force_visualize):
                 print("\nVisualization of installed packages:")
@@ -63,25 +105,101 @@ class DependencyResolver:
 
     def resolve_dependencies(self, dependencies):
         lock_file = self.lock_file_manager.read_lock_file()
+        if lock_file:
+            self.locked_packages = self.lock_file_manager.get_locked_package_info(lock_file)
+        roots = []
         for package, version_req in dependencies.items():
             if lock_file and package in lock_file['dependencies']:
-                locked_version = lock_file['dependencies'][package]['version']
-                self.resolve_package(package, locked_version, is_top_level=True, use_locked=True)
+                roots.append((package, lock_file['dependencies'][package]['version'], True))
             else:
-                self.resolve_package(package, version_req, is_top_level=True)
+                roots.append((package, version_req, False))
+
+        self.animator.start_phase('resolve')
+        with self.profiler.span('resolve', 'phase', packages=len(roots)):
+            if self.jobs > 1:
+                with self.profiler.span('prefetch metadata', 'phase'):
+                    self.prefetch_metadata(roots)
+
+            for package, version_req, use_locked in roots:
+                self.resolve_package(package, version_req, is_top_level=True, use_locked=use_locked)
+        self.animator.finish_phase('resolve')
+        if self.failures:
+            raise InstallError(f"Could not resolve {self._describe_failures()}")
+
+        self.animator.log(f"Resolved {len(self.resolved_dependencies)} packages "
+                          f"({self.resolution_stats['expanded']} expanded, "
+                          f"{self.resolution_stats['reused']} reused)")
+
+    def prefetch_metadata(self, roots):
+        """
+        Fetch registry metadata for the whole graph breadth-first on a worker pool.
+
+        Every (package, version requirement) pair of a level is looked up concurrently and
+        the next level is built from the dependencies that came back, so wall-clock time
+        grows with tree depth rather than node count. resolve_package then replays the
+        depth-first walk against the warmed caches, which keeps resolved_dependencies and
+        parent sets identical to a sequential resolve. Failures are left for that replay
+        to report.
+
+        Args:
+        roots (list): (package, version_req, use_locked) tuples for the top-level dependencies
+        """
+        seen = set()
+        frontier = roots
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while frontier:
+                futures = []
+                for package, version_req, use_locked in frontier:
+                    if (package, version_req, use_locked) in seen:
+                        continue
+                    seen.add((package, version_req, use_locked))
+                    futures.append(executor.submit(self._prefetch_one, package, version_req, use_locked))
+
+                frontier = []
+                for future in futures:
+                    try:
+                        sub_dependencies = future.result()
+                    except Exception:
+                        continue
+                    frontier.extend((sub_package, sub_version_req, False)
+                                    for sub_package, sub_version_req in sub_dependencies.items())
+
+    def _prefetch_one(self, package, version_req, use_locked):
+        version = self._get_version(package, version_req, use_locked)
+        return self._get_package_info(package, version).get('dependencies', {})
+
+    def _get_version(self, package, version_req, use_locked=False):
+        key = (package, version_req)
+        if use_locked or key in self.locked_packages:
+            return version_req
+        if key not in self._version_cache:
+            self._version_cache[key] = get_latest_satisfying_version(package, version_req)
+        return self._version_cache[key]
+
+    def _get_package_info(self, package, version):
+        key = (package, version)
+        if key not in self._info_cache:
+            self._info_cache[key] = self.locked_packages.get(key) or fetch_package_info(package, version)
+        return self._info_cache[key]
 
     def resolve_package(self, package, version_req, parent=None, is_top_level=False, use_locked=False):
+        key = None
         try:
-            if use_locked:
-                version = version_req
-            else:
-                version = get_latest_satisfying_version(package, version_req)
+            version = self._get_version(package, version_req, use_locked)
             key = (package, version)
 
             # Check for circular dependencies
             if key in self.resolution_stack:
                 cycle = self.resolution_order[self.resolution_order.index(key):] + [key]
-                print(f"Warning: Circular dependency detected: {' -> '.join([f'{p}@{v}' for p, v in cycle])}")
+                self.animator.warn(f"Warning: Circular dependency detected: "
+                                   f"{' -> '.join([f'{p}@{v}' for p, v in cycle])}")
+                return
+
+            # A fully expanded subtree only needs the new parent edge
+            if key in self.expanded_packages:
+                if parent:
+                    self.resolved_dependencies[key].add(parent)
+                self.resolution_stats['reused'] += 1
                 return
 
             self.resolution_stack.add(key)
@@ -96,76 +214,306 @@ class DependencyResolver:
                 self.resolved_dependencies[key].add(parent)
 
             # Fetch package info to get its dependencies
-            package_info = fetch_package_info(package, version)
+            package_info = self._get_package_info(package, version)
+            self.package_dists[key] = package_info.get('dist', {})
             sub_dependencies = package_info.get('dependencies', {})
 
             # Recursively resolve sub-dependencies
             for sub_package, sub_version_req in sub_dependencies.items():
                 self.resolve_package(sub_package, sub_version_req, parent=key)
 
+            self.expanded_packages.add(key)
+            self.resolution_stats['expanded'] += 1
+            self.animator.advance('resolve', package, version)
             self.resolution_stack.remove(key)
             self.resolution_order.pop()
 
+        except OfflineError:
+            raise
         except Exception as e:
-            print(f"Error resolving {package}@{version_req}: {str(e)}")
+            self.failures.setdefault(f"{package}@{version_req}", str(e))
+            self.animator.warn(f"Error resolving {package}@{version_req}: {str(e)}")
             if key in self.resolution_stack:
                 self.resolution_stack.remove(key)
             if self.resolution_order and self.resolution_order[-1] == key:
                 self.resolution_order.pop()
 
-    def install_resolved_dependencies(self):
+    def install_resolved_dependencies(self, prune=True):
+        """
+        Bring node_modules in line with the resolved graph.
+
+        Args:
+        prune (bool): Whether installed packages that are no longer in the graph are removed
+
+        Raises:
+        InstallError: If any package could not be installed; the lock file is then left as it was
+        """
         create_directory(self.node_modules_path)
 
-        packages_to_install = [
-            (package, version)
-            for (package, version), parents in self.resolved_dependencies.items()
-            if (package, version) not in self.installed_packages
-        ]
+        with self.profiler.span('plan layout', 'phase'):
+            install_targets = self.plan_install_targets()
 
         start_time = time.time()
-        self.animator.animate_installation(packages_to_install)
-
-        for package, version in packages_to_install:
-            if package in self.top_level_packages and self.top_level_packages[package] == version:
-                self.install_package(package, version, self.node_modules_path)
-            else:
-                for parent in self.resolved_dependencies[(package, version)]:
-                    parent_path = os.path.join(self.node_modules_path, *parent[0].split('/'))
-                    self.install_package(package, version, os.path.join(parent_path, 'node_modules'))
+        with self.profiler.span('install', 'phase', packages=len(install_targets)):
+            installed = self.apply_install_plan(install_targets, prune=prune)
+        if self.failures:
+            raise InstallError(f"Could not install {self._describe_failures()}")
 
         total_time = time.time() - start_time
-        self.animator.show_final_message(len(packages_to_install), total_time)
+        self.animator.show_final_message(len(installed), total_time)
+        self.animator.show_cache_stats(get_packument_cache_stats())
+        self.animator.show_concurrency_stats(get_concurrency_stats())
+        self.enforce_cache_budget()
 
         # Update lock file after installation
-        self.lock_file_manager.write_lock_file(self.resolved_dependencies)
+        with self.profiler.span('write lock file', 'disk'):
+            self.lock_file_manager.write_lock_file(self.resolved_dependencies, self.top_level_packages,
+                                                   self.package_dists, install_targets=install_targets,
+                                                   root_package=self.package_json)
+
+    def apply_install_plan(self, install_targets, prune=True):
+        """
+        Install only the part of the plan that differs from what node_modules already holds.
+
+        The installed tree is recorded in node_modules/.pydep-state. Packages already in
+        place at the same path, version and integrity are left alone, stale ones are
+        removed, and everything else is downloaded or linked from the cache.
+
+        Args:
+        install_targets (list): (package, version, install_path) tuples of the desired tree
+        prune (bool): Whether recorded packages missing from the plan are removed
+
+        Returns:
+        list: (package, version) pairs that were (re)installed
+        """
+        state = self.install_state.load()
+        integrities = {key: dist_integrity(dist) for key, dist in self.package_dists.items()}
+        to_install, to_remove, unchanged = state.diff(install_targets, integrities, prune=prune)
+
+        if to_remove:
+            state.remove(to_remove)
+            self.animator.log(f"Removed {len(to_remove)} packages that are no longer needed")
+        self.installed_packages.update((package, version) for package, version, _ in unchanged)
+        if unchanged:
+            self.animator.log(f"{len(unchanged)} packages already up to date")
+
+        packages_to_install = list(OrderedDict.fromkeys((package, version) for package, version, _ in to_install))
+        if to_install:
+            self.animator.start_phase('link', total=len(to_install))
+
+        self.package_validator.set_install_plan(install_targets)
+        try:
+            # Parents are placed before the packages nested in them, since placing a
+            # package replaces its directory
+            for depth_targets in self._group_by_depth(to_install):
+                self.download_packages(depth_targets)
+                for package, version, install_path in depth_targets:
+                    if self.install_package(package, version, install_path):
+                        state.record(package, version, install_path, integrities.get((package, version)))
+                    else:
+                        # Left unrecorded, a package that failed is installed again next time
+                        state.forget(package, install_path)
+                    self.animator.advance('link', package, version)
+        finally:
+            self.package_validator.close()
+        if to_install:
+            self.animator.finish_phase('link')
+        self.package_validator.save_stamps()
+        state.save()
+        return packages_to_install
+
+    def plan_install_targets(self):
+        """
+        Lay out the resolved graph in node_modules, hoisting packages where possible.
+
+        Returns:
+        list: (package, version, install_path) tuples in install order
+        """
+        return plan_layout(self.resolved_dependencies, self.top_level_packages, self.node_modules_path)
+
+    def _group_by_depth(self, install_targets):
+        groups = OrderedDict()
+        for package, version, install_path in install_targets:
+            depth = os.path.relpath(install_path, self.node_modules_path).count('node_modules')
+            groups.setdefault(depth, []).append((package, version, install_path))
+        return [groups[depth] for depth in sorted(groups)]
+
+    def install_frozen(self):
+        """
+        Rebuild node_modules from the lock file alone, without registry metadata requests.
+
+        Tarballs are taken from the shared cache or downloaded from the locked URLs and
+        checked against the locked integrity. The lock file is left untouched.
+
+        Returns:
+        tuple: (resolved_dependencies, installation_order)
+
+        Raises:
+        LockFileError: If the lock file is missing, incomplete or out of date with
+        package.json, or a locked package could not be installed
+        """
+        graph = self.lock_file_manager.get_frozen_graph(read_package_json(self.package_json_path))
+        self.resolved_dependencies = OrderedDict(graph['resolved_dependencies'])
+        self.top_level_packages = OrderedDict(graph['top_level_packages'])
+        self.package_dists = graph['package_dists']
+        install_targets = graph['install_targets']
+        self.animator.log(f"Installing {len(self.resolved_dependencies)} packages from the lock file")
+
+        create_directory(self.node_modules_path)
+        start_time = time.time()
+        with self.profiler.span('install', 'phase', packages=len(install_targets)):
+            installed = self.apply_install_plan(install_targets)
+
+        failed = [f"{package}@{version}" for package, version in self.resolved_dependencies
+                  if (package, version) not in self.installed_packages]
+        if failed:
+            self.animator.close()
+            raise LockFileError(f"Failed to install locked packages: {', '.join(failed)}")
+
+        self.animator.show_final_message(len(installed), time.time() - start_time)
+        self.animator.show_concurrency_stats(get_concurrency_stats())
+        self.enforce_cache_budget()
+        return self.resolved_dependencies, self.installation_order
+
+    def enforce_cache_budget(self):
+        eviction = self.cache_manager.enforce_budget()
+        if eviction and eviction['evicted']:
+            self.animator.log(f"Cache over budget: evicted {eviction['evicted']} packages "
+                              f"({format_size(eviction['freed_bytes'])})")
+
+    def download_packages(self, install_targets):
+        """
+        Download every uncached package of the install plan on a bounded worker pool.
+
+        Tarball URLs come from the dist metadata recorded during resolution, so no
+        package metadata is fetched again. Each package is downloaded once, into the
+        first location it is installed at; install_package picks up the results.
+
+        Args:
+        install_targets (list): (package, version, install_path) tuples in install order
+        """
+        pending = OrderedDict()
+        for package, version, install_path in install_targets:
+            key = (package, version)
+            if key in pending or key in self.installed_packages or self.cache_manager.is_cached(package, version):
+                continue
+            pending[key] = os.path.join(install_path, package)
+
+        if not pending:
+            return
+
+        self.animator.start_phase('download', total=len(pending))
+        with self.profiler.span('download packages', 'phase', packages=len(pending)), \
+                ThreadPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            futures = OrderedDict(
+                (key, executor.submit(self._fetch_package, key[0], key[1], target))
+                for key, target in pending.items()
+            )
+            for (package, version), future in futures.items():
+                try:
+                    self._downloaded[(package, version)] = future.result()
+                except OfflineError:
+                    raise
+                except Exception as e:
+                    self.failures.setdefault(f"{package}@{version}", str(e))
+                    self.animator.warn(f"Error downloading {package}@{version}: {str(e)}")
+                    self._downloaded[(package, version)] = False
+                self.animator.advance('download', package, version)
+        self.animator.finish_phase('download')
+
+    def _fetch_package(self, package, version, package_install_path):
+        """
+        Place a package at package_install_path and make sure it is in the shared cache.
+
+        The per-package cache lock makes concurrent installs on the same host wait for
+        each other instead of downloading the same tarball twice; whoever gets the lock
+        second finds the package cached and links it from the store. A package evicted
+        by another process after it was found cached is downloaded again. Downloads are
+        extracted into a staging directory the store takes the files from, and placed
+        from the store like a cache hit.
+        """
+        with self.cache_manager.package_lock(package, version):
+            if self._link_package(package, version, package_install_path):
+                return True
+            self.profiler.count('package_cache_misses')
+            source = self._download_source((package, version))
+            staging_dir = self.cache_manager.staging_path(package, version)
+            try:
+                if not download_package(package, version, staging_dir, on_bytes=self.animator.add_bytes, **source):
+                    return False
+                with self.profiler.span('cache store', 'disk', package=f"{package}@{version}"):
+                    self.cache_manager.import_package(package, version, staging_dir, package_install_path,
+                                                      integrity=source['integrity'])
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+            self._fresh.add((package, version))
+            return True
+
+    def _link_package(self, package, version, package_install_path):
+        with self.profiler.span('link', 'disk', package=f"{package}@{version}"):
+            linked = self.cache_manager.materialize_package(package, version, package_install_path)
+        if linked:
+            self.profiler.count('package_cache_hits')
+        return linked
+
+    def _download_source(self, key):
+        dist = self.package_dists.get(key, {})
+        return {'tarball_url': dist.get('tarball'), 'integrity': dist_integrity(dist)}
 
     def install_package(self, package, version, install_path):
+        key = (package, version)
         package_install_path = os.path.join(install_path, package)
-        if (package, version) not in self.installed_packages:
-            cached_path = self.cache_manager.get_cached_package(package, version)
-            if cached_path:
-                print(f"Installing {package}@{version} from cache")
-                os.makedirs(os.path.dirname(package_install_path), exist_ok=True)
-                os.symlink(cached_path, package_install_path)
-                self.installed_packages.add((package, version))
-            elif download_package(package, version, package_install_path):
-                print(f"Successfully installed {package}@{version} in {install_path}")
-                self.installed_packages.add((package, version))
-                # Cache the newly downloaded package
-                self.cache_manager.cache_package(package, version, package_install_path)
-            else:
-                print(f"Failed to install {package}@{version}")
-                return False
+        if key in self._downloaded:
+            installed = self._downloaded.pop(key)
+        else:
+            try:
+                installed = self._fetch_package(package, version, package_install_path)
+            except OfflineError:
+                raise
+            except Exception as e:
+                self.failures.setdefault(f"{package}@{version}", str(e))
+                installed = False
 
-            # Verify the installation
-            if not self.package_validator.verify_package_installation(package, version):
-                print(f"Warning: Verification failed for {package}@{version}")
-                # You might want to implement some recovery or cleanup logic here
-                return False
+        if not installed:
+            self.failures.setdefault(f"{package}@{version}", "download failed")
+            self.animator.warn(f"Failed to install {package}@{version}")
+            return False
 
-            self.installation_order.append((package, version))
+        # Further locations of a verified package only need to be placed
+        if key in self.installed_packages:
+            return True
 
+        # Verify the installation. The cache entry of a fresh download was hashed from the
+        # very files just checked against the tarball's integrity, so hashing them again
+        # could not find anything
+        expected = None if key in self._fresh else self.cache_manager.get_package_entry(package, version)
+        integrity = dist_integrity(self.package_dists.get(key, {}))
+        with self.profiler.span('validate', 'disk', package=f"{package}@{version}"):
+            errors = self.package_validator.check_package(package, version, package_install_path, expected,
+                                                          integrity, parallel=True)
+        if errors:
+            self.failures.setdefault(f"{package}@{version}", '; '.join(errors))
+            self.animator.warn(f"Warning: Verification failed for {package}@{version}: {'; '.join(errors)}")
+            return False
+
+        self.installed_packages.add(key)
+        self.installation_order.append((package, version))
         return True
 
+    def record_profile_counters(self):
+        """Add the registry client and metadata cache counters of this install to the profiler."""
+        start = self._client_stats_start
+        client = {name: value - start[name] for name, value in get_client_stats().items()}
+        cache = get_packument_cache_stats()
+        self.profiler.set_counters(http_requests=client['requests'], http_retries=client['retries'],
+                                   coalesced_requests=client['coalesced'],
+                                   packument_cache_hits=cache['hits'],
+                                   packument_cache_revalidated=cache['revalidated'],
+                                   packument_cache_misses=cache['misses'])
+
+    def _describe_failures(self):
+        details = '; '.join(f"{package}: {reason}" for package, reason in self.failures.items())
+        return f"{len(self.failures)} package(s): {details}"
+
     def count_tree_nodes(self):
         return len(self.resolved_dependencies)
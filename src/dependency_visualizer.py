@@ -1,37 +1,308 @@
+import json
 import os
+import sys
 
+from src.cache_manager import format_size
 
-def visualize_installation_tree(node_modules_path):
-    def _visualize(path, prefix=""):
-        dirs = [d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
-        for i, dir in enumerate(sorted(dirs)):
-            is_last = i == len(dirs) - 1
-            print(f"{prefix}{'└── ' if is_last else '├── '}{dir}")
-            _visualize(os.path.join(path, dir), prefix + ('    ' if is_last else '│   '))
+EXPORT_FORMATS = ('json', 'dot', 'edges')
 
-    print("Installation Tree:")
-    _visualize(node_modules_path)
 
+def _list_packages(node_modules_dir):
+    """
+    List the packages directly inside a node_modules directory, including scoped ones.
 
-def visualize_dependency_tree(resolved_dependencies):
-    def _visualize(package, version, depth=0, is_last=True):
-        prefix = "  " * (depth - 1) + ("└── " if is_last else "├── ") if depth > 0 else ""
-        print(f"{prefix}{package}@{version}")
+    Returns:
+    list: (name, path) pairs sorted by name; dot-directories such as .bin are skipped
+    """
+    packages = []
+    try:
+        with os.scandir(node_modules_dir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+                if entry.name.startswith('@'):
+                    with os.scandir(entry.path) as scoped:
+                        packages.extend((f"{entry.name}/{sub.name}", sub.path) for sub in scoped
+                                        if sub.is_dir() and not sub.name.startswith('.'))
+                else:
+                    packages.append((entry.name, entry.path))
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    return sorted(packages)
 
-        children = [(sub_pkg, sub_ver) for (sub_pkg, sub_ver), parents in resolved_dependencies.items() if
-                    (package, version) in parents]
-        for i, (sub_pkg, sub_ver) in enumerate(children):
-            _visualize(sub_pkg, sub_ver, depth + 1, is_last=(i == len(children) - 1))
 
-    print("Dependency Tree:")
-    roots = [(pkg, ver) for (pkg, ver), parents in resolved_dependencies.items() if not parents]
-    for i, (pkg, ver) in enumerate(roots):
-        _visualize(pkg, ver, is_last=(i == len(roots) - 1))
+def _package_size(package_path):
+    """Count the files and bytes of a package, not descending into its node_modules or symlinks."""
+    files = 0
+    total_bytes = 0
+    stack = [package_path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not (directory == package_path and entry.name == 'node_modules'):
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files += 1
+                        total_bytes += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    return files, total_bytes
+
+
+def walk_installation_tree(node_modules_path, sizes=False):
+    """
+    Walk the packages installed under node_modules without recursion.
+
+    Only package boundaries are visited: the packages of each node_modules directory
+    and, below each package, its own node_modules. Package sources are never listed.
+    A directory reached twice (for example through a symlink) is reported once and
+    not entered again, which also breaks symlink cycles.
+
+    Args:
+    node_modules_path (str): Top-level node_modules directory
+    sizes (bool): Also count each package's files and bytes
+
+    Yields:
+    dict: 'name', 'path', 'depth', 'is_last', 'prefix', 'repeated' and, with sizes,
+    'files' and 'bytes'
+    """
+    seen = set()
+    stack = []
+
+    def push_children(node_modules_dir, depth, prefix):
+        packages = _list_packages(node_modules_dir)
+        for i in reversed(range(len(packages))):
+            name, path = packages[i]
+            stack.append((name, path, depth, prefix, i == len(packages) - 1))
+
+    push_children(node_modules_path, 0, '')
+    while stack:
+        name, path, depth, prefix, is_last = stack.pop()
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        identity = (st.st_dev, st.st_ino)
+        node = {'name': name, 'path': path, 'depth': depth, 'is_last': is_last, 'prefix': prefix,
+                'repeated': identity in seen}
+        if not node['repeated']:
+            seen.add(identity)
+            if sizes:
+                node['files'], node['bytes'] = _package_size(path)
+        yield node
+        if not node['repeated']:
+            push_children(os.path.join(path, 'node_modules'), depth + 1,
+                          prefix + ('    ' if is_last else '│   '))
+
+
+def visualize_installation_tree(node_modules_path, sizes=False, out=None):
+    """
+    Print the packages installed under node_modules as a tree.
+
+    Args:
+    node_modules_path (str): Top-level node_modules directory
+    sizes (bool): Show file counts and sizes per package and in total
+    out: Text stream to write to (default: stdout)
+
+    Returns:
+    dict: 'packages', plus 'files' and 'bytes' totals when sizes is set
+    """
+    out = out or sys.stdout
+    out.write("Installation Tree:\n")
+    summary = {'packages': 0, 'files': 0, 'bytes': 0}
+    for node in walk_installation_tree(node_modules_path, sizes=sizes):
+        line = f"{node['prefix']}{'└── ' if node['is_last'] else '├── '}{node['name']}"
+        if node['repeated']:
+            line += " (already listed)"
+        else:
+            summary['packages'] += 1
+            if sizes:
+                summary['files'] += node['files']
+                summary['bytes'] += node['bytes']
+                line += f" ({node['files']} files, {format_size(node['bytes'])})"
+        out.write(line + '\n')
+
+    if sizes:
+        out.write(f"{summary['packages']} packages, {summary['files']} files, {format_size(summary['bytes'])}\n")
+        return summary
+    out.write(f"{summary['packages']} packages\n")
+    return {'packages': summary['packages']}
+
+
+def _node_id(key):
+    return f"{key[0]}@{key[1]}"
+
+
+class DependencyIndex:
+    """
+    Child adjacency of a resolved graph, built once in O(nodes + edges).
+
+    Args:
+    resolved_dependencies (dict): (package, version) -> set of parent (package, version)
+    """
+
+    def __init__(self, resolved_dependencies):
+        self.parents = {key: set(parents) for key, parents in resolved_dependencies.items()}
+        self.children = {key: [] for key in resolved_dependencies}
+        for key, parents in resolved_dependencies.items():
+            for parent in parents:
+                self.children.setdefault(parent, []).append(key)
+        for children in self.children.values():
+            children.sort()
+        self.roots = self._find_roots()
+
+    def _find_roots(self):
+        roots = [key for key, parents in self.parents.items() if not parents]
+        # Components that are only cycles have no parentless node; start them anywhere
+        reached = self.reachable(roots)
+        for key in self.children:
+            if key not in reached:
+                roots.append(key)
+                reached |= self.reachable([key])
+        return roots
+
+    def reachable(self, starts, edges=None):
+        """Return every node reachable from starts, following children (or the given edge map)."""
+        edges = self.children if edges is None else edges
+        seen = set(starts)
+        stack = list(starts)
+        while stack:
+            for neighbour in edges.get(stack.pop(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return seen
+
+    def find(self, focus):
+        """Return the nodes matching 'name' or 'name@version'."""
+        return [key for key in self.children if focus in (key[0], _node_id(key))]
+
+    def focus_nodes(self, focus):
+        """Nodes on some path to or below the focused package."""
+        matches = self.find(focus)
+        return self.reachable(matches, self.parents) | self.reachable(matches)
+
+
+def iter_tree_lines(index, depth=None, focus=None):
+    """
+    Yield the lines of a dependency tree without recursion.
+
+    Subtrees already printed are shown once and then marked '(deduped)', and
+    dependencies on an ancestor are marked '(circular)', so output stays linear
+    in the size of the graph.
+
+    Args:
+    index (DependencyIndex): Graph to render
+    depth (int): Deepest level to print; roots are level 0 (default: unlimited)
+    focus (str): Only show paths leading to and below this package ('name' or 'name@version')
+
+    Yields:
+    str: One rendered line per node
+    """
+    allowed = index.focus_nodes(focus) if focus else None
+    roots = [key for key in index.roots if allowed is None or key in allowed]
+
+    expanded = set()
+    on_path = set()  # nodes on the path from the root to the current node
+    # (node, level, prefix, is_last); None marks leaving the node on top of path
+    stack = [(key, 0, '', i == len(roots) - 1) for i, key in reversed(list(enumerate(roots)))]
+    path = []
+    while stack:
+        entry = stack.pop()
+        if entry is None:
+            on_path.discard(path.pop())
+            continue
+        key, level, prefix, is_last = entry
+        connector = ('└── ' if is_last else '├── ') if level > 0 else ''
+        children = [child for child in index.children.get(key, ()) if allowed is None or child in allowed]
+
+        if key in on_path:
+            yield f"{prefix}{connector}{_node_id(key)} (circular)"
+            continue
+        if key in expanded and children:
+            yield f"{prefix}{connector}{_node_id(key)} (deduped)"
+            continue
+        yield f"{prefix}{connector}{_node_id(key)}"
+        expanded.add(key)
+
+        if depth is not None and level >= depth:
+            continue
+        on_path.add(key)
+        path.append(key)
+        stack.append(None)
+        child_prefix = prefix + (('    ' if is_last else '│   ') if level > 0 else '')
+        for i in reversed(range(len(children))):
+            stack.append((children[i], level + 1, child_prefix, i == len(children) - 1))
+
+
+def visualize_dependency_tree(resolved_dependencies, depth=None, focus=None, out=None):
+    """
+    Print the dependency tree, streaming one line at a time.
+
+    Args:
+    resolved_dependencies (dict): (package, version) -> set of parent (package, version)
+    depth (int): Deepest level to print (default: unlimited)
+    focus (str): Only show paths leading to and below this package
+    out: Text stream to write to (default: stdout)
+    """
+    out = out or sys.stdout
+    out.write("Dependency Tree:\n")
+    for line in iter_tree_lines(DependencyIndex(resolved_dependencies), depth=depth, focus=focus):
+        out.write(line + '\n')
+
+
+def export_dependency_graph(resolved_dependencies, fmt, out=None, focus=None):
+    """
+    Write the resolved graph in a machine-readable format.
+
+    Formats:
+    - 'json': {"nodes": [{"id", "name", "version"}], "edges": [[parent, child]]}
+    - 'dot': a Graphviz digraph
+    - 'edges': one 'parent<TAB>child' line per edge, for graph tools that read edge lists
+
+    Args:
+    resolved_dependencies (dict): (package, version) -> set of parent (package, version)
+    fmt (str): One of EXPORT_FORMATS
+    out: Text stream to write to (default: stdout)
+    focus (str): Only export nodes on a path to or below this package
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    out = out or sys.stdout
+    index = DependencyIndex(resolved_dependencies)
+    nodes = index.focus_nodes(focus) if focus else None
+    keys = [key for key in index.children if nodes is None or key in nodes]
+
+    def edges():
+        for parent in keys:
+            for child in index.children[parent]:
+                if nodes is None or child in nodes:
+                    yield _node_id(parent), _node_id(child)
+
+    if fmt == 'json':
+        json.dump({
+            'nodes': [{'id': _node_id(key), 'name': key[0], 'version': key[1]} for key in keys],
+            'edges': [list(edge) for edge in edges()],
+        }, out, indent=2)
+        out.write('\n')
+    elif fmt == 'dot':
+        out.write('digraph dependencies {\n')
+        for key in keys:
+            out.write(f'  {json.dumps(_node_id(key))};\n')
+        for parent, child in edges():
+            out.write(f'  {json.dumps(parent)} -> {json.dumps(child)};\n')
+        out.write('}\n')
+    else:
+        for parent, child in edges():
+            out.write(f'{parent}\t{child}\n')
 
 
 def should_visualize(node_count, force_visualize=False):
     if node_count > 30 and not force_visualize:
         print(f"\nWarning: Large dependency tree detected ({node_count} nodes). Visualization disabled.")
-        print("Use --force-visualize to override this behavior.")
+        print("Use --force-visualize to override this behavior, or 'tree --depth N' to inspect part of it.")
         return False
     return True
@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+
+from src.utils.file_operations import atomic_write_json
+
+STATE_FILE_NAME = '.pydep-state'
+STATE_VERSION = 1
+
+
+class InstallState:
+    """
+    Record of the packages currently in place under node_modules.
+
+    Entries are keyed by the package directory relative to node_modules (e.g.
+    'a' or 'a/node_modules/b') and hold the name, version and integrity that
+    was installed there. Comparing the desired install plan against this record
+    lets an install touch only the packages that changed.
+    """
+
+    def __init__(self, node_modules_path):
+        self.node_modules_path = node_modules_path
+        self.state_path = os.path.join(node_modules_path, STATE_FILE_NAME)
+        self.packages = {}
+
+    def load(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.packages = data.get('packages', {}) if data.get('version') == STATE_VERSION else {}
+        return self
+
+    def save(self):
+        os.makedirs(self.node_modules_path, exist_ok=True)
+        atomic_write_json(self.state_path, {'version': STATE_VERSION, 'packages': self.packages})
+
+    def relative_path(self, package, install_path):
+        relative = os.path.relpath(os.path.join(install_path, package), self.node_modules_path)
+        return relative.replace(os.sep, '/')
+
+    def record(self, package, version, install_path, integrity=None):
+        self.packages[self.relative_path(package, install_path)] = {
+            'name': package, 'version': version, 'integrity': integrity,
+        }
+
+    def forget(self, package, install_path):
+        """Drop the record of a package directory, e.g. one whose install failed."""
+        self.packages.pop(self.relative_path(package, install_path), None)
+
+    def diff(self, install_targets, integrities, prune=True):
+        """
+        Compare the desired install plan with what is recorded as installed.
+
+        Args:
+        install_targets (list): (package, version, install_path) tuples of the desired tree
+        integrities (dict): (package, version) -> expected integrity, if known
+        prune (bool): Whether recorded packages missing from the plan should be removed
+
+        Returns:
+        tuple: (targets to install, relative paths to remove, unchanged targets)
+        """
+        desired = {}
+        for package, version, install_path in install_targets:
+            desired[self.relative_path(package, install_path)] = (package, version, install_path)
+
+        to_remove = []
+        for path, entry in self.packages.items():
+            if path in desired:
+                package, version, _ = desired[path]
+                if self._matches(entry, package, version, integrities.get((package, version))):
+                    continue
+                to_remove.append(path)
+            elif prune:
+                to_remove.append(path)
+
+        stale = set(to_remove)
+        stale.update(path for path in desired
+                     if path not in self.packages or not os.path.isdir(os.path.join(self.node_modules_path, path)))
+        # Replacing a package directory also replaces whatever is nested below it
+        stale_prefixes = tuple(path + '/' for path in stale)
+        to_install = []
+        unchanged = []
+        for path in sorted(desired, key=lambda path: path.count('/')):
+            if path in stale or path.startswith(stale_prefixes):
+                to_install.append(desired[path])
+            else:
+                unchanged.append(desired[path])
+        return to_install, to_remove, unchanged
+
+    def _matches(self, entry, package, version, integrity):
+        if entry.get('name') != package or entry.get('version') != version:
+            return False
+        return integrity is None or entry.get('integrity') in (None, integrity)
+
+    def remove(self, paths):
+        """
+        Delete the given package directories and forget them.
+
+        Args:
+        paths (list): Paths relative to node_modules, as returned by diff
+        """
+        paths = set(paths)
+        removed_prefixes = tuple(path + '/' for path in paths)
+        for path in sorted(paths, key=len):
+            shutil.rmtree(os.path.join(self.node_modules_path, *path.split('/')), ignore_errors=True)
+        self.packages = {
+            path: entry for path, entry in self.packages.items()
+            if path not in paths and not path.startswith(removed_prefixes)
+        }
@@ -1,52 +1,195 @@
+import json
+import sys
+import threading
 import time
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
+from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, MofNCompleteColumn
 from rich.panel import Panel
 from rich.text import Text
 
+from src.cache_manager import format_size
+
+PROGRESS_MODES = ('fancy', 'quiet', 'ndjson')
+
+PHASE_LABELS = {
+    'resolve': 'Resolving',
+    'download': 'Downloading',
+    'link': 'Installing',
+}
+
+# Minimum seconds between two byte-count updates sent to the renderer
+RENDER_INTERVAL = 0.1
+
 
 class InstallationAnimator:
-    def __init__(self):
-        self.console = Console()
+    """
+    Reports install progress from the events the resolver and downloader emit.
+
+    Modes:
+    - 'fancy': rich progress bars, redrawn at most ten times a second
+    - 'quiet': no output except warnings, which go to stderr
+    - 'ndjson': one JSON object per event on the output stream, for dashboards
 
-    def animate_installation(self, packages):
-        total_packages = len(packages)
+    Every method is safe to call from download worker threads.
+    """
 
-        with Progress(
+    def __init__(self, mode='fancy', stream=None):
+        if mode not in PROGRESS_MODES:
+            raise ValueError(f"Unknown progress mode: {mode}")
+        self.mode = mode
+        self.stream = stream or sys.stdout
+        self.console = Console(file=self.stream, quiet=(mode != 'fancy'))
+        self._lock = threading.Lock()
+        self._progress = None
+        self._tasks = {}  # phase -> rich task id
+        self._bytes = 0
+        self._bytes_reported_at = 0.0
+
+    def _emit(self, event, **fields):
+        line = json.dumps({'ts': round(time.time(), 3), 'event': event, **fields})
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def _get_progress(self):
+        if self._progress is None:
+            self._progress = Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
                 BarColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                console=self.console
-        ) as progress:
-            overall_task = progress.add_task("[green]Installing packages", total=total_packages)
-
-            for package, version in packages:
-                package_task = progress.add_task(f"[cyan]Installing {package}@{version}", total=100)
-
-                # Simulate installation steps
-                for i in range(100):
-                    time.sleep(0.01)  # Simulate some work
-                    progress.update(package_task, advance=1)
-
-                progress.update(overall_task, advance=1)
-
-                # Show a fun message when a package is installed
-                self.show_package_installed_message(package, version)
-
-    def show_package_installed_message(self, package, version):
-        messages = [
-            f"🎉 Woohoo! {package}@{version} is ready to rock!",
-            f"🚀 {package}@{version} has landed successfully!",
-            f"🌟 {package}@{version} is now sparkling in your project!",
-            f"🎊 Pop the champagne! {package}@{version} is installed!",
-            f"🏆 Victory! {package}@{version} is now part of the team!"
-        ]
-        message = Text(messages[hash(package) % len(messages)])
-        self.console.print(Panel(message, border_style="green", expand=False))
+                MofNCompleteColumn(),
+                TextColumn("{task.fields[detail]}"),
+                console=self.console,
+                refresh_per_second=10,
+            )
+            self._progress.start()
+        return self._progress
+
+    def start_phase(self, phase, total=None):
+        """
+        Announce a phase, or add to the total of one already running.
+
+        Args:
+        phase (str): 'resolve', 'download' or 'link'
+        total (int): Number of steps, if known
+        """
+        if self.mode == 'ndjson':
+            self._emit('phase_start', phase=phase, total=total)
+        elif self.mode == 'fancy':
+            with self._lock:
+                progress = self._get_progress()
+                if phase in self._tasks:
+                    task = progress.tasks[self._tasks[phase]]
+                    if total is not None:
+                        progress.update(self._tasks[phase], total=(task.total or 0) + total)
+                else:
+                    self._tasks[phase] = progress.add_task(
+                        f"[cyan]{PHASE_LABELS.get(phase, phase)}", total=total, detail='')
+
+    def advance(self, phase, package=None, version=None):
+        """
+        Record one finished step of a phase, e.g. one resolved or installed package.
+
+        Args:
+        phase (str): Phase the step belongs to
+        package (str): Package the step was about
+        version (str): Version of that package
+        """
+        if self.mode == 'ndjson':
+            self._emit('progress', phase=phase, package=package, version=version)
+        elif self.mode == 'fancy':
+            progress = self._progress
+            if progress is not None and phase in self._tasks:
+                progress.update(self._tasks[phase], advance=1)
+
+    def add_bytes(self, num_bytes):
+        """
+        Count downloaded bytes; the renderer is updated at most every RENDER_INTERVAL.
+
+        Args:
+        num_bytes (int): Bytes received since the last call
+        """
+        if self.mode == 'quiet':
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._bytes += num_bytes
+            if now - self._bytes_reported_at < RENDER_INTERVAL:
+                return
+            self._bytes_reported_at = now
+            total = self._bytes
+        self._report_bytes(total)
+
+    def _report_bytes(self, total):
+        if self.mode == 'ndjson':
+            self._emit('bytes', phase='download', downloaded=total)
+        else:
+            progress = self._progress
+            if progress is not None and 'download' in self._tasks:
+                progress.update(self._tasks['download'], detail=format_size(total))
+
+    def finish_phase(self, phase):
+        if self.mode == 'quiet':
+            return
+        if phase == 'download':
+            self._report_bytes(self._bytes)
+        if self.mode == 'ndjson':
+            self._emit('phase_end', phase=phase)
+            return
+        with self._lock:
+            if self._progress is not None and phase in self._tasks:
+                task = self._progress.tasks[self._tasks[phase]]
+                self._progress.update(self._tasks[phase], total=task.completed)
+
+    def log(self, message):
+        """Informational message; suppressed in quiet mode."""
+        if self.mode == 'ndjson':
+            self._emit('log', message=message)
+        elif self.mode == 'fancy':
+            self.console.print(message, markup=False, highlight=False)
+
+    def warn(self, message):
+        """Warning or error that is reported in every mode."""
+        if self.mode == 'ndjson':
+            self._emit('warning', message=message)
+        elif self.mode == 'quiet':
+            print(message, file=sys.stderr)
+        else:
+            self.console.print(message, markup=False, highlight=False)
+
+    def close(self):
+        with self._lock:
+            if self._progress is not None:
+                self._progress.stop()
+                self._progress = None
+                self._tasks = {}
 
     def show_final_message(self, total_installed, total_time):
+        self.close()
+        if self.mode == 'ndjson':
+            self._emit('done', installed=total_installed, seconds=round(total_time, 3),
+                       downloaded_bytes=self._bytes)
+            return
         message = Text(f"🎊 Installation complete! 🎊\n\n"
                        f"Installed {total_installed} packages in {total_time:.2f} seconds.\n"
                        f"Your project is now more powerful than ever!")
-        self.console.print(Panel(message, border_style="magenta", expand=False))
\ No newline at end of file
+        self.console.print(Panel(message, border_style="magenta", expand=False))
+
+    def show_cache_stats(self, stats):
+        if self.mode == 'ndjson':
+            self._emit('metadata_cache', **stats)
+            return
+        self.console.print(f"Metadata cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+                           f"{stats['misses']} misses")
+
+    def show_concurrency_stats(self, stats):
+        if self.mode == 'ndjson':
+            self._emit('concurrency', **stats)
+            return
+        parts = []
+        for kind, limit in stats.items():
+            part = f"{kind} {limit['limit']} (peak {limit['peak']} in flight"
+            if limit['decreases']:
+                part += f", backed off {limit['decreases']}x"
+            parts.append(part + ")")
+        self.console.print(f"Registry concurrency: {', '.join(parts)}")
@@ -0,0 +1,98 @@
+import os
+
+NODE_MODULES = 'node_modules'
+_NESTED = '/' + NODE_MODULES + '/'
+
+
+def _parent_dirs(path):
+    """
+    Return the node_modules directories a package at path resolves dependencies from.
+
+    Paths are relative to the top-level node_modules and use '/' separators, so
+    'a/node_modules/b' looks in 'a/node_modules/b/node_modules/', then
+    'a/node_modules/' and finally the top level ('').
+    """
+    dirs = [path + _NESTED] if path else ['']
+    while path:
+        cut = path.rfind(_NESTED)
+        path = path[:cut] if cut >= 0 else ''
+        dirs.append(path + _NESTED if path else '')
+    return dirs
+
+
+def _resolve(placements, path, name):
+    """Find where Node's module resolution would load name from, starting at path."""
+    for directory in _parent_dirs(path):
+        if directory + name in placements:
+            return directory + name
+    return None
+
+
+def plan_layout(resolved_dependencies, top_level_packages, node_modules_path):
+    """
+    Hoist every package to the highest node_modules level where it does not conflict.
+
+    Packages are placed breadth-first, starting with the top-level versions. Each
+    dependency is walked up from the package that needs it until a directory already
+    holds the same name: the same version is reused, a different version stops the
+    walk and the dependency goes one level below. A final pass nests any dependency
+    that a later placement shadowed, so every package resolves exactly the version
+    the resolver picked for it.
+
+    Args:
+    resolved_dependencies (dict): (package, version) -> set of parent (package, version)
+    top_level_packages (dict): package -> version that belongs at the top of node_modules
+    node_modules_path (str): Path to the top-level node_modules directory
+
+    Returns:
+    list: (package, version, install_path) tuples, parents before the packages nested in them
+    """
+    children = {}
+    for key, parents in resolved_dependencies.items():
+        for parent in parents:
+            children.setdefault(parent, {})[key[0]] = key
+
+    placements = {}  # relative package path -> (package, version)
+    queue = []
+    for package, version in top_level_packages.items():
+        if (package, version) in resolved_dependencies:
+            placements[package] = (package, version)
+            queue.append(package)
+
+    def place(path, dependency):
+        target = None
+        for directory in _parent_dirs(path):
+            existing = placements.get(directory + dependency[0])
+            if existing == dependency:
+                return None
+            if existing is not None:
+                break
+            target = directory + dependency[0]
+        placements[target] = dependency
+        return target
+
+    while queue:
+        next_queue = []
+        for path in queue:
+            for dependency in children.get(placements[path], {}).values():
+                placed = place(path, dependency)
+                if placed is not None:
+                    next_queue.append(placed)
+        queue = next_queue
+
+        if not queue:
+            # Hoisting can shadow a dependency an earlier package resolved further up
+            for path in sorted(placements, key=lambda p: p.count(_NESTED)):
+                for dependency in children.get(placements[path], {}).values():
+                    if placements.get(_resolve(placements, path, dependency[0])) != dependency:
+                        nested = path + _NESTED + dependency[0]
+                        placements[nested] = dependency
+                        queue.append(nested)
+
+    install_targets = []
+    for path in sorted(placements, key=lambda p: p.count(_NESTED)):
+        package, version = placements[path]
+        install_dir = path[:-len(package)].rstrip('/')
+        install_targets.append((package, version, os.path.join(node_modules_path, *install_dir.split('/'))
+                                if install_dir else node_modules_path))
+    return install_targets
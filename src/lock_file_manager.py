@@ -1,9 +1,23 @@
 import json
 import os
 
+from src.utils.npm_api import parse_package_name
+from src.utils.tarball import dist_integrity
+
+LOCKFILE_VERSION = 2
+
+
+class LockFileError(Exception):
+    """Raised when the lock file cannot be used to install or verify node_modules."""
+
+
+def _package_id(package, version):
+    return f"{package}@{version}"
+
 
 class LockFileManager:
     def __init__(self, project_root):
+        self.project_root = project_root
         self.lock_file_path = os.path.join(project_root, 'package-lock.json')
 
     def read_lock_file(self):
@@ -12,19 +26,194 @@ class LockFileManager:
                 return json.load(f)
         return None
 
-    def write_lock_file(self, resolved_dependencies):
+    def write_lock_file(self, resolved_dependencies, top_level_packages=None, package_dists=None,
+                        install_targets=None, root_package=None):
+        """
+        Write the resolved graph to package-lock.json.
+
+        Besides the top-level 'dependencies' summary, the 'packages' section records
+        every install location keyed by its path relative to the project root, with
+        the tarball URL, integrity and parent edges, so a frozen install can rebuild
+        node_modules without asking the registry anything.
+
+        Args:
+        resolved_dependencies (dict): (package, version) -> set of parent (package, version)
+        top_level_packages (dict): package -> version installed at the top of node_modules
+        package_dists (dict): (package, version) -> registry 'dist' metadata
+        install_targets (list): (package, version, install_path) tuples in install order
+        root_package (dict): Parsed package.json the graph was resolved from
+        """
+        top_level_packages = top_level_packages or {}
+        package_dists = package_dists or {}
+        root_package = root_package or {}
+
+        children = {}
+        for (package, version), parents in resolved_dependencies.items():
+            for parent in parents:
+                children.setdefault(parent, {})[package] = version
+
         lock_data = {
+            "lockfileVersion": LOCKFILE_VERSION,
+            "packages": {
+                "": {
+                    key: root_package[key] for key in ('name', 'version', 'dependencies', 'devDependencies')
+                    if key in root_package
+                }
+            },
             "dependencies": {}
         }
-        for package, info in resolved_dependencies.items():
+        for package, version in resolved_dependencies:
+            if package in lock_data["dependencies"] or top_level_packages.get(package, version) != version:
+                continue
+            dist = package_dists.get((package, version), {})
             lock_data["dependencies"][package] = {
-                "version": info["version"],
-                "dependencies": info.get("dependencies", {})
+                "version": version,
+                "resolved": dist.get("tarball"),
+                "integrity": dist_integrity(dist),
+                "dependencies": children.get((package, version), {})
+            }
+
+        for package, version, install_path in install_targets or []:
+            dist = package_dists.get((package, version), {})
+            parents = sorted(_package_id(*parent) for parent in resolved_dependencies.get((package, version), ()))
+            lock_data["packages"][self._relative_path(install_path, package)] = {
+                "name": package,
+                "version": version,
+                "resolved": dist.get("tarball"),
+                "integrity": dist_integrity(dist),
+                "dependencies": children.get((package, version), {}),
+                "requiredBy": parents,
             }
 
         with open(self.lock_file_path, 'w') as f:
             json.dump(lock_data, f, indent=2)
 
+    def _relative_path(self, install_path, package):
+        relative = os.path.relpath(os.path.join(install_path, package), self.project_root or '.')
+        return relative.replace(os.sep, '/')
+
+    def get_locked_package_info(self, lock_data):
+        """
+        Turn lock file entries into the package info shape the registry returns.
+
+        Only entries that recorded a tarball URL are returned, so packages locked by
+        older lock files are still looked up in the registry.
+
+        Args:
+        lock_data (dict): Parsed lock file
+
+        Returns:
+        dict: (package, version) -> {'version', 'dependencies', 'dist'}
+        """
+        entries = [(package, entry) for package, entry in lock_data.get('dependencies', {}).items()]
+        entries.extend((entry['name'], entry) for path, entry in lock_data.get('packages', {}).items() if path)
+
+        locked = {}
+        for package, entry in entries:
+            if not entry.get('resolved'):
+                continue
+            dist = {'tarball': entry['resolved']}
+            if entry.get('integrity'):
+                dist['integrity'] = entry['integrity']
+            locked[(package, entry['version'])] = {
+                'version': entry['version'],
+                'dependencies': entry.get('dependencies', {}),
+                'dist': dist,
+            }
+        return locked
+
+    def get_frozen_graph(self, package_json):
+        """
+        Rebuild the resolved graph and install plan from the lock file alone.
+
+        Args:
+        package_json (dict): Parsed package.json of the project
+
+        Returns:
+        dict: Graph as returned by get_locked_graph
+
+        Raises:
+        LockFileError: If the lock file is missing, predates the 'packages' section,
+        is incomplete, or package.json has changed since it was written
+        """
+        lock_data = self.read_lock_file()
+        graph = self.get_locked_graph(lock_data)
+
+        drifted = self.get_drifted_dependencies(package_json, lock_data['packages'].get('', {}))
+        if drifted:
+            raise LockFileError(f"package.json does not match the lock file: {', '.join(drifted)}")
+
+        missing = [f"{package}@{version}" for (package, version), dist in graph['package_dists'].items()
+                   if not dist['tarball'] or not dist['integrity']]
+        if missing:
+            raise LockFileError(f"Lock file has no resolved tarball or integrity for: {', '.join(missing)}")
+        return graph
+
+    def get_locked_graph(self, lock_data=None):
+        """
+        Read the resolved graph and node_modules layout recorded in the lock file.
+
+        Args:
+        lock_data (dict): Parsed lock file; read from disk if None
+
+        Returns:
+        dict: 'resolved_dependencies', 'top_level_packages', 'package_dists' and
+        'install_targets' in the shapes DependencyResolver uses
+
+        Raises:
+        LockFileError: If the lock file is missing or predates the 'packages' section
+        """
+        if lock_data is None:
+            lock_data = self.read_lock_file()
+        if lock_data is None:
+            raise LockFileError(f"No lock file found at {self.lock_file_path}")
+        packages = lock_data.get('packages')
+        if lock_data.get('lockfileVersion', 1) < LOCKFILE_VERSION or not packages:
+            raise LockFileError("Lock file does not record the resolved graph; run a regular install to upgrade it")
+
+        resolved_dependencies = {}
+        top_level_packages = {}
+        package_dists = {}
+        install_targets = []
+        node_modules_prefix = 'node_modules/'
+        for path, entry in packages.items():
+            if not path:
+                continue
+            package, version = entry['name'], entry['version']
+            key = (package, version)
+            resolved_dependencies.setdefault(key, set()).update(
+                parse_package_name(parent) for parent in entry.get('requiredBy', []))
+            package_dists[key] = {'tarball': entry.get('resolved'), 'integrity': entry.get('integrity')}
+            if path == node_modules_prefix + package:
+                top_level_packages[package] = version
+            install_dir = path[:-len(package) - 1]
+            install_targets.append((package, version, os.path.join(self.project_root, *install_dir.split('/'))))
+
+        return {
+            'resolved_dependencies': resolved_dependencies,
+            'top_level_packages': top_level_packages,
+            'package_dists': package_dists,
+            'install_targets': install_targets,
+        }
+
+    def get_drifted_dependencies(self, package_json, locked_root):
+        """
+        List the dependencies whose package.json spec differs from the one locked.
+
+        Args:
+        package_json (dict): Parsed package.json of the project
+        locked_root (dict): The lock file's root entry (packages[""])
+
+        Returns:
+        list: Names of added, removed or changed dependencies
+        """
+        drifted = []
+        for section in ('dependencies', 'devDependencies'):
+            wanted = package_json.get(section, {})
+            locked = locked_root.get(section, {})
+            drifted.extend(sorted(name for name in set(wanted) | set(locked) if wanted.get(name) != locked.get(name)))
+        return drifted
+
     def is_lock_file_current(self, package_json_path):
         if not os.path.exists(self.lock_file_path):
             return False
@@ -33,6 +222,9 @@ class LockFileManager:
         with open(package_json_path, 'r') as f:
             package_json = json.load(f)
 
+        if '' in lock_data.get('packages', {}):
+            return not self.get_drifted_dependencies(package_json, lock_data['packages'][''])
+
         for package, version in package_json.get('dependencies', {}).items():
             if package not in lock_data['dependencies'] or lock_data['dependencies'][package]['version'] != version:
                 return False
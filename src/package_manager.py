@@ -1,6 +1,7 @@
 import os
 from src.commands.add import add_package
 from src.commands.install import install_packages
+from src.commands.verify import verify_installation
 from src.utils.file_operations import read_package_json, write_package_json
 
 
@@ -21,11 +22,39 @@ class BasicNodeJSPackageManager:
         for package_string in packages:
             add_package(package_string, self.package_json_path, self.node_modules_path, dev)
 
-    def install(self):
+    def install(self, visualize=True, force_visualize=False, jobs=1, link_method='auto', cache_max_size=None,
+                frozen=False, progress='fancy', network_mode='online', profile=None, fetch_timeout=None):
         """
         Install all packages listed in package.json.
+
+        Args:
+        visualize (bool): Whether to visualize the dependency tree
+        force_visualize (bool): Whether to force visualization even for large trees
+        jobs (int): Most concurrent registry requests of each kind; the actual limit adapts
+        link_method (str): How cached files are placed in node_modules: auto, reflink, hardlink or copy
+        cache_max_size (int): Byte budget for the package cache
+        frozen (bool): Install exactly what the lock file records without resolving
+        progress (str): How progress is reported: fancy, quiet or ndjson
+        network_mode (str): 'online', 'prefer-offline' or 'offline'
+        profile (str): Path to write a Chrome trace of the install to (optional)
+        fetch_timeout (float): Seconds a registry request may wait for data (optional)
+        """
+        install_packages(self.package_json_path, self.node_modules_path, visualize=visualize,
+                         force_visualize=force_visualize, jobs=jobs, link_method=link_method,
+                         cache_max_size=cache_max_size, frozen=frozen, progress=progress,
+                         network_mode=network_mode, profile=profile, fetch_timeout=fetch_timeout)
+
+    def verify(self, jobs=8):
+        """
+        Check every installed package against the lock file and the package cache.
+
+        Args:
+        jobs (int): Number of packages verified concurrently
+
+        Returns:
+        dict: Report with counts and a list of failures per package
         """
-        install_packages(self.package_json_path, self.node_modules_path)
+        return verify_installation(self.project_root, self.node_modules_path, jobs=jobs)
 
     def remove(self, package_name):
         """
@@ -1,90 +1,222 @@
 import os
 import json
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
+from src.utils.hash_stamps import HashStampCache
+from src.utils.npm_api import is_version_satisfied
 
-class PackageValidator:
-    def __init__(self, node_modules_path):
-        self.node_modules_path = node_modules_path
-
-    def verify_package_installation(self, package, version):
-        package_path = os.path.join(self.node_modules_path, package)
-        if not os.path.exists(package_path):
-            print(f"Error: Package directory for {package}@{version} does not exist.")
-            return False
-
-        if not self._verify_package_json(package_path, package, version):
-            return False
+STAMPS_FILE_NAME = '.pydep-stamps'
 
-        if not self._verify_package_structure(package_path):
-            return False
-
-        if not self._verify_package_checksum(package_path, package, version):
-            return False
 
-        if not self._verify_package_dependencies(package_path):
+class PackageValidator:
+    def __init__(self, node_modules_path, jobs=8):
+        self.node_modules_path = node_modules_path
+        self.jobs = jobs
+        self.planned_versions = None  # package directory -> version from the install plan
+        self.stamps = HashStampCache(os.path.join(node_modules_path, STAMPS_FILE_NAME))
+        self._pool = None  # hashes files of one package at a time, kept until close()
+
+    def set_install_plan(self, install_targets):
+        """
+        Check dependencies against the install plan instead of the directories on disk.
+
+        Args:
+        install_targets (list): (package, version, install_path) tuples of the planned layout
+        """
+        self.planned_versions = {
+            os.path.normpath(os.path.join(install_path, package)): version
+            for package, version, install_path in install_targets
+        }
+
+    def verify_package_installation(self, package, version, install_path=None, expected=None, integrity=None):
+        """
+        Check that an installed package is complete and unmodified.
+
+        Args:
+        package (str): Name of the package
+        version (str): Version that should be installed
+        install_path (str): node_modules directory holding the package (default: the top level)
+        expected (dict): Cache entry the package was installed from ('files' and 'integrity');
+        file contents are only checked when it is given
+        integrity (str): Registry dist.integrity the package must have been extracted from
+
+        Returns:
+        bool: True if every check passed
+        """
+        package_path = os.path.join(install_path or self.node_modules_path, package)
+        try:
+            errors = self.check_package(package, version, package_path, expected, integrity, parallel=True)
+        finally:
+            self.close()
+        if errors:
+            for error in errors:
+                print(f"Error: {error}")
             return False
 
         print(f"Package {package}@{version} verified successfully.")
         return True
 
-    def _verify_package_json(self, package_path, expected_name, expected_version):
-        package_json_path = os.path.join(package_path, 'package.json')
-        if not os.path.exists(package_json_path):
-            print(f"Error: package.json not found for {expected_name}@{expected_version}")
-            return False
-
-        with open(package_json_path, 'r') as f:
-            package_data = json.load(f)
-
+    def verify_tree(self, install_targets, expected_entries=None, integrities=None):
+        """
+        Verify every package of an installed tree in one pass on a worker pool.
+
+        Args:
+        install_targets (list): (package, version, install_path) tuples of the installed layout
+        expected_entries (dict): (package, version) -> cache entry to check file contents against
+        integrities (dict): (package, version) -> registry dist.integrity
+
+        Returns:
+        dict: 'packages' (number checked), 'verified' (number that passed), 'unchecked_contents'
+        (packages without a cache entry to compare files with), 'files_hashed', 'files_reused'
+        and 'failures', a list of {'package', 'version', 'path', 'errors'}
+        """
+        expected_entries = expected_entries or {}
+        integrities = integrities or {}
+        self.set_install_plan(install_targets)
+        hits, misses = self.stamps.hits, self.stamps.misses
+
+        def check(target):
+            package, version, install_path = target
+            key = (package, version)
+            package_path = os.path.join(install_path, package)
+            return package_path, self.check_package(package, version, package_path, expected_entries.get(key),
+                                                    integrities.get(key))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as executor:
+            results = list(executor.map(check, install_targets))
+        self.save_stamps()
+
+        failures = [
+            {'package': package, 'version': version, 'path': package_path, 'errors': errors}
+            for (package, version, _), (package_path, errors) in zip(install_targets, results) if errors
+        ]
+        return {
+            'packages': len(install_targets),
+            'verified': len(install_targets) - len(failures),
+            'unchecked_contents': sum(1 for package, version, _ in install_targets
+                                      if (package, version) not in expected_entries),
+            'files_hashed': self.stamps.misses - misses,
+            'files_reused': self.stamps.hits - hits,
+            'failures': failures,
+        }
+
+    def check_package(self, package, version, package_path, expected=None, integrity=None, parallel=False):
+        """
+        Run every check on one installed package, reading its package.json once.
+
+        Args:
+        package (str): Name of the package
+        version (str): Version that should be installed
+        package_path (str): Directory of the installed package
+        expected (dict): Cache entry to check file contents against
+        integrity (str): Registry dist.integrity the package must have been extracted from
+        parallel (bool): Hash the package's files on a worker pool, kept for later checks until close()
+
+        Returns:
+        list: Error messages; empty if the package is valid
+        """
+        if not os.path.exists(package_path):
+            return [f"Package directory for {package}@{version} does not exist."]
+
+        package_data, error = self._read_manifest(package_path, package, version)
+        if error:
+            return [error]
+
+        errors = []
+        errors.extend(self._check_manifest(package_data, package, version))
+        errors.extend(self._check_contents(package_path, package, version, expected, integrity, parallel))
+        errors.extend(self._check_dependencies(package_path, package_data))
+        return errors
+
+    def _read_manifest(self, package_path, package, version):
+        try:
+            with open(os.path.join(package_path, 'package.json'), 'r') as f:
+                return json.load(f), None
+        except FileNotFoundError:
+            return None, f"package.json not found for {package}@{version}"
+        except ValueError:
+            return None, f"package.json of {package}@{version} is not valid JSON"
+
+    def _check_manifest(self, package_data, expected_name, expected_version):
         if package_data.get('name') != expected_name:
-            print(f"Error: Package name mismatch. Expected {expected_name}, found {package_data.get('name')}")
-            return False
-
+            return [f"Package name mismatch. Expected {expected_name}, found {package_data.get('name')}"]
         if package_data.get('version') != expected_version:
-            print(f"Error: Version mismatch. Expected {expected_version}, found {package_data.get('version')}")
-            return False
-
-        return True
-
-    def _verify_package_structure(self, package_path):
-        required_files = ['package.json', 'README.md', 'LICENSE']
-        for file in required_files:
-            if not os.path.exists(os.path.join(package_path, file)):
-                print(f"Error: Required file {file} is missing.")
-                return False
-        return True
-
-    def _verify_package_checksum(self, package_path, package, version):
-        # In a real implementation, you would fetch the expected checksum from a trusted source
-        # For this example, we'll just compute and print the checksum
-        checksum = self._compute_directory_checksum(package_path)
-        print(f"Computed checksum for {package}@{version}: {checksum}")
-        # You would typically compare this checksum with an expected value
-        return True
-
-    def _compute_directory_checksum(self, directory):
-        checksum = hashlib.md5()
-        for root, dirs, files in os.walk(directory):
-            for file in sorted(files):
-                filepath = os.path.join(root, file)
-                with open(filepath, "rb") as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        checksum.update(chunk)
-        return checksum.hexdigest()
-
-    def _verify_package_dependencies(self, package_path):
-        package_json_path = os.path.join(package_path, 'package.json')
-        with open(package_json_path, 'r') as f:
-            package_data = json.load(f)
-
-        dependencies = package_data.get('dependencies', {})
-        for dep, version in dependencies.items():
-            dep_path = os.path.join(package_path, 'node_modules', dep)
-            if not os.path.exists(dep_path):
-                print(f"Error: Dependency {dep}@{version} is missing.")
-                return False
-            if not self._verify_package_json(dep_path, dep, version):
-                return False
-
-        return True
+            return [f"Version mismatch. Expected {expected_version}, found {package_data.get('version')}"]
+        return []
+
+    def _check_contents(self, package_path, package, version, expected, integrity, parallel):
+        if expected is None:
+            return []
+
+        # The cached file digests were taken from a tarball checked against its integrity
+        if integrity and expected.get('integrity') and expected['integrity'] != integrity:
+            return [f"{package}@{version} was installed from a tarball with integrity "
+                    f"{expected['integrity']}, expected {integrity}"]
+
+        expected_files = expected['files']
+        paths = [os.path.join(package_path, *relative_path.split('/')) for relative_path in expected_files]
+        missing = sorted(relative_path for relative_path, path in zip(expected_files, paths)
+                         if not os.path.isfile(path))
+        if missing:
+            return [f"{package}@{version} is missing files: {', '.join(missing)}"]
+
+        if parallel and len(paths) > 1 and self.jobs > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.jobs)
+            digests = list(self._pool.map(self.stamps.digest, paths))
+        else:
+            digests = [self.stamps.digest(path) for path in paths]
+
+        modified = [relative_path for relative_path, digest in zip(expected_files, digests)
+                    if expected_files[relative_path]['digest'] != digest]
+        if modified:
+            return [f"{package}@{version} has modified files: {', '.join(sorted(modified))}"]
+        return []
+
+    def save_stamps(self):
+        self.stamps.save()
+
+    def close(self):
+        """Shut down the worker pool parallel checks share; a later check starts a new one."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _check_dependencies(self, package_path, package_data):
+        errors = []
+        for dep, version_req in package_data.get('dependencies', {}).items():
+            dep_path, dep_version = self._find_dependency(package_path, dep)
+            if dep_path is None:
+                errors.append(f"Dependency {dep}@{version_req} is missing.")
+            elif dep_version is not None and not is_version_satisfied(version_req, dep_version):
+                errors.append(f"Dependency {dep}@{version_req} resolves to version {dep_version}.")
+        return errors
+
+    def _find_dependency(self, package_path, dep):
+        """
+        Locate dep the way Node does: in package_path/node_modules, then each enclosing node_modules.
+
+        Returns:
+        tuple: (path, version) of the dependency, or (None, None) if it cannot be found.
+        The version is taken from the install plan if one is set, otherwise from disk.
+        """
+        directory = os.path.normpath(package_path)
+        top = os.path.dirname(os.path.normpath(self.node_modules_path))
+        while True:
+            candidate = os.path.join(directory, 'node_modules', dep)
+            if os.path.basename(directory) != 'node_modules':
+                if self.planned_versions is not None:
+                    if candidate in self.planned_versions:
+                        return candidate, self.planned_versions[candidate]
+                elif os.path.exists(candidate):
+                    return candidate, self._read_version(candidate)
+            if directory == top or os.path.dirname(directory) == directory:
+                return None, None
+            directory = os.path.dirname(directory)
+
+    def _read_version(self, package_path):
+        try:
+            with open(os.path.join(package_path, 'package.json'), 'r') as f:
+                return json.load(f).get('version')
+        except (OSError, ValueError):
+            return None
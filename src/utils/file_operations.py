@@ -1,6 +1,14 @@
+import contextlib
 import json
 import os
 import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def read_package_json(path):
@@ -145,3 +153,56 @@ def directory_exists(path):
     bool: True if the directory exists, False otherwise
     """
     return os.path.isdir(path)
+
+
+@contextlib.contextmanager
+def file_lock(path, shared=False):
+    """
+    Hold an advisory lock on path for the duration of the with-block.
+
+    Locks are taken on a separate lock file, so they coordinate concurrent
+    processes without touching the data they protect. Shared locks are only
+    supported on POSIX; elsewhere every lock is exclusive.
+
+    Args:
+    path (str): Path of the lock file (created if missing)
+    shared (bool): Take a shared (reader) lock instead of an exclusive one
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path, data):
+    """
+    Write JSON so readers only ever see the old or the complete new file.
+
+    The data is written to a uniquely named temporary file next to path and
+    renamed over it.
+
+    Args:
+    path (str): Destination path
+    data: JSON-serializable data
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+from src.utils.file_operations import atomic_write_json
+
+# Files at least this large are hashed through a memory map in a single call
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Return the hex SHA-256 of a file.
+
+    Small files are read in one call and large ones are memory-mapped, so each file
+    is hashed by a single hashlib call that releases the GIL and lets worker
+    threads hash in parallel.
+
+    Args:
+    path (str): File to hash
+
+    Returns:
+    str: Hex SHA-256 digest, the same one ContentStore uses
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            return hashlib.sha256(f.read()).hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def stat_key(st):
+    return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class HashStampCache:
+    """
+    Remembers file digests keyed by (device, inode, size, mtime).
+
+    A file whose stat signature is unchanged since it was last hashed is not read
+    again. Hardlinked package files share their inode with the package store, so a
+    digest computed once covers every project linking the same file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stamps = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._stamps is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._stamps = json.load(f)
+            except (OSError, ValueError):
+                self._stamps = {}
+        return self._stamps
+
+    def digest(self, path):
+        """
+        Return the SHA-256 of path, hashing it only if its stat signature changed.
+
+        Args:
+        path (str): File to hash
+
+        Returns:
+        str: Hex SHA-256 digest
+        """
+        key = stat_key(os.stat(path))
+        with self._lock:
+            cached = self._load().get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        digest = hash_file(path)
+        with self._lock:
+            self._stamps[key] = digest
+            self._dirty = True
+            self.misses += 1
+        return digest
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            atomic_write_json(self.path, self._stamps)
+            self._dirty = False
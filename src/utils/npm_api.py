@@ -1,22 +1,289 @@
+import os
+import shutil
+import threading
+
 import requests
-import semver
+from requests.adapters import HTTPAdapter
+
+from src.utils.package_metadata import PackageMetadata
+from src.utils.packument_cache import PackumentCache
+from src.utils.profiler import get_profiler
+from src.utils.registry_client import AdaptiveLimit, ClientStats, RetryPolicy, SingleFlight, get_with_retries
+from src.utils.registry_config import DEFAULT_FETCH_TIMEOUT, DEFAULT_REGISTRY_URL, RegistryConfig
+from src.utils.semver_range import compile_range
+from src.utils.tarball import dist_integrity, extract_tarball
+
+# Set NPM_REGISTRY_URL in the environment to install from a mirror or a local test registry
+NPM_REGISTRY_URL = os.environ.get('NPM_REGISTRY_URL', DEFAULT_REGISTRY_URL).rstrip('/')
+
+NETWORK_MODES = ('online', 'prefer-offline', 'offline')
+
+# Seconds to wait for a connection to the registry; reads wait up to the fetch timeout
+CONNECT_TIMEOUT = 10.0
+
+# Abbreviated packuments ("corgis") carry what installs need, without READMEs and descriptive metadata
+ABBREVIATED_MEDIA_TYPE = 'application/vnd.npm.install-v1+json'
+_ABBREVIATED_ACCEPT = f"{ABBREVIATED_MEDIA_TYPE}; q=1.0, application/json; q=0.8, */*"
+
+_scope_registries = {}
+_network_mode = 'online'
+_timeout = (CONNECT_TIMEOUT, DEFAULT_FETCH_TIMEOUT)  # (connect, read) seconds of every request
+_packument_cache = PackumentCache()
+_retry_policy = RetryPolicy()
+_client_stats = ClientStats()
+_in_flight = SingleFlight(_client_stats)
+_limits = {'metadata': AdaptiveLimit(), 'tarball': AdaptiveLimit(latency_tolerance=None)}
+_metadata = {}  # package name -> PackageMetadata of the packument last seen
+_metadata_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure_packument_cache(cache_dir):
+    """
+    Persist packuments under cache_dir so later runs can revalidate them.
+
+    Args:
+    cache_dir (str): Directory for the on-disk packument store
+    """
+    global _packument_cache
+    _packument_cache = PackumentCache(cache_dir)
+    with _metadata_lock:
+        _metadata.clear()
+
+
+class OfflineError(Exception):
+    """Raised when offline mode needs metadata or a tarball that is not cached locally."""
+
+
+def configure_registry(config=None, network_mode='online'):
+    """
+    Set where packages are fetched from, how long requests wait and whether the network may be used.
+
+    Modes:
+    - 'online': revalidate cached metadata with the registry
+    - 'prefer-offline': use cached metadata without revalidating; fetch only what is missing
+    - 'offline': never touch the network; a cache miss raises OfflineError
+
+    Args:
+    config (RegistryConfig): Default and per-scope registries and the fetch timeout
+    (default: NPM_REGISTRY_URL only)
+    network_mode (str): One of NETWORK_MODES
+    """
+    global NPM_REGISTRY_URL, _scope_registries, _network_mode, _timeout
+    if network_mode not in NETWORK_MODES:
+        raise ValueError(f"Unknown network mode: {network_mode}")
+    config = config or RegistryConfig(NPM_REGISTRY_URL)
+    NPM_REGISTRY_URL = config.registry
+    _scope_registries = dict(config.scopes)
+    _network_mode = network_mode
+    _timeout = (min(CONNECT_TIMEOUT, config.fetch_timeout), config.fetch_timeout)
+
+
+def get_registry_url(package_name):
+    """Return the registry a package is fetched from, honouring per-scope registries."""
+    if package_name.startswith('@') and '/' in package_name:
+        return _scope_registries.get(package_name.split('/', 1)[0], NPM_REGISTRY_URL)
+    return NPM_REGISTRY_URL
+
+
+def get_packument_cache_stats():
+    return _packument_cache.stats()
+
+
+def configure_retries(policy):
+    """
+    Replace the retry policy used for registry requests.
+
+    Args:
+    policy (RetryPolicy): Attempts and backoff for idempotent GETs
+    """
+    global _retry_policy
+    _retry_policy = policy
+
+
+def get_client_stats():
+    """
+    Returns:
+    dict: 'requests' sent (including retries), 'retries' and 'coalesced' duplicate calls
+    """
+    return _client_stats.snapshot()
+
+
+def configure_concurrency(metadata=None, tarball=None):
+    """
+    Replace the adaptive limits on concurrent registry requests.
+
+    Metadata and tarball requests are limited separately: packument lookups are small
+    and latency-bound, while tarball transfers are sized by the package, so only
+    errors and throttling shrink the tarball limit.
+
+    Args:
+    metadata (AdaptiveLimit): Limit for packument and version requests
+    tarball (AdaptiveLimit): Limit for tarball downloads
+    """
+    _limits['metadata'] = metadata or AdaptiveLimit()
+    _limits['tarball'] = tarball or AdaptiveLimit(latency_tolerance=None)
+
+
+def get_concurrency_stats():
+    """
+    Returns:
+    dict: Traffic kind -> current 'limit', 'peak' requests in flight and number of 'decreases'
+    """
+    return {kind: limit.snapshot() for kind, limit in _limits.items()}
+
+
+def _get(url, traffic='metadata', **kwargs):
+    return get_with_retries(get_session(), url, _retry_policy, stats=_client_stats, limiter=_limits[traffic],
+                            timeout=_timeout, **kwargs)
+
+
+def get_session():
+    """
+    Return the process-wide HTTP session, creating it on first use.
+
+    The session keeps connections alive and pools them per host, so concurrent
+    metadata and tarball requests reuse TCP/TLS connections instead of paying a
+    new handshake each time.
 
-NPM_REGISTRY_URL = 'https://registry.npmjs.org'
+    Returns:
+    requests.Session: The shared session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
 
 
 def fetch_package_info(package_name, version='latest'):
-    url = f"{NPM_REGISTRY_URL}/{package_name}/{version}"
-    response = requests.get(url)
-    response.raise_for_status()
+    """
+    Return the registry metadata of one version of a package.
+
+    The version is looked up in the package's packument, which resolution fetches
+    anyway and which holds every version's metadata. Only a version the packument
+    does not list, e.g. one published after a cached copy was written, is requested
+    on its own; concurrent calls for the same version share that request.
+
+    Args:
+    package_name (str): Name of the package
+    version (str): Exact version or dist-tag
+
+    Returns:
+    dict: The version document, with 'dependencies' and 'dist'
+    """
+    info = get_package_metadata(package_name).version_info(version)
+    if info is not None:
+        return info
+    if _network_mode == 'offline':
+        raise OfflineError(f"{package_name}@{version} is not in the cached metadata; run without --offline")
+
+    url = f"{get_registry_url(package_name)}/{package_name}/{version}"
+    return _in_flight.do(('version', url), lambda: _fetch_json(url))[0]
+
+
+def _fetch_json(url):
+    with get_profiler().span('fetch version', 'network', url=url):
+        response = _get(url)
+        response.raise_for_status()
+    get_profiler().count('metadata_bytes', len(response.content))
     return response.json()
 
 
-def get_package_versions(package_name):
-    url = f"{NPM_REGISTRY_URL}/{package_name}"
-    response = requests.get(url)
+def fetch_packument(package_name):
+    """
+    Return the packument of a package: from memory, from the persisted cache, or the registry.
+
+    The registry is asked for the abbreviated document, which holds every version's
+    dependencies, dist and engines but not READMEs or other descriptive metadata, and
+    is a fraction of the size. Concurrent calls for the same package share a single request.
+
+    Args:
+    package_name (str): Name of the package
+
+    Returns:
+    dict: The packument
+    """
+    data = _packument_cache.get(package_name)
+    if data is not None:
+        return data
+    return _in_flight.do(('packument', package_name), lambda: _fetch_packument(package_name))[0]
+
+
+def _fetch_packument(package_name):
+    entry = _packument_cache.load(package_name)
+    if entry and _network_mode != 'online':
+        _packument_cache.mark_used(package_name, entry['data'])
+        return entry['data']
+    if _network_mode == 'offline':
+        raise OfflineError(f"No cached metadata for {package_name}; run without --offline to fetch it")
+
+    headers = {'Accept': _ABBREVIATED_ACCEPT}
+    # Entries written before packuments were requested abbreviated hold validators of the full document
+    if entry and 'abbreviated' in entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    url = f"{get_registry_url(package_name)}/{package_name}"
+    with get_profiler().span('fetch packument', 'network', package=package_name):
+        response = _get(url, headers=headers)
+    get_profiler().count('metadata_bytes', len(response.content))
+    if response.status_code == 304 and entry:
+        _packument_cache.mark_revalidated(package_name, entry['data'])
+        return entry['data']
     response.raise_for_status()
     data = response.json()
-    return list(data['versions'].keys())
+    abbreviated = response.headers.get('Content-Type', '').startswith(ABBREVIATED_MEDIA_TYPE)
+    _packument_cache.store(package_name, data,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'),
+                           abbreviated=abbreviated)
+    return data
+
+
+def get_package_metadata(package_name):
+    """
+    Return the package's metadata model, built once per packument.
+
+    Args:
+    package_name (str): Name of the package
+
+    Returns:
+    PackageMetadata: Versions, dependencies and dist of every published version
+    """
+    data = fetch_packument(package_name)
+    with _metadata_lock:
+        cached = _metadata.get(package_name)
+        if cached is not None and cached.packument is data:
+            return cached
+    metadata = PackageMetadata(package_name, data)
+    with _metadata_lock:
+        _metadata[package_name] = metadata
+    return metadata
+
+
+def get_package_versions(package_name):
+    return get_package_metadata(package_name).versions
+
+
+def get_version_index(package_name):
+    """
+    Return the package's versions parsed and sorted once per packument.
+
+    Args:
+    package_name (str): Name of the package
+
+    Returns:
+    VersionIndex: Sorted index of the published versions
+    """
+    return get_package_metadata(package_name).version_index
 
 
 def parse_package_name(package_string):
@@ -31,31 +298,77 @@ def is_version_satisfied(required_version, available_version):
     try:
         if required_version == 'latest':
             return True
-        if required_version.startswith('^') or required_version.startswith('~'):
-            return semver.match(available_version, required_version)
-        return semver.compare(available_version, required_version) >= 0
+        return compile_range(required_version).test(available_version)
     except ValueError:
-        # If versions are not valid semver, fall back to string comparison
+        # If the requirement is not a valid range, fall back to string comparison
         return available_version == required_version
 
 
 def get_latest_satisfying_version(package_name, version_requirement):
-    versions = get_package_versions(package_name)
-    satisfying_versions = [v for v in versions if is_version_satisfied(version_requirement, v)]
-    if not satisfying_versions:
-        raise ValueError(f"No version satisfying {version_requirement} found for {package_name}")
-    return max(satisfying_versions, key=semver.Version.parse)
+    return get_package_metadata(package_name).resolve(version_requirement)
 
 
-def download_package(package_name, version, target_dir):
-    info = fetch_package_info(package_name, version)
-    tarball_url = info['dist']['tarball']
+def download_package(package_name, version, target_dir, tarball_url=None, integrity=None, on_bytes=None):
+    """
+    Download a package tarball and extract it into target_dir.
 
-    response = requests.get(tarball_url)
-    response.raise_for_status()
+    The response body is streamed through the extractor, which verifies the
+    tarball against integrity before the package directory is put in place.
+    A transfer that breaks off is retried from the start. Concurrent calls for the
+    same tarball download it once; the others copy the extracted package.
 
-    # Implementation of download and extraction...
-    # (This part would involve writing the tarball to disk and extracting it)
-    print(f"Downloading {package_name}@{version} to {target_dir}")
-    # For now, we'll just pretend we've downloaded and extracted the package
+    Args:
+    package_name (str): Name of the package
+    version (str): Exact version to download
+    target_dir (str): Directory the package contents are extracted to
+    tarball_url (str): Tarball URL from the resolved graph; looked up in the registry if None
+    integrity (str): Expected SRI integrity of the tarball
+    on_bytes (callable): Progress callback receiving the number of bytes read
+
+    Returns:
+    bool: True once the package has been extracted and verified
+
+    Raises:
+    ValueError: If the tarball does not match its integrity
+    OfflineError: In offline mode, where nothing may be downloaded
+    """
+    if _network_mode == 'offline':
+        raise OfflineError(f"{package_name}@{version} is not in the package cache; run without --offline")
+    if tarball_url is None:
+        dist = fetch_package_info(package_name, version)['dist']
+        tarball_url = dist['tarball']
+        integrity = integrity or dist_integrity(dist)
+
+    profiler = get_profiler()
+
+    def count_bytes(num_bytes):
+        profiler.count('tarball_bytes', num_bytes)
+        if on_bytes:
+            on_bytes(num_bytes)
+
+    def extract(response):
+        # The body is streamed through the extractor, so this includes reading it;
+        # the enclosing download span adds waiting for the response
+        response.raw.decode_content = True
+        with profiler.span('extract', 'disk', package=f"{package_name}@{version}"):
+            return extract_tarball(response.raw, target_dir, integrity=integrity, on_bytes=count_bytes)
+
+    def download():
+        with profiler.span('download', 'network', package=f"{package_name}@{version}"):
+            _get(tarball_url, traffic='tarball', stream=True, consume=extract)
+        return target_dir
+
+    extracted_dir, leader = _in_flight.do(('tarball', tarball_url, integrity), download)
+    if not leader and os.path.abspath(extracted_dir) != os.path.abspath(target_dir):
+        _copy_package(extracted_dir, target_dir)
     return True
+
+
+def _copy_package(source_dir, target_dir):
+    tmp_dir = f"{target_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.copytree(source_dir, tmp_dir)
+    if os.path.islink(target_dir):
+        os.unlink(target_dir)
+    elif os.path.exists(target_dir):
+        shutil.rmtree(target_dir)
+    os.rename(tmp_dir, target_dir)
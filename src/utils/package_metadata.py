@@ -0,0 +1,89 @@
+from src.utils.semver_range import VersionIndex, compile_range
+from src.utils.tarball import dist_integrity
+
+
+class PackageMetadata:
+    """
+    Answers every resolve-time question about one package from its packument.
+
+    A packument (full or abbreviated) already holds each version's dependencies and
+    dist, so version listing, range matching, dependencies, tarball URL and integrity
+    all come from the one document instead of a request per version.
+
+    Args:
+    name (str): Name of the package
+    packument (dict): The package's packument
+    """
+
+    def __init__(self, name, packument):
+        self.name = name
+        self.packument = packument
+        self.dist_tags = packument.get('dist-tags', {})
+        self._versions = packument.get('versions', {})
+        self._index = None
+
+    @property
+    def versions(self):
+        """list: Published versions, in packument order."""
+        return list(self._versions)
+
+    @property
+    def version_index(self):
+        """VersionIndex: Published versions parsed and sorted, built on first use."""
+        if self._index is None:
+            self._index = VersionIndex(self._versions)
+        return self._index
+
+    def resolve(self, version_requirement):
+        """
+        Return the highest version satisfying a range, a dist-tag or an exact version.
+
+        Args:
+        version_requirement (str): Range, dist-tag or version, e.g. '^1.2.0' or 'latest'
+
+        Returns:
+        str: The matching version
+
+        Raises:
+        ValueError: If no published version satisfies the requirement
+        """
+        if version_requirement in self.dist_tags:
+            return self.dist_tags[version_requirement]
+        if version_requirement == 'latest':
+            version_requirement = '*'
+
+        index = self.version_index
+        try:
+            version = index.max_satisfying(compile_range(version_requirement))
+        except ValueError:
+            version = version_requirement if version_requirement in index.versions else None
+        if version is None:
+            raise ValueError(f"No version satisfying {version_requirement} found for {self.name}")
+        return version
+
+    def version_info(self, version):
+        """
+        Return the metadata of one version, or None if the packument does not list it.
+
+        Args:
+        version (str): Exact version or dist-tag
+
+        Returns:
+        dict: The version's document, with 'dependencies' and 'dist'
+        """
+        return self._versions.get(self.dist_tags.get(version, version))
+
+    def dependencies(self, version):
+        """Return the version's dependency ranges, empty if it has none or is not listed."""
+        return (self.version_info(version) or {}).get('dependencies', {})
+
+    def dist(self, version):
+        """Return the version's 'dist' (tarball URL and integrity), empty if it is not listed."""
+        return (self.version_info(version) or {}).get('dist', {})
+
+    def tarball_url(self, version):
+        return self.dist(version).get('tarball')
+
+    def integrity(self, version):
+        """Return the version's SRI integrity, derived from the legacy shasum if needed."""
+        return dist_integrity(self.dist(version))
@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+from urllib.parse import quote
+
+
+class PackumentCache:
+    """
+    Two-level cache for registry packuments (the per-package metadata documents).
+
+    Documents are memoized in-process for the lifetime of the cache and, when a
+    cache directory is configured, persisted to disk together with the ETag and
+    Last-Modified validators the registry returned so a later process can
+    revalidate them with a conditional request instead of downloading them again.
+    Persisted entries record whether the registry answered with an abbreviated
+    (install-v1) document or the full one.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, package_name):
+        return os.path.join(self.cache_dir, quote(package_name, safe='@') + '.json')
+
+    def get(self, package_name):
+        """
+        Return the packument memoized in this process, or None.
+
+        Args:
+        package_name (str): Name of the package
+
+        Returns:
+        dict: The packument, or None if it has not been fetched in this process
+        """
+        with self._lock:
+            data = self._memory.get(package_name)
+            if data is not None:
+                self.hits += 1
+            return data
+
+    def load(self, package_name):
+        """
+        Load a persisted cache entry for revalidation.
+
+        Args:
+        package_name (str): Name of the package
+
+        Returns:
+        dict: Entry with 'data', 'etag', 'last_modified' and 'abbreviated' keys, or None
+        if there is none or it is corrupt
+        """
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._entry_path(package_name), 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not isinstance(entry, dict) or not isinstance(entry.get('data'), dict):
+            return None
+        return entry
+
+    def store(self, package_name, data, etag=None, last_modified=None, abbreviated=False):
+        """
+        Memoize a freshly downloaded packument and persist it with its validators.
+
+        Args:
+        package_name (str): Name of the package
+        data (dict): The packument
+        etag (str): ETag response header, if any
+        last_modified (str): Last-Modified response header, if any
+        abbreviated (bool): Whether data is an abbreviated (install-v1) document
+        """
+        with self._lock:
+            self._memory[package_name] = data
+            self.misses += 1
+
+        # Kept even without validators, so offline installs can still use it
+        if not self.cache_dir:
+            return
+
+        entry = {'etag': etag, 'last_modified': last_modified, 'abbreviated': abbreviated, 'data': data}
+        path = self._entry_path(package_name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def mark_revalidated(self, package_name, data):
+        """
+        Memoize a persisted packument the registry confirmed unchanged (HTTP 304).
+
+        Args:
+        package_name (str): Name of the package
+        data (dict): The persisted packument
+        """
+        with self._lock:
+            self._memory[package_name] = data
+            self.revalidated += 1
+
+    def mark_used(self, package_name, data):
+        """
+        Memoize a persisted packument used without revalidation (offline modes).
+
+        Args:
+        package_name (str): Name of the package
+        data (dict): The persisted packument
+        """
+        with self._lock:
+            self._memory[package_name] = data
+            self.hits += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'revalidated': self.revalidated, 'misses': self.misses}
@@ -0,0 +1,170 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_peak_rss():
+    """
+    Return the peak resident set size of this process.
+
+    Returns:
+    int: Bytes, or None where the platform does not report it
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Profiler:
+    """
+    Records timed spans and counters of an install, from any thread.
+
+    Spans become complete ('X') events of a Chrome trace, which chrome://tracing and
+    Perfetto show as one lane per worker thread; counters and the peak RSS go into the
+    trace's otherData. summary() aggregates the spans by name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}  # thread id -> thread name
+        self.counters = OrderedDict()
+
+    @contextlib.contextmanager
+    def span(self, name, category='install', **args):
+        """
+        Time the enclosed block as one span.
+
+        Args:
+        name (str): What is being done, e.g. 'download'; spans are summarised by name
+        category (str): Trace category, e.g. 'network' or 'disk'
+        **args: Details shown with the span, e.g. package='lodash'
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                     'ts': round((start - self._origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1)}
+            if args:
+                event['args'] = args
+            with self._lock:
+                self._events.append(event)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    def count(self, name, amount=1):
+        """Add amount to the counter called name."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counters(self, **values):
+        """Record counters measured elsewhere, e.g. cache statistics."""
+        with self._lock:
+            self.counters.update(values)
+
+    def summary(self):
+        """
+        Aggregate the spans by name, in the order they first started.
+
+        Returns:
+        list: Dicts with 'name', 'count', 'total_seconds' and 'max_seconds'
+        """
+        with self._lock:
+            events = sorted(self._events, key=lambda event: event['ts'])
+        rows = OrderedDict()
+        for event in events:
+            row = rows.setdefault(event['name'], {'name': event['name'], 'count': 0, 'total_seconds': 0.0,
+                                                  'max_seconds': 0.0})
+            seconds = event['dur'] / 1e6
+            row['count'] += 1
+            row['total_seconds'] += seconds
+            row['max_seconds'] = max(row['max_seconds'], seconds)
+        return list(rows.values())
+
+    def chrome_trace(self):
+        """
+        Returns:
+        dict: The recorded spans in Chrome's trace event format
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            counters = dict(self.counters)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        counters['peak_rss_bytes'] = get_peak_rss()
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms', 'otherData': counters}
+
+    def write_chrome_trace(self, path):
+        """
+        Write the trace as JSON, to be opened in chrome://tracing or ui.perfetto.dev.
+
+        Args:
+        path (str): File to write
+        """
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def format_summary(self):
+        """
+        Returns:
+        str: A table of the span totals followed by the counters
+        """
+        rows = self.summary()
+        counters = dict(self.counters)
+        counters['peak_rss_bytes'] = get_peak_rss()
+        # Names are padded to the longest one, so every figure stays in its column
+        width = max(len(name) for name in ['span', *(row['name'] for row in rows), *counters]) + 2
+        lines = [f"{'span':<{width}}{'count':>8}{'total s':>12}{'max s':>10}"]
+        for row in rows:
+            lines.append(f"{row['name']:<{width}}{row['count']:>8}{row['total_seconds']:>12.3f}"
+                         f"{row['max_seconds']:>10.3f}")
+        lines.append('')
+        lines.extend(f"{name:<{width}}{value if value is not None else 'n/a':>30}" for name, value in counters.items())
+        return '\n'.join(lines)
+
+
+class NullProfiler:
+    """Stands in for a Profiler when profiling is off, at the cost of a method call."""
+
+    def span(self, name, category='install', **args):
+        return contextlib.nullcontext()
+
+    def count(self, name, amount=1):
+        pass
+
+    def set_counters(self, **values):
+        pass
+
+
+_profiler = NullProfiler()
+
+
+def configure_profiler(profiler=None):
+    """
+    Set the profiler that install code reports spans and counters to.
+
+    Args:
+    profiler (Profiler): Profiler to record into; None turns profiling off
+    """
+    global _profiler
+    _profiler = profiler or NullProfiler()
+
+
+def get_profiler():
+    """Return the active profiler, a NullProfiler unless profiling was configured."""
+    return _profiler
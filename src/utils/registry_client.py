@@ -0,0 +1,288 @@
+import email.utils
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+import urllib3
+
+# Responses worth asking again for: timeouts, throttling and server-side hiccups
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Errors raised while connecting or while a response body is still streaming
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    urllib3.exceptions.HTTPError)
+
+
+class RetryPolicy:
+    """
+    How often and how patiently idempotent GETs are retried.
+
+    Delays use full jitter: attempt n waits a random time between 0 and
+    min(max_delay, base_delay * 2**n), so workers that failed together do not retry
+    together. A Retry-After header raises the wait to what the server asked for, up
+    to max_retry_after.
+
+    Args:
+    attempts (int): Total tries per request, including the first
+    base_delay (float): Backoff scale in seconds
+    max_delay (float): Cap of the jittered backoff in seconds
+    max_retry_after (float): Longest Retry-After honoured, in seconds
+    """
+
+    def __init__(self, attempts=4, base_delay=0.25, max_delay=8.0, max_retry_after=60.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Return the seconds to wait before retrying after failed attempt number `attempt` (0-based).
+
+        Args:
+        attempt (int): Number of the attempt that just failed
+        retry_after (float): Seconds the server asked for, if it did
+        """
+        with self._lock:
+            delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+
+def parse_retry_after(value, now=None):
+    """
+    Read a Retry-After header given in seconds or as an HTTP date.
+
+    Returns:
+    float: Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+# Latency changes smaller than this are treated as noise rather than congestion
+LATENCY_SLACK = 0.005
+
+
+class AdaptiveLimit:
+    """
+    Caps the number of requests in flight and adapts the cap with AIMD.
+
+    Every request that completes normally raises the limit by 1/limit, so it grows by
+    about one per round of `limit` requests (additive increase). A throttled, failed or
+    timed-out request, or a smoothed latency above latency_tolerance times the best
+    seen so far, multiplies it by backoff (multiplicative decrease). Only requests that
+    started after the last decrease can trigger the next one, so a burst of failures
+    from one round halves the limit once rather than collapsing it.
+
+    Args:
+    initial (int): Limit to start with
+    min_limit (int): Lowest the limit may drop to
+    max_limit (int): Highest the limit may grow to
+    latency_tolerance (float): Latency ratio treated as congestion; None to react to errors only
+    backoff (float): Factor applied to the limit on congestion
+    """
+
+    def __init__(self, initial=8, min_limit=1, max_limit=64, latency_tolerance=2.0, backoff=0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._peak = 0
+        self._decreases = 0
+        self._decreased_at = 0.0  # monotonic time of the last decrease
+        self._latency = None  # smoothed latency of recent requests
+        self._baseline = None  # lowest smoothed latency, drifting up slowly with the network
+
+    def acquire(self):
+        """
+        Wait for a free slot and take it.
+
+        Returns:
+        float: Start time of the request, to be passed to release()
+        """
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+            return time.monotonic()
+
+    def release(self, started, congested=False):
+        """
+        Give back a slot and adjust the limit from how the request went.
+
+        Args:
+        started (float): What acquire() returned
+        congested (bool): Whether the request was throttled, failed on the server or timed out
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            if not congested and self.latency_tolerance is not None:
+                congested = self._slow(now - started)
+            if congested:
+                if started >= self._decreased_at:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._decreased_at = now
+                    self._decreases += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _slow(self, latency):
+        self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+        if self._baseline is None or self._latency < self._baseline:
+            self._baseline = self._latency
+        else:
+            self._baseline += (self._latency - self._baseline) * 0.01
+        return self._latency > self._baseline * self.latency_tolerance + LATENCY_SLACK
+
+    def snapshot(self):
+        """
+        Returns:
+        dict: Current 'limit', 'peak' requests in flight and number of 'decreases'
+        """
+        with self._cond:
+            return {'limit': int(self.limit), 'peak': self._peak, 'decreases': self._decreases}
+
+
+class ClientStats:
+    """Thread-safe counters of the registry client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.coalesced = 0
+
+    def add(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def snapshot(self):
+        with self._lock:
+            return {'requests': self.requests, 'retries': self.retries, 'coalesced': self.coalesced}
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller runs the function and
+    everyone asking for the same key meanwhile waits for and shares its result, or
+    its exception. Once the call finishes, the next caller starts a fresh one.
+
+    Args:
+    stats (ClientStats): Counts the callers that were coalesced (optional)
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the call in flight
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call for key is already in flight, and return its result.
+
+        Args:
+        key: Hashable identity of the call, e.g. ('packument', 'lodash')
+        fn (callable): The call to make
+
+        Returns:
+        tuple: (result, leader), where leader is False if the result was shared
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            if self.stats is not None:
+                self.stats.add('coalesced')
+            return future.result(), False
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def get_with_retries(session, url, policy, consume=None, stats=None, sleep=time.sleep, limiter=None, **kwargs):
+    """
+    GET url, retrying transient failures with jittered exponential backoff.
+
+    Connection errors, timeouts and RETRY_STATUSES responses are retried until the
+    policy runs out of attempts; the last failing response is then returned for the
+    caller to raise_for_status on, or the last error is raised. With consume, the
+    body is handled inside the retry loop, so a stream that breaks halfway through
+    is requested again. With a limiter, every attempt holds one of its slots until the
+    body has been handled, and reports whether it ran into congestion; backoff sleeps
+    happen outside the slot.
+
+    Args:
+    session (requests.Session): Session to send the request with
+    url (str): URL to fetch
+    policy (RetryPolicy): Retry limits and backoff
+    consume (callable): Called with the successful response, which is closed afterwards; an
+    error response raises requests.HTTPError instead
+    stats (ClientStats): Counts requests and retries (optional)
+    sleep (callable): Used to wait between attempts
+    limiter (AdaptiveLimit): Bounds the attempts in flight (optional)
+    **kwargs: Passed on to session.get
+
+    Returns:
+    The response, or what consume returned
+    """
+    for attempt in range(policy.attempts):
+        last_attempt = attempt == policy.attempts - 1
+        if stats is not None:
+            stats.add('requests')
+        started = limiter.acquire() if limiter is not None else None
+        congested = False
+        retry_after = None
+        try:
+            response = session.get(url, **kwargs)
+            congested = response.status_code in RETRY_STATUSES
+            if not congested or last_attempt:
+                if consume is None:
+                    return response
+                with response:
+                    response.raise_for_status()
+                    return consume(response)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            response.close()
+        except TRANSIENT_ERRORS:
+            # Including connect and read timeouts: a registry too slow to answer is congested
+            congested = True
+            if last_attempt:
+                raise
+        finally:
+            if limiter is not None:
+                limiter.release(started, congested)
+        if stats is not None:
+            stats.add('retries')
+        sleep(policy.delay(attempt, retry_after))
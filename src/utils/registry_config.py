@@ -0,0 +1,128 @@
+import os
+import re
+
+DEFAULT_REGISTRY_URL = 'https://registry.npmjs.org'
+
+# npm's fetch-timeout default (5 minutes); .npmrc gives it in milliseconds
+DEFAULT_FETCH_TIMEOUT = 300.0
+
+_ENV_REFERENCE = re.compile(r'\$\{([^}]+)\}')
+
+
+def parse_npmrc(text, env=None):
+    """
+    Parse the key=value lines of an .npmrc file.
+
+    Lines starting with ';' or '#' are comments, and ${VAR} references in values are
+    replaced from the environment, as npm does.
+
+    Args:
+    text (str): Contents of the file
+    env (dict): Environment used for ${VAR} references (default: os.environ)
+
+    Returns:
+    dict: Setting name -> value
+    """
+    env = os.environ if env is None else env
+    settings = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in ';#' or '=' not in line:
+            continue
+        key, value = (part.strip() for part in line.split('=', 1))
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            value = value[1:-1]
+        settings[key] = _ENV_REFERENCE.sub(lambda match: env.get(match.group(1), ''), value)
+    return settings
+
+
+def get_user_npmrc_path(env=None):
+    env = os.environ if env is None else env
+    return env.get('NPM_CONFIG_USERCONFIG') or env.get('npm_config_userconfig') or os.path.expanduser('~/.npmrc')
+
+
+class RegistryConfig:
+    """
+    Which registry serves which packages, and how long to wait for it.
+
+    Args:
+    registry (str): Registry for unscoped packages and scopes without their own
+    scopes (dict): Scope such as '@myorg' -> registry URL for that scope's packages
+    fetch_timeout (float): Seconds a request may wait for the registry to answer or send more data
+    """
+
+    def __init__(self, registry=DEFAULT_REGISTRY_URL, scopes=None, fetch_timeout=DEFAULT_FETCH_TIMEOUT):
+        self.registry = registry.rstrip('/')
+        self.scopes = {scope: url.rstrip('/') for scope, url in (scopes or {}).items()}
+        self.fetch_timeout = fetch_timeout
+
+    def registry_for(self, package_name):
+        """
+        Return the registry URL a package is fetched from.
+
+        Args:
+        package_name (str): Package name, e.g. 'lodash' or '@myorg/tools'
+
+        Returns:
+        str: Registry URL without a trailing slash
+        """
+        if package_name.startswith('@') and '/' in package_name:
+            return self.scopes.get(package_name.split('/', 1)[0], self.registry)
+        return self.registry
+
+    def update(self, settings):
+        """
+        Apply 'registry', '@scope:registry' and 'fetch-timeout' (milliseconds) settings.
+
+        Everything else, and a fetch-timeout that is not a positive number, is ignored.
+        """
+        for key, value in settings.items():
+            if not value:
+                continue
+            if key == 'registry':
+                self.registry = value.rstrip('/')
+            elif key.startswith('@') and key.endswith(':registry'):
+                self.scopes[key[:-len(':registry')]] = value.rstrip('/')
+            elif key in ('fetch-timeout', 'fetch_timeout'):
+                try:
+                    milliseconds = float(value)
+                except ValueError:
+                    continue
+                if milliseconds > 0:
+                    self.fetch_timeout = milliseconds / 1000
+
+
+def load_registry_config(project_root=None, env=None):
+    """
+    Work out the registry configuration the way npm layers it.
+
+    Later sources win: the user's ~/.npmrc (or NPM_CONFIG_USERCONFIG), the project's
+    .npmrc, npm_config_* environment variables (e.g. npm_config_registry,
+    npm_config_fetch_timeout or 'npm_config_@myorg:registry'), and finally NPM_REGISTRY_URL.
+
+    Args:
+    project_root (str): Directory holding the project's package.json, if any
+    env (dict): Environment to read (default: os.environ)
+
+    Returns:
+    RegistryConfig: The merged configuration
+    """
+    env = os.environ if env is None else env
+    config = RegistryConfig()
+
+    paths = [get_user_npmrc_path(env)]
+    if project_root is not None:
+        paths.append(os.path.join(project_root, '.npmrc'))
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                config.update(parse_npmrc(f.read(), env))
+        except OSError:
+            continue
+
+    prefix = 'npm_config_'
+    config.update({key[len(prefix):].lower(): value for key, value in env.items()
+                   if key.lower().startswith(prefix)})
+    if env.get('NPM_REGISTRY_URL'):
+        config.registry = env['NPM_REGISTRY_URL'].rstrip('/')
+    return config
@@ -0,0 +1,287 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+_VERSION_RE = re.compile(
+    r'^\s*[v=]?\s*(\d+)\.(\d+)\.(\d+)'
+    r'(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?'
+    r'(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?\s*$'
+)
+_PARTIAL_RE = re.compile(
+    r'^[v=]?(\*|[xX]|\d+)(?:\.(\*|[xX]|\d+)(?:\.(\*|[xX]|\d+)'
+    r'(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?'
+    r'(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?)?)?$'
+)
+_OPERATOR_RE = re.compile(r'(\^|~>?|>=|<=|>|<|=)\s+')
+_HYPHEN_RE = re.compile(r'^\s*(\S+)\s+-\s+(\S+)\s*$')
+
+# Sort key of the lowest possible version; used for bounds that exclude everything
+_NOTHING = (0, 0, 0, 0, ())
+
+
+def _prerelease_key(prerelease):
+    if not prerelease:
+        return 1, ()
+    return 0, tuple((0, int(part)) if part.isdigit() else (1, part) for part in prerelease.split('.'))
+
+
+def _make_key(major, minor, patch, prerelease=None):
+    return (major, minor, patch) + _prerelease_key(prerelease)
+
+
+def parse_version(version):
+    """
+    Parse a semver string into a tuple that sorts in semver precedence order.
+
+    Args:
+    version (str): Version string such as '1.2.3' or '2.0.0-beta.1'
+
+    Returns:
+    tuple: Sort key (major, minor, patch, is_release, prerelease identifiers), or None if invalid
+    """
+    match = _VERSION_RE.match(version)
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return _make_key(int(major), int(minor), int(patch), prerelease)
+
+
+def _is_wildcard(part):
+    return part is None or part in ('*', 'x', 'X')
+
+
+def _parse_partial(text):
+    match = _PARTIAL_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid version in range: {text}")
+    major, minor, patch, prerelease = match.groups()
+    parts = []
+    for part in (major, minor, patch):
+        if _is_wildcard(part):
+            break
+        parts.append(int(part))
+    return parts, prerelease
+
+
+def _lower(parts, prerelease=None):
+    padded = parts + [0] * (3 - len(parts))
+    return _make_key(*padded, prerelease)
+
+
+def _next_upper(parts):
+    """Exclusive upper bound for a partial version: '1' -> <2.0.0-0, '1.2' -> <1.3.0-0."""
+    bumped = parts[:-1] + [parts[-1] + 1]
+    bumped += [0] * (3 - len(bumped))
+    return _make_key(*bumped, '0')
+
+
+def _expand(operator, text):
+    """Turn one comparator token into (operator, key) primitives and the prerelease base it allows."""
+    parts, prerelease = _parse_partial(text)
+    allowed = tuple(parts) if prerelease else None
+
+    if operator in ('', '='):
+        if not parts:
+            return [], allowed
+        if len(parts) == 3:
+            return [('=', _lower(parts, prerelease))], allowed
+        return [('>=', _lower(parts)), ('<', _next_upper(parts))], allowed
+
+    if operator in ('~', '~>'):
+        if not parts:
+            return [], allowed
+        upper = _next_upper(parts[:2])
+        return [('>=', _lower(parts, prerelease)), ('<', upper)], allowed
+
+    if operator == '^':
+        if not parts:
+            return [], allowed
+        if parts[0] != 0 or len(parts) == 1:
+            upper = _next_upper(parts[:1])
+        elif len(parts) == 2 or parts[1] != 0:
+            upper = _next_upper(parts[:2])
+        else:
+            upper = _next_upper(parts)
+        return [('>=', _lower(parts, prerelease)), ('<', upper)], allowed
+
+    if operator == '>':
+        if not parts:
+            return [('<', _NOTHING)], allowed
+        if len(parts) == 3:
+            return [('>', _lower(parts, prerelease))], allowed
+        return [('>=', _next_upper(parts)[:3] + (1, ()))], allowed
+
+    if operator == '>=':
+        if not parts:
+            return [], allowed
+        return [('>=', _lower(parts, prerelease))], allowed
+
+    if operator == '<':
+        if not parts:
+            return [('<', _NOTHING)], allowed
+        if len(parts) == 3:
+            return [('<', _lower(parts, prerelease))], allowed
+        return [('<', _lower(parts, '0'))], allowed
+
+    if operator == '<=':
+        if not parts:
+            return [], allowed
+        if len(parts) == 3:
+            return [('<=', _lower(parts, prerelease))], allowed
+        return [('<', _next_upper(parts))], allowed
+
+    raise ValueError(f"Unknown range operator: {operator}")
+
+
+_TESTS = {
+    '=': lambda key, bound: key == bound,
+    '>': lambda key, bound: key > bound,
+    '>=': lambda key, bound: key >= bound,
+    '<': lambda key, bound: key < bound,
+    '<=': lambda key, bound: key <= bound,
+}
+
+
+class _ComparatorSet:
+    def __init__(self, comparators, prerelease_bases):
+        self.comparators = comparators
+        self.prerelease_bases = prerelease_bases
+        self.lower = None
+        self.upper = None
+        self.upper_inclusive = True
+        for operator, bound in comparators:
+            if operator in ('>', '>=', '=') and (self.lower is None or bound > self.lower):
+                self.lower = bound
+            if operator in ('<', '<=', '=') and (self.upper is None or bound < self.upper):
+                self.upper = bound
+                self.upper_inclusive = operator != '<'
+
+    def test(self, key):
+        for operator, bound in self.comparators:
+            if not _TESTS[operator](key, bound):
+                return False
+        # npm only lets a prerelease through when the range names a prerelease of the same version
+        if key[3] == 0 and key[:3] not in self.prerelease_bases:
+            return False
+        return True
+
+
+class VersionRange:
+    """
+    An npm version range compiled into comparator sets.
+
+    A version satisfies the range if it satisfies every comparator of at least one
+    set (sets come from '||'-separated alternatives).
+    """
+
+    def __init__(self, raw, comparator_sets):
+        self.raw = raw
+        self.comparator_sets = comparator_sets
+
+    def test(self, version):
+        key = parse_version(version) if isinstance(version, str) else version
+        if key is None:
+            return False
+        return any(comparator_set.test(key) for comparator_set in self.comparator_sets)
+
+    def __repr__(self):
+        return f"VersionRange({self.raw!r})"
+
+
+def _compile_set(text):
+    hyphen = _HYPHEN_RE.match(text)
+    if hyphen:
+        low_parts, low_pre = _parse_partial(hyphen.group(1))
+        high_parts, high_pre = _parse_partial(hyphen.group(2))
+        comparators = []
+        bases = set()
+        if low_parts:
+            comparators.append(('>=', _lower(low_parts, low_pre)))
+            if low_pre:
+                bases.add(tuple(low_parts))
+        if high_parts:
+            if len(high_parts) == 3:
+                comparators.append(('<=', _lower(high_parts, high_pre)))
+            else:
+                comparators.append(('<', _next_upper(high_parts)))
+            if high_pre:
+                bases.add(tuple(high_parts))
+        return _ComparatorSet(comparators, bases)
+
+    comparators = []
+    bases = set()
+    for token in _OPERATOR_RE.sub(r'\1', text).split():
+        operator = re.match(r'^(\^|~>?|>=|<=|>|<|=)?', token).group(0)
+        expanded, allowed = _expand(operator, token[len(operator):])
+        comparators.extend(expanded)
+        if allowed:
+            bases.add(allowed)
+    return _ComparatorSet(comparators, bases)
+
+
+@lru_cache(maxsize=4096)
+def compile_range(requirement):
+    """
+    Compile an npm range expression once so it can be tested against many versions.
+
+    Supports '||' alternatives, hyphen ranges, x-ranges ('1.x', '1.2.*', '*'),
+    tilde and caret ranges, primitive comparators ('>=1 <2') and prerelease tags.
+
+    Args:
+    requirement (str): npm range such as '^1.2.0 || >=3.0.0-rc.1 <3.1'
+
+    Returns:
+    VersionRange: The compiled range
+
+    Raises:
+    ValueError: If the requirement is not a valid npm range
+    """
+    alternatives = [part.strip() for part in requirement.split('||')]
+    return VersionRange(requirement, [_compile_set(part) for part in alternatives])
+
+
+class VersionIndex:
+    """
+    A package's published versions, parsed once and kept in precedence order.
+    """
+
+    def __init__(self, versions):
+        parsed = []
+        for version in versions:
+            key = parse_version(version)
+            if key is not None:
+                parsed.append((key, version))
+        parsed.sort()
+        self.keys = [key for key, _ in parsed]
+        self.versions = [version for _, version in parsed]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def max_satisfying(self, version_range):
+        """
+        Return the highest version satisfying version_range, or None.
+
+        Each comparator set bisects to its upper bound and scans downwards, stopping
+        at its lower bound, so typically only a handful of versions are tested.
+
+        Args:
+        version_range (VersionRange): A compiled range
+
+        Returns:
+        str: The highest satisfying version, or None
+        """
+        best = -1
+        for comparator_set in version_range.comparator_sets:
+            if comparator_set.upper is None:
+                stop = len(self.keys)
+            elif comparator_set.upper_inclusive:
+                stop = bisect_right(self.keys, comparator_set.upper)
+            else:
+                stop = bisect_left(self.keys, comparator_set.upper)
+            start = 0 if comparator_set.lower is None else bisect_left(self.keys, comparator_set.lower)
+            for i in range(stop - 1, max(start, best + 1) - 1, -1):
+                if comparator_set.test(self.keys[i]):
+                    best = i
+                    break
+        return self.versions[best] if best >= 0 else None
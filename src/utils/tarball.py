@@ -0,0 +1,144 @@
+import base64
+import hashlib
+import os
+import shutil
+import stat
+import tarfile
+
+CHUNK_SIZE = 64 * 1024
+
+# Strongest first; npm picks the strongest algorithm it understands
+_ALGORITHMS = ('sha512', 'sha384', 'sha256', 'sha1')
+
+
+def dist_integrity(dist):
+    """
+    Return the Subresource Integrity string for a registry 'dist' object.
+
+    Older packages only publish a hex sha1 'shasum', which is converted to SRI form.
+
+    Args:
+    dist (dict): The 'dist' object of a package version
+
+    Returns:
+    str: Integrity string such as 'sha512-...', or None if the registry published none
+    """
+    if dist.get('integrity'):
+        return dist['integrity']
+    if dist.get('shasum'):
+        return 'sha1-' + base64.b64encode(bytes.fromhex(dist['shasum'])).decode()
+    return None
+
+
+def parse_integrity(integrity):
+    """
+    Pick the strongest supported hash out of an SRI integrity string.
+
+    Args:
+    integrity (str): One or more whitespace-separated 'algorithm-base64digest' entries
+
+    Returns:
+    tuple: (algorithm, expected digest bytes), or None if nothing usable was found
+    """
+    candidates = {}
+    for entry in (integrity or '').split():
+        algorithm, _, digest = entry.partition('-')
+        if algorithm in _ALGORITHMS and digest:
+            candidates.setdefault(algorithm, base64.b64decode(digest.split('?')[0]))
+    for algorithm in _ALGORITHMS:
+        if algorithm in candidates:
+            return algorithm, candidates[algorithm]
+    return None
+
+
+class _HashingReader:
+    """File-like wrapper that hashes every byte read through it."""
+
+    def __init__(self, raw, hasher, on_bytes=None):
+        self.raw = raw
+        self.hasher = hasher
+        self.on_bytes = on_bytes
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if chunk:
+            self.hasher.update(chunk)
+            self.bytes_read += len(chunk)
+            if self.on_bytes:
+                self.on_bytes(len(chunk))
+        return chunk
+
+
+def _member_path(target_dir, name):
+    # npm tarballs nest everything under a single top-level folder, usually 'package/'
+    name = name.replace('\\', '/')
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    # Absolute names, parent references and drive letters could point outside the package
+    if len(parts) < 2 or '..' in parts or name.startswith('/') or ':' in parts[0]:
+        return None
+    return os.path.join(target_dir, *parts[1:])
+
+
+def extract_tarball(stream, target_dir, integrity=None, chunk_size=CHUNK_SIZE, on_bytes=None):
+    """
+    Stream a gzipped package tarball to disk while verifying its integrity.
+
+    The stream is read in fixed-size chunks through gzip and tar, so memory use does
+    not depend on the tarball size. Files are written to a temporary sibling directory
+    that is renamed to target_dir only after the digest matched.
+
+    Args:
+    stream: File-like object yielding the raw .tgz bytes (e.g. an HTTP response body)
+    target_dir (str): Directory the package contents should end up in
+    integrity (str): Expected SRI integrity string; skipped if None
+    chunk_size (int): Read size used while copying file contents
+    on_bytes (callable): Called with the number of tarball bytes after every read
+
+    Returns:
+    str: The SRI integrity string actually computed for the tarball
+
+    Raises:
+    ValueError: If the tarball does not match the expected integrity
+    """
+    expected = parse_integrity(integrity)
+    algorithm = expected[0] if expected else 'sha512'
+    reader = _HashingReader(stream, hashlib.new(algorithm), on_bytes)
+
+    tmp_dir = f"{target_dir}.tmp-{os.getpid()}-{id(reader)}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        with tarfile.open(fileobj=reader, mode='r|gz', bufsize=chunk_size) as tar:
+            for member in tar:
+                path = _member_path(tmp_dir, member.name)
+                if path is None:
+                    continue
+                if member.isdir():
+                    os.makedirs(path, exist_ok=True)
+                elif member.isfile():
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with tar.extractfile(member) as src, open(path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, chunk_size)
+                    os.chmod(path, 0o755 if member.mode & stat.S_IXUSR else 0o644)
+                # Links and special files are ignored, as npm does
+
+        # Hash any trailing padding too, so the digest covers the whole tarball
+        while reader.read(chunk_size):
+            pass
+
+        digest = reader.hasher.digest()
+        if expected and digest != expected[1]:
+            raise ValueError(f"Integrity check failed: expected {integrity}, got "
+                             f"{algorithm}-{base64.b64encode(digest).decode()}")
+
+        if os.path.islink(target_dir):
+            os.unlink(target_dir)
+        elif os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        os.makedirs(os.path.dirname(os.path.abspath(target_dir)), exist_ok=True)
+        os.rename(tmp_dir, target_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return f"{algorithm}-{base64.b64encode(digest).decode()}"
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.registry_server import LocalRegistryServer, RegistryFaults
+from benchmarks.synthetic_registry import FixtureRegistry
+from src.dependency_resolver import DependencyResolver
+from src.installation_animator import InstallationAnimator
+from src.utils.registry_client import RetryPolicy
+import src.utils.npm_api as npm_api
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'registry')
+
+
+class RegistryTestCase(unittest.TestCase):
+    """
+    Base class for tests that talk to a LocalRegistryServer.
+
+    Every test gets a temporary directory and a fresh npm_api: its own session,
+    in-memory packument cache, registry settings and concurrency limits, all put back
+    afterwards. Installs run in an environment whose package cache and user .npmrc
+    live in the temporary directory, so nothing touches ~/.cache/pydep.
+    """
+
+    retry_policy = RetryPolicy(base_delay=0.001, max_retry_after=0.01)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.registry = FixtureRegistry.from_directory(FIXTURES_DIR)
+        self.server = None
+        self.project_dir = os.path.join(self.tmp_dir, 'project')
+        self.package_json_path = os.path.join(self.project_dir, 'package.json')
+        self.node_modules_path = os.path.join(self.project_dir, 'node_modules')
+        for patcher in (patch.multiple(npm_api, NPM_REGISTRY_URL=npm_api.NPM_REGISTRY_URL, _scope_registries={},
+                                       _network_mode='online', _timeout=npm_api._timeout, _session=None,
+                                       _packument_cache=npm_api.PackumentCache(), _retry_policy=self.retry_policy),
+                        patch.dict(npm_api._limits)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: npm_api.get_session().close())
+
+    def serve(self, registry=None, **faults):
+        """
+        Start a server for registry (default: self.registry) and point npm_api at it.
+
+        Args:
+        registry: FixtureRegistry or SyntheticRegistry to serve
+        **faults: RegistryFaults settings, e.g. latency=0.05
+
+        Returns:
+        LocalRegistryServer: The running server, stopped when the test ends
+        """
+        self.server = LocalRegistryServer(registry or self.registry, RegistryFaults(**faults)).start()
+        self.addCleanup(self.server.stop)
+        npm_api.NPM_REGISTRY_URL = self.server.url
+        return self.server
+
+    def write_project(self, dependencies):
+        """Write the test project's package.json with the given dependencies."""
+        os.makedirs(self.project_dir, exist_ok=True)
+        with open(self.package_json_path, 'w') as f:
+            json.dump({'dependencies': dependencies}, f)
+
+    def install_environment(self, **overrides):
+        """Patch os.environ so installs use the test's cache directory, registry and no user .npmrc."""
+        environment = {'PYDEP_CACHE_DIR': os.path.join(self.tmp_dir, 'cache'),
+                       'NPM_CONFIG_USERCONFIG': os.path.join(self.tmp_dir, 'missing.npmrc')}
+        if self.server is not None:
+            environment['NPM_REGISTRY_URL'] = self.server.url
+        environment.update(overrides)
+        return patch.dict(os.environ, environment)
+
+    def install(self, dependencies=None, jobs=4, **options):
+        """
+        Install the test project quietly from the server.
+
+        Args:
+        dependencies (dict): package.json dependencies to write first (default: keep the project as is)
+        jobs (int): Parallel jobs of the resolver
+        **options: Further DependencyResolver arguments, e.g. network_mode='offline'
+
+        Returns:
+        DependencyResolver: The resolver that ran the install
+        """
+        if dependencies is not None:
+            self.write_project(dependencies)
+        with self.install_environment():
+            resolver = DependencyResolver(self.package_json_path, self.node_modules_path, jobs=jobs, **options)
+            resolver.animator = InstallationAnimator('quiet')
+            with patch('sys.stderr'):
+                resolver.resolve_and_install_dependencies(visualize=False)
+        return resolver
@@ -0,0 +1,107 @@
+import io
+import json
+import tarfile
+import unittest
+
+from benchmarks.run import compare_results, run_benchmarks, run_install
+from benchmarks.synthetic_registry import ABBREVIATED_MEDIA_TYPE, SyntheticRegistry, sri_integrity
+
+
+class TestSyntheticRegistry(unittest.TestCase):
+    def test_same_seed_generates_same_registry(self):
+        first = SyntheticRegistry(nodes=60, fanout=3, churn=0.5, cycles=3, seed=7)
+        second = SyntheticRegistry(nodes=60, fanout=3, churn=0.5, cycles=3, seed=7)
+        other = SyntheticRegistry(nodes=60, fanout=3, churn=0.5, cycles=3, seed=8)
+
+        self.assertEqual(first.packuments, second.packuments)
+        self.assertNotEqual(first.dependencies, other.dependencies)
+
+    def test_every_package_is_reachable_from_the_roots(self):
+        registry = SyntheticRegistry(nodes=200, fanout=2, diamonds=0.5, roots=5)
+
+        reached = set(registry.root_dependencies)
+        stack = list(reached)
+        while stack:
+            for dep in registry.dependencies[stack.pop()]:
+                if dep not in reached:
+                    reached.add(dep)
+                    stack.append(dep)
+        self.assertEqual(reached, set(registry.names))
+
+    def test_cycles_add_back_edges(self):
+        registry = SyntheticRegistry(nodes=50, fanout=2, cycles=5)
+
+        back_edges = [(name, dep) for name, deps in registry.dependencies.items() for dep in deps if dep < name]
+        self.assertTrue(back_edges)
+
+    def test_routes_serve_packuments_versions_and_tarballs(self):
+        registry = SyntheticRegistry(nodes=3, fanout=1, roots=1)
+        name = registry.names[0]
+
+        kind, status, body, _ = registry.route(f"/{name}")
+        self.assertEqual((kind, status), ('packument', 200))
+        packument = json.loads(body)
+
+        kind, status, body, _ = registry.route(f"/{name}/latest")
+        self.assertEqual((kind, status), ('version', 200))
+        self.assertEqual(json.loads(body)['version'], packument['dist-tags']['latest'])
+
+        dist = packument['versions']['1.0.0']['dist']
+        kind, status, body, _ = registry.route(dist['tarball'].split('registry.npmjs.org')[1])
+        self.assertEqual((kind, status), ('tarball', 200))
+        self.assertEqual(sri_integrity(body), dist['integrity'])
+        with tarfile.open(fileobj=io.BytesIO(body), mode='r:gz') as tar:
+            self.assertIn('package/package.json', tar.getnames())
+
+        self.assertEqual(registry.route('/no-such-package')[1], 404)
+
+    def test_abbreviated_packuments_keep_install_fields_only(self):
+        registry = SyntheticRegistry(nodes=3, fanout=1, roots=1)
+        name = registry.names[0]
+
+        _, _, body, content_type = registry.route(f"/{name}", accept=ABBREVIATED_MEDIA_TYPE)
+        abbreviated = json.loads(body)
+
+        self.assertEqual(content_type, ABBREVIATED_MEDIA_TYPE)
+        self.assertEqual(set(abbreviated), {'name', 'dist-tags', 'versions', 'modified'})
+        self.assertEqual(set(abbreviated['versions']['1.0.0']), {'name', 'version', 'dependencies', 'dist'})
+        self.assertEqual(abbreviated['versions']['1.0.0']['dist'],
+                         registry.packuments[name]['versions']['1.0.0']['dist'])
+        self.assertLess(len(body) * 3, len(registry.route(f"/{name}")[2]))
+
+
+class TestBenchmarkRun(unittest.TestCase):
+    def test_run_install_resolves_and_installs_every_node(self):
+        registry = SyntheticRegistry(nodes=30, fanout=2, versions=2, churn=0.3)
+
+        result = run_install(registry)
+
+        self.assertGreaterEqual(result['nodes'], 30)
+        self.assertEqual(result['installed'], result['nodes'])
+        self.assertEqual(result['requests']['tarball'], result['nodes'])
+        self.assertEqual(result['requests']['packument'], 30)
+        self.assertGreater(result['nodes_per_second'], 0)
+
+    def test_results_compare_against_a_baseline(self):
+        results = run_benchmarks({'tiny': {'nodes': 10, 'fanout': 2}}, repeat=1)
+        scenario = results['scenarios']['tiny']
+        self.assertIn('peak_memory_bytes', scenario)
+        json.dumps(results)
+
+        self.assertEqual(compare_results(results, results), [])
+
+        faster = json.loads(json.dumps(results))
+        faster['scenarios']['tiny']['wall_seconds'] = scenario['wall_seconds'] / 10
+        faster['scenarios']['tiny']['requests']['total'] -= 1
+        regressions = compare_results(results, faster, tolerance=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(any('wall_seconds' in regression for regression in regressions))
+        self.assertTrue(any('registry requests' in regression for regression in regressions))
+
+        different = json.loads(json.dumps(results))
+        different['scenarios']['tiny']['params']['nodes'] = 11
+        self.assertIn('parameters differ', compare_results(results, different)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
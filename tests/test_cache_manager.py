@@ -0,0 +1,207 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.cache_manager import CacheManager
+from src.utils.file_operations import atomic_write_json
+from tests.registry_fixture import RegistryTestCase
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_manager = CacheManager(os.path.join(self.test_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_package(self, name, files):
+        package_path = os.path.join(self.test_dir, 'src', name)
+        for relative_path, content in files.items():
+            path = os.path.join(package_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        return package_path
+
+    def stored_files(self):
+        return [f for _, _, files in os.walk(self.cache_manager.store.files_dir) for f in files]
+
+    def test_identical_files_are_stored_once(self):
+        license_text = 'MIT License'
+        self.cache_manager.cache_package('Module-A', '1.0.0', self.make_package(
+            'a1', {'LICENSE': license_text, 'index.js': 'a1'}))
+        self.cache_manager.cache_package('Module-A', '1.1.0', self.make_package(
+            'a2', {'LICENSE': license_text, 'index.js': 'a2'}))
+
+        self.assertTrue(self.cache_manager.is_cached('Module-A', '1.0.0'))
+        self.assertFalse(self.cache_manager.is_cached('Module-A', '2.0.0'))
+        self.assertEqual(len(self.stored_files()), 3)
+
+    def test_stored_files_are_independent_of_the_package(self):
+        package_path = self.make_package('s', {'index.js': 's'})
+        self.cache_manager.cache_package('Module-S', '1.0.0', package_path)
+        stored_path = self.cache_manager.store.file_path(
+            self.cache_manager.get_package_entry('Module-S', '1.0.0')['files']['index.js']['digest'])
+
+        with open(os.path.join(package_path, 'index.js'), 'w') as f:
+            f.write('edited')
+
+        self.assertNotEqual(os.stat(stored_path).st_ino, os.stat(os.path.join(package_path, 'index.js')).st_ino)
+        self.assertEqual(self.cache_manager.verify()['corrupted'], 0)
+
+    def test_materialize_package(self):
+        self.cache_manager.cache_package('Module-B', '1.0.0', self.make_package(
+            'b', {'package.json': '{}', 'lib/index.js': 'b'}))
+
+        for method in ('copy', 'hardlink'):
+            self.cache_manager.link_method = method
+            target = os.path.join(self.test_dir, 'node_modules', method, 'Module-B')
+            self.cache_manager.materialize_package('Module-B', '1.0.0', target)
+            with open(os.path.join(target, 'lib', 'index.js')) as f:
+                self.assertEqual(f.read(), 'b')
+
+        hardlinked = os.path.join(self.test_dir, 'node_modules', 'hardlink', 'Module-B', 'package.json')
+        self.assertGreater(os.stat(hardlinked).st_nlink, 1)
+
+    def test_auto_detects_link_method(self):
+        self.cache_manager.cache_package('Module-C', '1.0.0', self.make_package('c', {'index.js': 'c'}))
+        self.cache_manager.materialize_package('Module-C', '1.0.0',
+                                               os.path.join(self.test_dir, 'node_modules', 'Module-C'))
+        self.assertIn(self.cache_manager.link_method, ('reflink', 'hardlink', 'copy'))
+
+    def test_link_method_is_detected_once_for_concurrent_workers(self):
+        target_dir = os.path.join(self.test_dir, 'node_modules')
+        barrier = threading.Barrier(8)
+
+        def resolve():
+            barrier.wait(5)
+            return self.cache_manager.resolve_link_method(target_dir)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            methods = set(executor.map(lambda _: resolve(), range(8)))
+
+        self.assertEqual(methods, {self.cache_manager.link_method})
+        self.assertEqual(os.listdir(target_dir), [])
+
+    def test_prune_evicts_least_recently_used(self):
+        for i, name in enumerate(['old', 'shared', 'recent']):
+            self.cache_manager.cache_package(name, '1.0.0', self.make_package(
+                name, {'LICENSE': 'x' * 100, 'index.js': name * 1000}))
+            os.utime(self.cache_manager.get_cache_path(name, '1.0.0'), (1000 + i, 1000 + i))
+
+        result = self.cache_manager.prune(max_size=12500)
+
+        self.assertEqual(result['evicted'], 1)
+        self.assertFalse(self.cache_manager.is_cached('old', '1.0.0'))
+        self.assertTrue(self.cache_manager.is_cached('recent', '1.0.0'))
+        # The LICENSE file is still referenced by the remaining packages
+        self.assertEqual(self.cache_manager.get_stats()['files'], 3)
+
+    def test_stats_leave_the_recorded_usage_alone(self):
+        self.cache_manager.cache_package('Module-G', '1.0.0', self.make_package('g', {'index.js': 'g'}))
+
+        self.assertEqual(self.cache_manager.get_stats()['packages'], 1)
+        self.assertFalse(os.path.exists(self.cache_manager.usage_path))
+
+    def test_concurrent_budget_checks_add_up_usage(self):
+        atomic_write_json(self.cache_manager.usage_path, {'bytes': 0})
+        read_usage = CacheManager._read_usage
+
+        def slow_read(cache_manager):
+            usage = read_usage(cache_manager)
+            time.sleep(0.1)  # another install checks its budget meanwhile
+            return usage
+
+        installs = [CacheManager(self.cache_manager.cache_dir, max_size=10_000) for _ in range(2)]
+        for cache_manager in installs:
+            cache_manager.store.bytes_added = 100
+        with patch.object(CacheManager, '_read_usage', slow_read):
+            threads = [threading.Thread(target=cache_manager.enforce_budget) for cache_manager in installs]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(self.cache_manager._read_usage(), 200)
+
+    def test_verify_drops_corrupted_packages(self):
+        self.cache_manager.cache_package('Module-D', '1.0.0', self.make_package('d', {'index.js': 'd'}))
+        entry = self.cache_manager.get_package_entry('Module-D', '1.0.0')
+        with open(self.cache_manager.store.file_path(entry['files']['index.js']['digest']), 'w') as f:
+            f.write('tampered')
+
+        result = self.cache_manager.verify()
+
+        self.assertEqual(result['corrupted'], 1)
+        self.assertFalse(self.cache_manager.is_cached('Module-D', '1.0.0'))
+
+    def test_materializing_an_evicted_package_reports_a_miss(self):
+        self.cache_manager.cache_package('Module-E', '1.0.0', self.make_package('e', {'index.js': 'e'}))
+        self.assertTrue(self.cache_manager.is_cached('Module-E', '1.0.0'))
+        self.cache_manager.prune(max_size=0)
+
+        target = os.path.join(self.test_dir, 'node_modules', 'Module-E')
+        self.assertFalse(self.cache_manager.materialize_package('Module-E', '1.0.0', target))
+        self.assertFalse(os.path.exists(target))
+
+    def test_failed_publish_keeps_the_previous_entry(self):
+        self.cache_manager.cache_package('Module-F', '1.0.0', self.make_package('f1', {'index.js': 'f1'}),
+                                         integrity='sha512-first')
+
+        def write_half(data, f):
+            f.write(json.dumps(data)[:10])
+            raise OSError('No space left on device')
+
+        with patch('src.utils.file_operations.json.dump', write_half), self.assertRaises(OSError):
+            self.cache_manager.cache_package('Module-F', '1.0.0', self.make_package('f2', {'index.js': 'f2'}),
+                                             integrity='sha512-second')
+
+        # Readers still see the complete old entry, and no temporary file is left next to it
+        self.assertEqual(self.cache_manager.get_package_entry('Module-F', '1.0.0')['integrity'], 'sha512-first')
+        self.assertEqual([name for name in os.listdir(self.cache_manager.index_dir) if name.endswith('.tmp')], [])
+
+
+class TestSharedCache(RegistryTestCase):
+    def run_installs(self, count):
+        server = self.serve()
+        processes = []
+        for i in range(count):
+            project_dir = os.path.join(self.tmp_dir, f"project-{i}")
+            os.makedirs(project_dir)
+            with open(os.path.join(project_dir, 'package.json'), 'w') as f:
+                json.dump({'dependencies': {'Module-A': '^1.0.0', 'Module-C': '^1.0.0'}}, f)
+            with self.install_environment(PYTHONPATH=ROOT_DIR):
+                processes.append(subprocess.Popen(
+                    [sys.executable, os.path.join(ROOT_DIR, 'main.py'), 'install', '--quiet', '--jobs', '4'],
+                    cwd=project_dir, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE))
+        for process in processes:
+            _, stderr = process.communicate(timeout=60)
+            self.assertEqual(process.returncode, 0, stderr.decode())
+        return server
+
+    def test_concurrent_installs_download_each_tarball_once(self):
+        server = self.run_installs(4)
+
+        # Module-A, Module-C and two versions of Module-B
+        self.assertEqual(server.stats.snapshot()['requests']['tarball'], 4)
+        cache_manager = CacheManager(os.path.join(self.tmp_dir, 'cache'))
+        for package, version in [('Module-A', '1.1.0'), ('Module-B', '1.5.0'), ('Module-B', '2.0.0'),
+                                 ('Module-C', '1.3.0')]:
+            self.assertEqual(cache_manager.get_package_entry(package, version)['version'], version)
+        for i in range(4):
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp_dir, f"project-{i}", 'node_modules',
+                                                        'Module-C', 'node_modules', 'Module-B', 'package.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
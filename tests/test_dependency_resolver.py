@@ -1,126 +1,220 @@
-import unittest
+import json
 import os
 import shutil
-from unittest.mock import patch, MagicMock
-from src.dependency_resolver import DependencyResolver
-from tests.mock_npm_api import MockNpmApi
-from tests.mock_file_operations import MockFileOperations
-
-
-class TestDependencyResolver(unittest.TestCase):
-    def setUp(self):
-        self.test_dir = 'test_project'
-        os.makedirs(self.test_dir, exist_ok=True)
-        self.package_json_path = os.path.join(self.test_dir, 'package.json')
-        self.node_modules_path = os.path.join(self.test_dir, 'node_modules')
-        self.lock_file_path = os.path.join(self.test_dir, 'package-lock.json')
-
-    def tearDown(self):
-        shutil.rmtree(self.test_dir)
-
-    @patch('src.dependency_resolver.get_latest_satisfying_version', MockNpmApi.get_latest_satisfying_version)
-    @patch('src.dependency_resolver.fetch_package_info', MockNpmApi.fetch_package_info)
-    @patch('src.dependency_resolver.download_package', MockNpmApi.download_package)
-    @patch('src.dependency_resolver.create_directory', MockFileOperations.create_directory)
-    @patch('src.dependency_resolver.read_package_json', MockFileOperations.read_package_json)
-    @patch('src.dependency_resolver.write_package_json', MockFileOperations.write_package_json)
-    @patch('src.dependency_resolver.LockFileManager.read_lock_file', MockFileOperations.read_lock_file)
-    @patch('src.dependency_resolver.LockFileManager.write_lock_file', MockFileOperations.write_lock_file)
-    def test_resolve_and_install_dependencies(self):
-        mock_lock_file_manager = MagicMock()
-        mock_lock_file_manager.is_lock_file_current.return_value = False
-        mock_lock_file_manager.read_lock_file.return_value = None
-
-        resolver = DependencyResolver(self.package_json_path, self.node_modules_path)
-        resolver.lock_file_manager = mock_lock_file_manager
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.synthetic_registry import FixtureRegistry, SyntheticRegistry
+from src.cache_manager import CacheManager
+from src.dependency_resolver import DependencyResolver, InstallError
+from src.installation_animator import InstallationAnimator
+from src.package_validator import PackageValidator
+from tests.registry_fixture import RegistryTestCase
+
+# Diamond: Module-A and Module-B both depend on Module-C, which depends on Module-D
+DIAMOND = FixtureRegistry({
+    'Module-A': {'versions': {'1.0.0': {'dependencies': {'Module-C': '^1.0.0'}}}},
+    'Module-B': {'versions': {'1.0.0': {'dependencies': {'Module-C': '^1.0.0'}}}},
+    'Module-C': {'versions': {'1.0.0': {'dependencies': {'Module-D': '^1.0.0'}}}},
+    'Module-D': {'versions': {'1.0.0': {}}},
+})
+
+# tests/fixtures/registry: A, C, D and E each depend on a different range of Module-B
+ROOT_DEPENDENCIES = {'Module-A': '^1.0.0', 'Module-C': '^1.0.0', 'Module-D': '^1.0.0', 'Module-E': '^2.0.0'}
+
+
+class NeverExpanded(set):
+    def add(self, key):
+        pass
+
+
+class TestDependencyResolver(RegistryTestCase):
+    def resolve(self, dependencies, jobs, memoize=True):
+        """Resolve dependencies from the server without installing them."""
+        self.write_project(dependencies)
+        with self.install_environment():
+            resolver = DependencyResolver(self.package_json_path, self.node_modules_path, jobs=jobs)
+            resolver.animator = InstallationAnimator('quiet')
+            if not memoize:
+                # Forget every expansion, so each visit walks the subtree again
+                resolver.expanded_packages = NeverExpanded()
+            resolver.resolve_dependencies(dependencies)
+        return resolver
 
-        resolved_dependencies, installation_order = resolver.resolve_and_install_dependencies(visualize=False)
+    def test_resolve_and_install_dependencies(self):
+        self.serve()
 
-        # Check if all expected modules are in resolved_dependencies
-        expected_modules = ['Module-A', 'Module-B', 'Module-C', 'Module-D', 'Module-E']
-        for module in expected_modules:
-            self.assertTrue(any(module in key for key in resolved_dependencies.keys()))
+        resolver = self.install(ROOT_DEPENDENCIES, jobs=1)
+        resolved_dependencies = resolver.resolved_dependencies
 
-        # Check if Module-B has two different versions
+        # Module-B is needed in three versions
         module_b_versions = [ver for pkg, ver in resolved_dependencies.keys() if pkg == 'Module-B']
-        self.assertEqual(len(set(module_b_versions)), 2)
+        self.assertEqual(sorted(module_b_versions), ['1.0.0', '1.5.0', '2.0.0'])
 
         # Check dependencies
-        self.assertIn(('Module-A', '2.0.0'), resolved_dependencies[('Module-B', '1.5.0')])
-        self.assertIn(('Module-E', '2.1.0'), resolved_dependencies[('Module-B', '1.0.0')])
-        self.assertIn(('Module-C', '1.3.0'), resolved_dependencies[('Module-B', '2.0.0')])
-        self.assertIn(('Module-D', '1.2.0'), resolved_dependencies[('Module-B', '1.5.0')])
+        self.assertEqual(resolved_dependencies[('Module-B', '1.5.0')], {('Module-A', '1.1.0'), ('Module-D', '1.2.0')})
+        self.assertEqual(resolved_dependencies[('Module-B', '1.0.0')], {('Module-E', '2.1.0')})
+        self.assertEqual(resolved_dependencies[('Module-B', '2.0.0')], {('Module-C', '1.3.0')})
 
-        # Check if lock file was written
-        mock_lock_file_manager.write_lock_file.assert_called_once()
+        self.assertTrue(os.path.exists(os.path.join(self.project_dir, 'package-lock.json')))
 
         # Check installation order
-        self.assertEqual(len(installation_order), len(resolved_dependencies))
-        for package, version in installation_order:
+        self.assertEqual(len(resolver.installation_order), len(resolved_dependencies))
+        for package, version in resolver.installation_order:
             self.assertIn((package, version), resolved_dependencies)
 
-    @patch('src.dependency_resolver.read_package_json', MockFileOperations.read_package_json)
-    @patch('src.dependency_resolver.LockFileManager.read_lock_file', MockFileOperations.read_lock_file)
-    def test_use_lock_file(self):
-        mock_lock_file_manager = MagicMock()
-        mock_lock_file_manager.is_lock_file_current.return_value = True
-        mock_lock_file_manager.read_lock_file.return_value = {
-            'dependencies': {
-                'Module-A': {'version': '1.1.0', 'dependencies': {'Module-B': '1.0.0'}},
-                'Module-B': {'version': '1.0.0', 'dependencies': {}},
-                'Module-C': {'version': '1.2.0', 'dependencies': {'Module-B': '2.0.0'}},
-                'Module-D': {'version': '1.1.0', 'dependencies': {'Module-B': '1.5.0'}},
-                'Module-E': {'version': '2.0.0', 'dependencies': {'Module-B': '1.0.0'}}
-            }
-        }
-
-        resolver = DependencyResolver(self.package_json_path, self.node_modules_path)
-        resolver.lock_file_manager = mock_lock_file_manager
-
-        resolved_dependencies, installation_order = resolver.resolve_and_install_dependencies(visualize=False)
-
-        # Check if resolved dependencies match lock file
-        expected_deps = mock_lock_file_manager.read_lock_file()['dependencies']
-        for module, info in expected_deps.items():
-            self.assertIn((module, info['version']), resolved_dependencies)
-
-        # Check if lock file was not written (as it was already up-to-date)
-        mock_lock_file_manager.write_lock_file.assert_not_called()
+    def test_packages_without_readme_or_license_install(self):
+        self.serve(FixtureRegistry({
+            'no-docs': {'versions': {'1.0.0': {}}},
+            'lowercase-docs': {'versions': {'1.0.0': {'dependencies': {'no-docs': '^1.0.0'}}}},
+        }))
+
+        self.install({'lowercase-docs': '^1.0.0'})
+
+        # Package names pick the tarball layout (see benchmarks.synthetic_registry.DOC_LAYOUTS)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.node_modules_path, 'no-docs'))), ['package.json'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.node_modules_path, 'lowercase-docs'))),
+                         ['license', 'package.json', 'readme.md'])
+
+    def test_packages_that_failed_verification_are_installed_again(self):
+        self.serve()
+        check_package = PackageValidator.check_package
+
+        def reject_module_b(validator, package, *args, **kwargs):
+            if package == 'Module-B':
+                return ['modified files']
+            return check_package(validator, package, *args, **kwargs)
+
+        with patch.object(PackageValidator, 'check_package', reject_module_b), self.assertRaises(InstallError):
+            self.install({'Module-A': '^1.0.0'})
+
+        resolver = self.install()
+
+        self.assertEqual(resolver.installation_order, [('Module-B', '1.5.0')])
+        self.assertTrue(os.path.exists(os.path.join(self.project_dir, 'package-lock.json')))
+
+    def test_packages_evicted_before_linking_are_downloaded_again(self):
+        server = self.serve()
+        self.install({'Module-A': '^1.0.0'})
+        shutil.rmtree(self.node_modules_path)
+        materialize_package = CacheManager.materialize_package
+
+        def evicted_first(cache_manager, *args):
+            # Another process prunes the cache after the package was found cached
+            cache_manager.prune(max_size=0)
+            return materialize_package(cache_manager, *args)
+
+        with patch.object(CacheManager, 'materialize_package', evicted_first):
+            resolver = self.install()
+
+        self.assertEqual(len(resolver.installation_order), 2)
+        self.assertEqual(server.stats.snapshot()['requests']['tarball'], 4)
+
+    def test_editing_an_installed_package_leaves_the_cache_intact(self):
+        self.serve()
+        self.install({'Module-A': '^1.0.0'}, link_method='copy')
+        installed_path = os.path.join(self.node_modules_path, 'Module-A', 'package.json')
+        with open(installed_path) as f:
+            original = f.read()
+        with open(installed_path, 'a') as f:
+            f.write('\n// patched after install')
+
+        # A second project is installed from the cache alone
+        self.project_dir = os.path.join(self.tmp_dir, 'other-project')
+        self.package_json_path = os.path.join(self.project_dir, 'package.json')
+        self.node_modules_path = os.path.join(self.project_dir, 'node_modules')
+        self.install({'Module-A': '^1.0.0'}, link_method='copy')
+
+        cache_manager = CacheManager(os.path.join(self.tmp_dir, 'cache'))
+        self.assertEqual(cache_manager.verify()['corrupted'], 0)
+        with open(os.path.join(self.node_modules_path, 'Module-A', 'package.json')) as f:
+            self.assertEqual(f.read(), original)
+
+    def test_only_packages_linked_from_the_cache_are_hashed(self):
+        self.serve()
+        downloaded = self.install(ROOT_DEPENDENCIES)
+        shutil.rmtree(self.node_modules_path)
+
+        with patch('src.package_validator.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as pools:
+            linked = self.install()
+
+        # Fresh downloads were hashed once, into the cache; cached ones are checked against it
+        self.assertEqual(downloaded.package_validator.stamps.misses, 0)
+        self.assertGreater(linked.package_validator.stamps.misses, 0)
+        # One hashing pool serves the whole install
+        self.assertEqual(pools.call_count, 1)
+        self.assertIsNone(linked.package_validator._pool)
 
-        # Check installation order
-        self.assertEqual(len(installation_order), len(resolved_dependencies))
-        for package, version in installation_order:
-            self.assertIn((package, version), resolved_dependencies)
+    def test_use_lock_file(self):
+        server = self.serve()
+        self.install(ROOT_DEPENDENCIES)
+        lock_file_path = os.path.join(self.project_dir, 'package-lock.json')
+        with open(lock_file_path) as f:
+            lock_file = f.read()
+        shutil.rmtree(self.node_modules_path)
+        requests_before = server.stats.snapshot()['requests']['total']
+
+        resolver = self.install()
+
+        # Locked versions are installed without asking the registry or rewriting the lock file
+        self.assertEqual(server.stats.snapshot()['requests']['total'], requests_before)
+        with open(lock_file_path) as f:
+            self.assertEqual(f.read(), lock_file)
+        for module, info in json.loads(lock_file)['dependencies'].items():
+            self.assertIn((module, info['version']), resolver.resolved_dependencies)
+        self.assertEqual(len(resolver.installation_order), len(resolver.resolved_dependencies))
 
-    @patch('src.dependency_resolver.get_latest_satisfying_version', MockNpmApi.get_latest_satisfying_version)
-    @patch('src.dependency_resolver.fetch_package_info', MockNpmApi.fetch_package_info)
-    @patch('src.dependency_resolver.download_package', MockNpmApi.download_package)
-    @patch('src.dependency_resolver.create_directory', MockFileOperations.create_directory)
-    @patch('src.dependency_resolver.read_package_json', MockFileOperations.read_package_json)
-    @patch('src.dependency_resolver.write_package_json', MockFileOperations.write_package_json)
-    @patch('src.dependency_resolver.LockFileManager.read_lock_file', MockFileOperations.read_lock_file)
-    @patch('src.dependency_resolver.LockFileManager.write_lock_file', MockFileOperations.write_lock_file)
     def test_circular_dependency_detection(self):
-        # Mock a circular dependency scenario
-        def mock_fetch_package_info(package, version):
-            dependencies = {
-                'Module-A': {'dependencies': {'Module-B': '^1.0.0'}},
-                'Module-B': {'dependencies': {'Module-C': '^1.0.0'}},
-                'Module-C': {'dependencies': {'Module-A': '^1.0.0'}}
-            }
-            return {'version': version, 'dependencies': dependencies.get(package, {})}
-
-        with patch('src.dependency_resolver.fetch_package_info', mock_fetch_package_info):
-            resolver = DependencyResolver(self.package_json_path, self.node_modules_path)
-            resolved_dependencies, installation_order = resolver.resolve_and_install_dependencies(visualize=False)
-
-            # Check if the circular dependency was detected and handled
-            self.assertIn(('Module-A', '2.0.0'), resolved_dependencies)
-            self.assertIn(('Module-B', '2.0.0'), resolved_dependencies)
-            self.assertIn(('Module-C', '1.3.0'), resolved_dependencies)
-
-            # The circular dependency should not cause an infinite loop
-            self.assertLessEqual(len(installation_order), 3)
+        self.serve(FixtureRegistry({
+            'Module-A': {'versions': {'1.0.0': {'dependencies': {'Module-B': '^1.0.0'}}}},
+            'Module-B': {'versions': {'1.0.0': {'dependencies': {'Module-C': '^1.0.0'}}}},
+            'Module-C': {'versions': {'1.0.0': {'dependencies': {'Module-A': '^1.0.0'}}}},
+        }))
+
+        resolver = self.install({'Module-A': '^1.0.0'})
+
+        # The cycle is resolved once per package instead of looping
+        self.assertEqual(set(resolver.resolved_dependencies),
+                         {('Module-A', '1.0.0'), ('Module-B', '1.0.0'), ('Module-C', '1.0.0')})
+        self.assertEqual(resolver.resolved_dependencies[('Module-A', '1.0.0')], set())
+        self.assertEqual(len(resolver.installation_order), 3)
+
+    def test_shared_subtrees_are_expanded_once(self):
+        self.serve(DIAMOND)
+
+        resolver = self.resolve({'Module-A': '^1.0.0', 'Module-B': '^1.0.0'}, jobs=1)
+
+        self.assertEqual(resolver.resolution_stats, {'expanded': 4, 'reused': 1})
+        self.assertEqual(resolver.expanded_packages, set(resolver.resolved_dependencies))
+        self.assertEqual(resolver.resolved_dependencies[('Module-C', '1.0.0')],
+                         {('Module-A', '1.0.0'), ('Module-B', '1.0.0')})
+
+    def test_memoized_expansion_matches_a_full_walk(self):
+        self.serve(DIAMOND)
+        dependencies = {'Module-A': '^1.0.0', 'Module-B': '^1.0.0'}
+        memoized = self.resolve(dependencies, jobs=1)
+
+        full_walk = self.resolve(dependencies, jobs=1, memoize=False)
+
+        self.assertEqual(full_walk.resolution_stats, {'expanded': 6, 'reused': 0})
+        self.assertEqual(list(memoized.resolved_dependencies.items()), list(full_walk.resolved_dependencies.items()))
+
+    def test_prefetch_resolves_the_same_graph_as_a_sequential_walk(self):
+        registry = SyntheticRegistry(nodes=30, fanout=3, diamonds=0.5, churn=0.2, cycles=2, roots=4, seed=7)
+        server = self.serve(registry)
+
+        sequential = self.resolve(registry.root_dependencies, jobs=1)
+        requests_before = server.stats.snapshot()['requests']['total']
+        prefetched = self.resolve(registry.root_dependencies, jobs=8)
+
+        # Same nodes in the same order, with the same parents
+        self.assertEqual(list(prefetched.resolved_dependencies.items()),
+                         list(sequential.resolved_dependencies.items()))
+        self.assertEqual(prefetched.top_level_packages, sequential.top_level_packages)
+        self.assertEqual(prefetched.resolution_stats, sequential.resolution_stats)
+        # The depth-first replay is answered from what the prefetch fetched
+        self.assertEqual(server.stats.snapshot()['requests']['total'] - requests_before, requests_before)
 
 
 if __name__ == '__main__':
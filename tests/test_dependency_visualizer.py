@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+from src.dependency_visualizer import (DependencyIndex, export_dependency_graph, iter_tree_lines,
+                                       visualize_dependency_tree, visualize_installation_tree)
+
+
+class TestDependencyVisualizer(unittest.TestCase):
+    def setUp(self):
+        a, b, c, d = ('a', '1.0.0'), ('b', '1.0.0'), ('c', '1.0.0'), ('d', '1.0.0')
+        # a -> b -> c -> b is a cycle; d shares c
+        self.resolved = OrderedDict([(a, set()), (b, {a, c}), (c, {b, d}), (d, set())])
+
+    def lines(self, **kwargs):
+        return list(iter_tree_lines(DependencyIndex(self.resolved), **kwargs))
+
+    def test_cycles_and_shared_subtrees_are_printed_once(self):
+        self.assertEqual(self.lines(), [
+            'a@1.0.0',
+            '└── b@1.0.0',
+            '    └── c@1.0.0',
+            '        └── b@1.0.0 (circular)',
+            'd@1.0.0',
+            '└── c@1.0.0 (deduped)',
+        ])
+
+    def test_depth_limits_output(self):
+        self.assertEqual(self.lines(depth=1), ['a@1.0.0', '└── b@1.0.0', 'd@1.0.0', '└── c@1.0.0'])
+
+    def test_focus_keeps_paths_to_package(self):
+        self.resolved[('e', '1.0.0')] = set()
+        lines = self.lines(focus='d')
+        self.assertEqual(lines[0], 'd@1.0.0')
+        self.assertNotIn('a@1.0.0', lines)
+        self.assertNotIn('e@1.0.0', lines)
+
+    def test_cycle_only_graph_still_renders(self):
+        x, y = ('x', '1.0.0'), ('y', '1.0.0')
+        out = io.StringIO()
+        visualize_dependency_tree({x: {y}, y: {x}}, out=out)
+        self.assertIn('x@1.0.0 (circular)', out.getvalue())
+
+    def test_large_graph_renders_linearly(self):
+        # 50k nodes, each with a tree parent and a second, shared parent
+        resolved = OrderedDict(((f'p{i}', '1.0.0'), {(f'p{j}', '1.0.0') for j in {(i - 1) // 10, i // 3} if j < i})
+                               for i in range(50000))
+        lines = list(iter_tree_lines(DependencyIndex(resolved)))
+        self.assertLess(len(lines), 4 * len(resolved))
+
+    def test_exports(self):
+        out = io.StringIO()
+        export_dependency_graph(self.resolved, 'json', out=out)
+        graph = json.loads(out.getvalue())
+        self.assertEqual(len(graph['nodes']), 4)
+        self.assertIn(['a@1.0.0', 'b@1.0.0'], graph['edges'])
+
+        out = io.StringIO()
+        export_dependency_graph(self.resolved, 'dot', out=out)
+        self.assertIn('"d@1.0.0" -> "c@1.0.0";', out.getvalue())
+
+        out = io.StringIO()
+        export_dependency_graph(self.resolved, 'edges', out=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+class TestInstallationTree(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.node_modules_path = os.path.join(self.test_dir, 'node_modules')
+        for relative_path, content in {
+            'a/package.json': '{}',
+            'a/lib/deep/index.js': 'x' * 10,
+            'a/node_modules/@scope/b/package.json': '{}',
+            'c/package.json': '{}',
+            '.bin/tool': '',
+        }.items():
+            path = os.path.join(self.node_modules_path, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def render(self, **kwargs):
+        out = io.StringIO()
+        summary = visualize_installation_tree(self.node_modules_path, out=out, **kwargs)
+        return out.getvalue().splitlines(), summary
+
+    def test_only_packages_are_listed(self):
+        lines, summary = self.render()
+        self.assertEqual(lines, ['Installation Tree:', '├── a', '│   └── @scope/b', '└── c', '3 packages'])
+        self.assertEqual(summary, {'packages': 3})
+
+    def test_sizes_exclude_nested_packages(self):
+        lines, summary = self.render(sizes=True)
+        self.assertEqual(lines[1], '├── a (2 files, 12 B)')
+        self.assertEqual(summary, {'packages': 3, 'files': 4, 'bytes': 16})
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'symlinks not supported')
+    def test_symlink_cycle_is_not_followed(self):
+        os.symlink(os.path.join(self.node_modules_path, 'a'),
+                   os.path.join(self.node_modules_path, 'a', 'node_modules', 'a-again'))
+        lines, summary = self.render()
+        self.assertIn('│   └── a-again (already listed)', lines)
+        self.assertEqual(summary, {'packages': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from src.commands.install import install_packages, install_command
+from src.utils.npm_api import OfflineError
 
 
 class TestInstallCommand(unittest.TestCase):
@@ -19,7 +20,9 @@ class TestInstallCommand(unittest.TestCase):
         install_packages('package.json', 'node_modules', visualize=True)
 
         # Assertions
-        mock_resolver_class.assert_called_once_with('package.json', 'node_modules')
+        mock_resolver_class.assert_called_once_with('package.json', 'node_modules', jobs=1, link_method='auto',
+                                                    cache_max_size=None, progress='fancy', network_mode='online',
+                                                    profiler=None, fetch_timeout=None)
         mock_resolver.resolve_and_install_dependencies.assert_called_once_with(
             specific_packages=None,
             visualize=True,
@@ -33,6 +36,16 @@ class TestInstallCommand(unittest.TestCase):
         args.packages = []
         args.no_visualize = False
         args.force_visualize = False
+        args.jobs = 8
+        args.link_method = 'auto'
+        args.cache_max_size = None
+        args.frozen = False
+        args.quiet = False
+        args.ndjson = False
+        args.offline = False
+        args.prefer_offline = False
+        args.profile = None
+        args.fetch_timeout = None
 
         # Call the function
         install_command(args)
@@ -40,7 +53,8 @@ class TestInstallCommand(unittest.TestCase):
         # Assertions
         mock_install_packages.assert_called_once_with(
             'package.json', 'node_modules',
-            visualize=True, force_visualize=False
+            visualize=True, force_visualize=False, jobs=8, link_method='auto', cache_max_size=None, frozen=False,
+            progress='fancy', network_mode='online', profile=None, fetch_timeout=None
         )
 
     @patch('src.commands.install.install_packages')
@@ -50,6 +64,16 @@ class TestInstallCommand(unittest.TestCase):
         args.packages = ['package1', 'package2']
         args.no_visualize = True
         args.force_visualize = True
+        args.jobs = 4
+        args.link_method = 'copy'
+        args.cache_max_size = '1G'
+        args.frozen = False
+        args.quiet = False
+        args.ndjson = False
+        args.offline = False
+        args.prefer_offline = False
+        args.profile = None
+        args.fetch_timeout = 30000
 
         # Call the function
         install_command(args)
@@ -58,9 +82,45 @@ class TestInstallCommand(unittest.TestCase):
         mock_install_packages.assert_called_once_with(
             'package.json', 'node_modules',
             specific_packages=['package1', 'package2'],
-            visualize=False, force_visualize=True
+            visualize=False, force_visualize=True, jobs=4, link_method='copy', cache_max_size=1024 ** 3,
+            progress='fancy', network_mode='online', profile=None, fetch_timeout=30.0
         )
 
+    @patch('src.commands.install.DependencyResolver')
+    def test_install_packages_frozen(self, mock_resolver_class):
+        mock_resolver = MagicMock()
+        mock_resolver.install_frozen.return_value = ({('package1', '1.0.0'): set()}, [('package1', '1.0.0')])
+        mock_resolver_class.return_value = mock_resolver
+
+        install_packages('package.json', 'node_modules', frozen=True)
+
+        mock_resolver.install_frozen.assert_called_once_with()
+        mock_resolver.resolve_and_install_dependencies.assert_not_called()
+
+    @patch('src.commands.install.install_packages')
+    def test_install_command_offline(self, mock_install_packages):
+        args = MagicMock()
+        args.packages = []
+        args.no_visualize = True
+        args.force_visualize = False
+        args.jobs = 8
+        args.link_method = 'auto'
+        args.cache_max_size = None
+        args.frozen = False
+        args.quiet = True
+        args.ndjson = False
+        args.offline = True
+        args.prefer_offline = False
+        args.profile = None
+        args.fetch_timeout = None
+        mock_install_packages.side_effect = OfflineError("No cached metadata for left-pad")
+
+        with self.assertRaises(SystemExit) as context:
+            install_command(args)
+
+        self.assertEqual(mock_install_packages.call_args.kwargs['network_mode'], 'offline')
+        self.assertIn('left-pad', str(context.exception.code))
+
 
 if __name__ == '__main__':
     unittest.main()
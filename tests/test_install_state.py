@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.install_state import InstallState
+
+
+class TestInstallState(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.node_modules_path = os.path.join(self.test_dir, 'node_modules')
+        self.nested_path = os.path.join(self.node_modules_path, 'Module-A', 'node_modules')
+        self.targets = [
+            ('Module-A', '1.1.0', self.node_modules_path),
+            ('Module-B', '2.0.0', self.node_modules_path),
+            ('Module-B', '1.0.0', self.nested_path),
+        ]
+        state = InstallState(self.node_modules_path)
+        for package, version, install_path in self.targets:
+            os.makedirs(os.path.join(install_path, package), exist_ok=True)
+            state.record(package, version, install_path, integrity=f'sha512-{package}{version}')
+        state.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def diff(self, targets, prune=True):
+        integrities = {(package, version): f'sha512-{package}{version}' for package, version, _ in targets}
+        return InstallState(self.node_modules_path).load().diff(targets, integrities, prune=prune)
+
+    def test_unchanged_tree_installs_nothing(self):
+        to_install, to_remove, unchanged = self.diff(self.targets)
+
+        self.assertEqual(to_install, [])
+        self.assertEqual(to_remove, [])
+        self.assertEqual(len(unchanged), 3)
+
+    def test_changed_version_replaces_nested_packages(self):
+        targets = [('Module-A', '2.0.0', self.node_modules_path)] + self.targets[1:]
+        to_install, to_remove, unchanged = self.diff(targets)
+
+        self.assertEqual(to_remove, ['Module-A'])
+        self.assertEqual(to_install, [targets[0], targets[2]])
+        self.assertEqual(unchanged, [targets[1]])
+
+    def test_packages_dropped_from_plan_are_removed(self):
+        to_install, to_remove, unchanged = self.diff(self.targets[:2])
+        self.assertEqual(to_remove, ['Module-A/node_modules/Module-B'])
+
+        _, to_remove, _ = self.diff(self.targets[:2], prune=False)
+        self.assertEqual(to_remove, [])
+
+        state = InstallState(self.node_modules_path).load()
+        state.remove(['Module-A'])
+        self.assertFalse(os.path.exists(os.path.join(self.nested_path, 'Module-B')))
+        self.assertEqual(sorted(state.packages), ['Module-B'])
+
+    def test_missing_directory_is_reinstalled(self):
+        shutil.rmtree(os.path.join(self.node_modules_path, 'Module-B'))
+        to_install, _, _ = self.diff(self.targets)
+
+        self.assertEqual(to_install, [self.targets[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
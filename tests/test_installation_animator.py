@@ -0,0 +1,61 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from src.installation_animator import InstallationAnimator
+
+
+class TestInstallationAnimator(unittest.TestCase):
+    def test_ndjson_stream_reports_events(self):
+        stream = io.StringIO()
+        animator = InstallationAnimator('ndjson', stream=stream)
+
+        animator.start_phase('download', total=1)
+        animator.add_bytes(2048)
+        animator.advance('download', 'Module-A', '1.0.0')
+        animator.finish_phase('download')
+        animator.show_final_message(1, 0.5)
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([event['event'] for event in events],
+                         ['phase_start', 'bytes', 'progress', 'bytes', 'phase_end', 'done'])
+        self.assertEqual(events[2]['package'], 'Module-A')
+        self.assertEqual(events[-1]['downloaded_bytes'], 2048)
+
+    def test_concurrency_limits_are_reported(self):
+        stream = io.StringIO()
+        stats = {'metadata': {'limit': 24, 'peak': 24, 'decreases': 0},
+                 'tarball': {'limit': 6, 'peak': 12, 'decreases': 2}}
+
+        InstallationAnimator('ndjson', stream=stream).show_concurrency_stats(stats)
+        self.assertEqual(json.loads(stream.getvalue())['tarball'], stats['tarball'])
+
+        stream = io.StringIO()
+        InstallationAnimator('fancy', stream=stream).show_concurrency_stats(stats)
+        self.assertIn('metadata 24 (peak 24 in flight), tarball 6 (peak 12 in flight, backed off 2x)',
+                      ' '.join(stream.getvalue().split()))
+
+    def test_byte_updates_are_throttled(self):
+        stream = io.StringIO()
+        animator = InstallationAnimator('ndjson', stream=stream)
+        with patch('src.installation_animator.time.monotonic', return_value=100.0):
+            for _ in range(50):
+                animator.add_bytes(1)
+
+        self.assertEqual(stream.getvalue().count('"bytes"'), 1)
+
+    def test_quiet_mode_prints_only_warnings(self):
+        stream = io.StringIO()
+        animator = InstallationAnimator('quiet', stream=stream)
+
+        animator.start_phase('link', total=1)
+        animator.advance('link', 'Module-A', '1.0.0')
+        animator.log('resolved')
+        animator.show_final_message(1, 0.5)
+        animator.show_cache_stats({'hits': 1, 'revalidated': 0, 'misses': 0})
+
+        self.assertEqual(stream.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
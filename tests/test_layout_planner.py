@@ -0,0 +1,60 @@
+import os
+import unittest
+from collections import OrderedDict
+from src.layout_planner import plan_layout
+
+
+class TestLayoutPlanner(unittest.TestCase):
+    def plan(self, resolved_dependencies, top_level_packages):
+        return plan_layout(resolved_dependencies, top_level_packages, 'node_modules')
+
+    def test_shared_dependency_is_installed_once(self):
+        x, y, shared = ('x', '1.0.0'), ('y', '1.0.0'), ('shared', '1.0.0')
+        resolved = OrderedDict([(x, set()), (y, set()), (shared, {x, y})])
+
+        plan = self.plan(resolved, {'x': '1.0.0', 'y': '1.0.0', 'shared': '1.0.0'})
+
+        self.assertEqual(plan, [('x', '1.0.0', 'node_modules'), ('y', '1.0.0', 'node_modules'),
+                                ('shared', '1.0.0', 'node_modules')])
+
+    def test_only_conflicting_versions_are_nested(self):
+        a, c, d, e = ('Module-A', '2.0.0'), ('Module-C', '1.3.0'), ('Module-D', '1.2.0'), ('Module-E', '2.1.0')
+        b1, b15, b2 = ('Module-B', '1.0.0'), ('Module-B', '1.5.0'), ('Module-B', '2.0.0')
+        resolved = OrderedDict([(a, set()), (b15, {a, d}), (c, set()), (b2, {c}), (d, set()), (e, set()),
+                                (b1, {e})])
+        top_level = OrderedDict([('Module-A', '2.0.0'), ('Module-B', '1.5.0'), ('Module-C', '1.3.0'),
+                                 ('Module-D', '1.2.0'), ('Module-E', '2.1.0')])
+
+        plan = self.plan(resolved, top_level)
+
+        self.assertEqual(len(plan), 7)
+        self.assertIn(('Module-B', '1.5.0', 'node_modules'), plan)
+        self.assertIn(('Module-B', '2.0.0', os.path.join('node_modules', 'Module-C', 'node_modules')), plan)
+        self.assertIn(('Module-B', '1.0.0', os.path.join('node_modules', 'Module-E', 'node_modules')), plan)
+
+    def test_transitive_dependency_hoists_past_conflict_free_levels(self):
+        a, b, c1, c2 = ('a', '1.0.0'), ('b', '1.0.0'), ('c', '1.0.0'), ('c', '2.0.0')
+        d = ('d', '1.0.0')
+        # a -> b -> c@2 -> d, while c@1 sits at the top level
+        resolved = OrderedDict([(a, set()), (c1, set()), (b, {a}), (c2, {b}), (d, {c2})])
+
+        plan = self.plan(resolved, {'a': '1.0.0', 'c': '1.0.0', 'b': '1.0.0', 'd': '1.0.0'})
+
+        self.assertIn(('b', '1.0.0', 'node_modules'), plan)
+        self.assertIn(('c', '2.0.0', os.path.join('node_modules', 'b', 'node_modules')), plan)
+        self.assertIn(('d', '1.0.0', 'node_modules'), plan)
+
+    def test_hoisting_never_shadows_an_earlier_resolution(self):
+        a, b, x1, x2 = ('a', '1.0.0'), ('b', '1.0.0'), ('x', '1.0.0'), ('x', '2.0.0')
+        # b resolves x@1 from the top; a nested x@2 must not end up above b
+        resolved = OrderedDict([(a, set()), (x1, {b}), (b, {a}), (x2, {a})])
+
+        plan = self.plan(resolved, {'a': '1.0.0', 'x': '1.0.0', 'b': '1.0.0'})
+
+        self.assertIn(('x', '1.0.0', 'node_modules'), plan)
+        self.assertIn(('x', '2.0.0', os.path.join('node_modules', 'a', 'node_modules')), plan)
+        self.assertIn(('b', '1.0.0', 'node_modules'), plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from collections import OrderedDict
+from src.lock_file_manager import LockFileError, LockFileManager
+
+
+class TestLockFileManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.lock_file_manager = LockFileManager(self.test_dir)
+        self.node_modules_path = os.path.join(self.test_dir, 'node_modules')
+        self.package_json = {'name': 'app', 'version': '1.0.0', 'dependencies': {'Module-A': '^1.0.0'}}
+
+        a, b1, b2 = ('Module-A', '1.1.0'), ('Module-B', '1.0.0'), ('Module-B', '2.0.0')
+        self.resolved = OrderedDict([(a, set()), (b2, set()), (b1, {a})])
+        self.dists = {key: {'tarball': f'https://registry.example/{key[0]}-{key[1]}.tgz',
+                            'integrity': f'sha512-{key[0]}{key[1]}'} for key in self.resolved}
+        self.targets = [
+            ('Module-A', '1.1.0', self.node_modules_path),
+            ('Module-B', '2.0.0', self.node_modules_path),
+            ('Module-B', '1.0.0', os.path.join(self.node_modules_path, 'Module-A', 'node_modules')),
+        ]
+        self.top_level = {'Module-A': '1.1.0', 'Module-B': '2.0.0'}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_lock(self):
+        self.lock_file_manager.write_lock_file(self.resolved, self.top_level, self.dists,
+                                               install_targets=self.targets, root_package=self.package_json)
+
+    def test_lock_file_records_full_graph(self):
+        self.write_lock()
+        with open(self.lock_file_manager.lock_file_path) as f:
+            packages = json.load(f)['packages']
+
+        self.assertEqual(packages['']['dependencies'], {'Module-A': '^1.0.0'})
+        nested = packages['node_modules/Module-A/node_modules/Module-B']
+        self.assertEqual(nested['version'], '1.0.0')
+        self.assertEqual(nested['resolved'], 'https://registry.example/Module-B-1.0.0.tgz')
+        self.assertEqual(nested['integrity'], 'sha512-Module-B1.0.0')
+        self.assertEqual(nested['requiredBy'], ['Module-A@1.1.0'])
+        self.assertEqual(packages['node_modules/Module-A']['dependencies'], {'Module-B': '1.0.0'})
+
+    def test_frozen_graph_round_trips(self):
+        self.write_lock()
+        graph = self.lock_file_manager.get_frozen_graph(self.package_json)
+
+        self.assertEqual(graph['resolved_dependencies'], dict(self.resolved))
+        self.assertEqual(graph['top_level_packages'], self.top_level)
+        self.assertEqual(graph['package_dists'], self.dists)
+        self.assertEqual(graph['install_targets'], self.targets)
+
+    def test_frozen_graph_rejects_drifted_package_json(self):
+        self.write_lock()
+        self.package_json['dependencies']['Module-C'] = '^1.0.0'
+
+        with self.assertRaises(LockFileError):
+            self.lock_file_manager.get_frozen_graph(self.package_json)
+
+    def test_frozen_graph_rejects_old_lock_format(self):
+        with open(self.lock_file_manager.lock_file_path, 'w') as f:
+            json.dump({'dependencies': {'Module-A': {'version': '1.1.0', 'dependencies': {}}}}, f)
+
+        with self.assertRaises(LockFileError):
+            self.lock_file_manager.get_frozen_graph(self.package_json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch
+
+from benchmarks.synthetic_registry import FixtureRegistry, InProcessSession
+from src.utils.package_metadata import PackageMetadata
+import src.utils.npm_api as npm_api
+
+PACKUMENT = {
+    'name': 'left-pad',
+    'dist-tags': {'latest': '1.3.0', 'next': '2.0.0-beta.1'},
+    'versions': {
+        '1.0.0': {'version': '1.0.0', 'dist': {'tarball': 'https://r.example/left-pad-1.0.0.tgz',
+                                               'shasum': 'da39a3ee5e6b4b0d3255bfef95601890afd80709'}},
+        '1.3.0': {'version': '1.3.0', 'dependencies': {'repeat': '^2.0.0'},
+                  'dist': {'tarball': 'https://r.example/left-pad-1.3.0.tgz', 'integrity': 'sha512-abc'}},
+        '2.0.0-beta.1': {'version': '2.0.0-beta.1', 'dist': {}},
+    },
+}
+
+
+class TestPackageMetadata(unittest.TestCase):
+    def setUp(self):
+        self.metadata = PackageMetadata('left-pad', PACKUMENT)
+
+    def test_resolves_ranges_and_dist_tags(self):
+        self.assertEqual(self.metadata.resolve('^1.0.0'), '1.3.0')
+        self.assertEqual(self.metadata.resolve('latest'), '1.3.0')
+        self.assertEqual(self.metadata.resolve('next'), '2.0.0-beta.1')
+        self.assertEqual(self.metadata.versions, ['1.0.0', '1.3.0', '2.0.0-beta.1'])
+        with self.assertRaises(ValueError):
+            self.metadata.resolve('^3.0.0')
+
+    def test_answers_dependencies_and_dist_per_version(self):
+        self.assertEqual(self.metadata.dependencies('1.3.0'), {'repeat': '^2.0.0'})
+        self.assertEqual(self.metadata.dependencies('1.0.0'), {})
+        self.assertEqual(self.metadata.tarball_url('latest'), 'https://r.example/left-pad-1.3.0.tgz')
+        self.assertEqual(self.metadata.integrity('1.3.0'), 'sha512-abc')
+        self.assertEqual(self.metadata.integrity('1.0.0'), 'sha1-2jmj7l5rSw0yVb/vlWAYkK/YBwk=')
+        self.assertIsNone(self.metadata.version_info('9.9.9'))
+        self.assertEqual(self.metadata.dist('9.9.9'), {})
+
+
+class TestPackumentBackedInfo(unittest.TestCase):
+    def setUp(self):
+        self.registry = FixtureRegistry({
+            'Module-A': {'versions': {'1.0.0': {'dependencies': {'Module-B': '^1.0.0'}}}},
+            'Module-B': {'versions': {'1.0.0': {}, '1.1.0': {}}},
+        })
+        self.session = InProcessSession(self.registry)
+        patcher = patch.multiple(npm_api, get_session=lambda: self.session, _packument_cache=npm_api.PackumentCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_versions_are_answered_from_one_packument(self):
+        version = npm_api.get_latest_satisfying_version('Module-A', '^1.0.0')
+        info = npm_api.fetch_package_info('Module-A', version)
+        metadata = npm_api.get_package_metadata('Module-A')
+
+        self.assertEqual(info['dependencies'], {'Module-B': '^1.0.0'})
+        self.assertIs(metadata, npm_api.get_package_metadata('Module-A'))
+        self.assertEqual(self.session.request_counts(), {'packument': 1, 'version': 0, 'tarball': 0, 'other': 0,
+                                                         'total': 1})
+
+    def test_versions_missing_from_the_packument_are_requested(self):
+        npm_api.fetch_packument('Module-B')
+        # A newer version than the packument in hand knows about
+        del npm_api.fetch_packument('Module-B')['versions']['1.1.0']
+
+        info = npm_api.fetch_package_info('Module-B', '1.1.0')
+
+        self.assertEqual(info['version'], '1.1.0')
+        self.assertEqual(self.session.request_counts()['version'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.cache_manager import CacheManager
+from src.package_validator import PackageValidator
+
+
+class TestPackageValidator(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.node_modules_path = os.path.join(self.test_dir, 'node_modules')
+        self.cache_manager = CacheManager(os.path.join(self.test_dir, 'cache'), link_method='copy')
+        self.package_path = os.path.join(self.node_modules_path, 'Module-A')
+        files = {
+            'package.json': json.dumps({'name': 'Module-A', 'version': '1.0.0'}),
+            'README.md': 'readme',
+            'LICENSE': 'MIT',
+            'lib/index.js': 'module.exports = 1',
+        }
+        for relative_path, content in files.items():
+            path = os.path.join(self.package_path, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+        self.cache_manager.cache_package('Module-A', '1.0.0', self.package_path, integrity='sha512-abc')
+        self.expected = self.cache_manager.get_package_entry('Module-A', '1.0.0')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def verify(self, validator=None, integrity='sha512-abc'):
+        validator = validator or PackageValidator(self.node_modules_path, jobs=4)
+        return validator.verify_package_installation('Module-A', '1.0.0', expected=self.expected,
+                                                     integrity=integrity)
+
+    def test_unmodified_package_verifies(self):
+        self.assertTrue(self.verify())
+
+    def test_modified_file_is_detected(self):
+        with open(os.path.join(self.package_path, 'lib', 'index.js'), 'a') as f:
+            f.write('// tampered')
+        self.assertFalse(self.verify())
+
+    def test_missing_file_is_detected(self):
+        os.remove(os.path.join(self.package_path, 'lib', 'index.js'))
+        self.assertFalse(self.verify())
+
+    def test_integrity_mismatch_is_detected(self):
+        self.assertFalse(self.verify(integrity='sha512-other'))
+
+    def test_unchanged_files_are_not_rehashed(self):
+        validator = PackageValidator(self.node_modules_path, jobs=4)
+        self.assertTrue(self.verify(validator))
+        validator.save_stamps()
+
+        validator = PackageValidator(self.node_modules_path, jobs=4)
+        self.assertTrue(self.verify(validator))
+        self.assertEqual(validator.stamps.misses, 0)
+        self.assertEqual(validator.stamps.hits, len(self.expected['files']))
+
+    def test_verify_tree_reports_each_failing_package(self):
+        nested_path = os.path.join(self.package_path, 'node_modules')
+        module_b = os.path.join(nested_path, 'Module-B')
+        os.makedirs(module_b)
+        with open(os.path.join(module_b, 'package.json'), 'w') as f:
+            json.dump({'name': 'Module-B', 'version': '2.0.0'}, f)
+        targets = [('Module-A', '1.0.0', self.node_modules_path), ('Module-B', '1.0.0', nested_path)]
+
+        report = PackageValidator(self.node_modules_path, jobs=4).verify_tree(
+            targets, {('Module-A', '1.0.0'): self.expected}, {('Module-A', '1.0.0'): 'sha512-abc'})
+
+        self.assertEqual(report['packages'], 2)
+        self.assertEqual(report['verified'], 1)
+        self.assertEqual(report['unchecked_contents'], 1)
+        self.assertEqual(report['files_hashed'], len(self.expected['files']))
+        [failure] = report['failures']
+        self.assertEqual((failure['package'], failure['path']), ('Module-B', module_b))
+        self.assertIn('Version mismatch. Expected 1.0.0, found 2.0.0', failure['errors'])
+
+
+if __name__ == '__main__':
+    unittest.main()
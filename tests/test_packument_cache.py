@@ -0,0 +1,83 @@
+import copy
+import json
+import os
+import unittest
+
+import src.utils.npm_api as npm_api
+from tests.registry_fixture import RegistryTestCase
+
+
+class TestPackumentRevalidation(RegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = self.serve()
+        self.metadata_dir = os.path.join(self.tmp_dir, 'metadata')
+        self.addCleanup(npm_api.configure_packument_cache, None)
+        self.restart()
+
+    def restart(self):
+        """Start over with only the persisted packuments, as the next install process would."""
+        npm_api.configure_packument_cache(self.metadata_dir)
+
+    def entry_path(self, package_name):
+        return os.path.join(self.metadata_dir, package_name + '.json')
+
+    def test_unchanged_packuments_are_revalidated(self):
+        first = npm_api.fetch_packument('Module-C')
+        self.assertIs(npm_api.fetch_packument('Module-C'), first)
+        bytes_sent = self.server.stats.snapshot()['bytes_sent']
+        self.restart()
+
+        second = npm_api.fetch_packument('Module-C')
+
+        # The registry answers 304 without a body and the persisted document is reused
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.stats.snapshot()['statuses'], {200: 1, 304: 1})
+        self.assertEqual(self.server.stats.snapshot()['bytes_sent'], bytes_sent)
+        self.assertEqual(npm_api._packument_cache.stats(), {'hits': 0, 'revalidated': 1, 'misses': 0})
+
+    def test_changed_packuments_are_downloaded_again(self):
+        npm_api.fetch_packument('Module-C')
+        etag = npm_api._packument_cache.load('Module-C')['etag']
+        packument = self.registry.packuments['Module-C']
+        packument['versions']['1.4.0'] = copy.deepcopy(packument['versions']['1.3.0'])
+        packument['dist-tags']['latest'] = '1.4.0'
+        self.restart()
+
+        refreshed = npm_api.fetch_packument('Module-C')
+
+        # The stored ETag no longer matches, so the new document replaces the persisted one
+        self.assertIn('1.4.0', refreshed['versions'])
+        self.assertEqual(self.server.stats.snapshot()['statuses'], {200: 2})
+        entry = npm_api._packument_cache.load('Module-C')
+        self.assertNotEqual(entry['etag'], etag)
+        self.assertEqual(entry['data'], refreshed)
+
+    def test_corrupt_entries_are_downloaded_again(self):
+        npm_api.fetch_packument('Module-C')
+        entry = npm_api._packument_cache.load('Module-C')
+        corruptions = ['{"etag": ', '[]', json.dumps({'etag': entry['etag'], 'abbreviated': True})]
+
+        for corruption in corruptions:
+            with self.subTest(corruption=corruption):
+                with open(self.entry_path('Module-C'), 'w') as f:
+                    f.write(corruption)
+                self.restart()
+
+                self.assertEqual(npm_api.fetch_packument('Module-C'), entry['data'])
+                self.assertEqual(npm_api._packument_cache.load('Module-C'), entry)
+
+        # Each corrupt entry was replaced by a full download rather than revalidated
+        self.assertEqual(self.server.stats.snapshot()['statuses'], {200: 1 + len(corruptions)})
+
+    def test_corrupt_entries_are_missing_offline(self):
+        with open(self.entry_path('Module-C'), 'w') as f:
+            f.write('{"etag": ')
+        npm_api._network_mode = 'offline'
+
+        with self.assertRaises(npm_api.OfflineError):
+            npm_api.fetch_packument('Module-C')
+
+
+if __name__ == '__main__':
+    unittest.main()
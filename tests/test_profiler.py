@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.commands.install import install_packages
+from src.utils.profiler import NullProfiler, Profiler, configure_profiler, get_peak_rss, get_profiler
+from tests.registry_fixture import RegistryTestCase
+
+
+class TestProfiler(unittest.TestCase):
+    def test_spans_are_summarised_by_name(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.span('download', 'network', package='Module-A@1.0.0'):
+                pass
+        with self.assertRaises(ValueError), profiler.span('validate', 'disk'):
+            raise ValueError('spans are recorded even when the block fails')
+
+        summary = profiler.summary()
+
+        self.assertEqual([(row['name'], row['count']) for row in summary], [('download', 3), ('validate', 1)])
+        self.assertGreaterEqual(summary[0]['total_seconds'], summary[0]['max_seconds'])
+
+    def test_summary_columns_fit_the_longest_name(self):
+        profiler = Profiler()
+        with profiler.span('fetch packument for a scoped package', 'network'):
+            pass
+        profiler.set_counters(packument_cache_revalidated=1234, package_cache_hits=5)
+
+        header, span_row, _, *counter_rows = profiler.format_summary().splitlines()
+
+        # Every row has the same width and the names never run into the figures
+        self.assertEqual({len(line) for line in counter_rows}, {len(header)})
+        self.assertEqual(len(span_row), len(header))
+        self.assertEqual(span_row.split()[-3], '1')
+        self.assertEqual(counter_rows[0].split(), ['packument_cache_revalidated', '1234'])
+
+    def test_chrome_trace_has_one_lane_per_thread(self):
+        profiler = Profiler()
+        # Both threads stay alive until both have recorded, so their ids cannot be reused
+        barrier = threading.Barrier(2)
+
+        def work():
+            with profiler.span('fetch packument', 'network'):
+                profiler.count('metadata_bytes', 100)
+            barrier.wait(5)
+
+        threads = [threading.Thread(target=work, name=f"worker-{i}") for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        trace = json.loads(json.dumps(profiler.chrome_trace()))
+        spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        lanes = {event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M'}
+        self.assertEqual(len(spans), 2)
+        self.assertTrue(all(event['dur'] >= 0 and event['ts'] >= 0 for event in spans))
+        self.assertEqual(lanes, {'worker-0', 'worker-1'})
+        self.assertEqual(trace['otherData']['metadata_bytes'], 200)
+        self.assertEqual(trace['otherData']['peak_rss_bytes'], get_peak_rss())
+
+    def test_profiling_is_off_by_default(self):
+        configure_profiler(Profiler())
+        configure_profiler(None)
+
+        self.assertIsInstance(get_profiler(), NullProfiler)
+        with get_profiler().span('resolve'):
+            get_profiler().count('http_requests')
+
+
+class TestInstallProfile(RegistryTestCase):
+    def test_install_writes_trace_and_summary(self):
+        server = self.serve()
+        self.write_project({'Module-A': '^1.0.0', 'Module-C': '^1.0.0'})
+        trace_path = os.path.join(self.tmp_dir, 'profile.json')
+
+        with self.install_environment(), patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            install_packages(self.package_json_path, self.node_modules_path, visualize=False, jobs=4,
+                             progress='quiet', profile=trace_path)
+
+        with open(trace_path) as f:
+            trace = json.load(f)
+        names = {event['name'] for event in trace['traceEvents'] if event['ph'] == 'X'}
+        self.assertTrue({'resolve', 'fetch packument', 'download', 'extract', 'cache store', 'validate',
+                         'write lock file'} <= names)
+        counters = trace['otherData']
+        self.assertEqual(counters['http_requests'], server.stats.snapshot()['requests']['total'])
+        self.assertEqual(counters['package_cache_misses'], 4)
+        self.assertGreater(counters['tarball_bytes'], 0)
+        self.assertIn('write lock file', stderr.getvalue())
+        self.assertIsInstance(get_profiler(), NullProfiler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+import requests
+
+from src.dependency_resolver import InstallError
+from src.utils.registry_client import (AdaptiveLimit, ClientStats, RetryPolicy, SingleFlight, get_with_retries,
+                                       parse_retry_after)
+from src.utils.registry_config import RegistryConfig
+import src.utils.npm_api as npm_api
+from tests.registry_fixture import RegistryTestCase
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code), response=self)
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        stats = ClientStats()
+        flight = SingleFlight(stats)
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'name': 'left-pad'}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(flight.do, 'left-pad', fetch) for _ in range(5)]
+            while stats.coalesced < 4:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sum(1 for _, leader in results if leader), 1)
+        self.assertTrue(all(result is results[0][0] for result, _ in results))
+
+    def test_failures_are_shared_and_not_remembered(self):
+        flight = SingleFlight()
+
+        with self.assertRaises(ValueError):
+            flight.do('key', lambda: (_ for _ in ()).throw(ValueError('boom')))
+        self.assertEqual(flight.do('key', lambda: 42), (42, True))
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+    def test_limit_grows_by_about_one_per_round(self):
+        limit = AdaptiveLimit(initial=2, max_limit=4, latency_tolerance=None)
+
+        for _ in range(5):
+            limit.release(limit.acquire())
+        self.assertEqual(limit.snapshot()['limit'], 3)
+
+        for _ in range(20):
+            limit.release(limit.acquire())
+        self.assertEqual(limit.snapshot()['limit'], 4)
+
+    def test_congestion_halves_the_limit_once_per_round(self):
+        limit = AdaptiveLimit(initial=8)
+        round_started = [limit.acquire() for _ in range(8)]
+
+        for started in round_started:
+            limit.release(started, congested=True)
+        self.assertEqual(limit.snapshot(), {'limit': 4, 'peak': 8, 'decreases': 1})
+
+        limit.release(limit.acquire(), congested=True)
+        self.assertEqual(limit.snapshot()['limit'], 2)
+
+    def test_rising_latency_counts_as_congestion(self):
+        limit = AdaptiveLimit(initial=8, latency_tolerance=2.0)
+        for _ in range(10):
+            limit.acquire()
+            limit.release(time.monotonic() - 0.01)
+        before = limit.snapshot()['limit']
+
+        limit.acquire()
+        limit.release(time.monotonic() - 1.0)
+
+        self.assertEqual(limit.snapshot()['limit'], before // 2)
+
+    def test_requests_wait_for_a_free_slot(self):
+        limit = AdaptiveLimit(initial=1, max_limit=1)
+        started = limit.acquire()
+        acquired = threading.Event()
+        waiter = threading.Thread(target=lambda: (limit.acquire(), acquired.set()))
+        waiter.start()
+
+        self.assertFalse(acquired.wait(0.05))
+        limit.release(started)
+        self.assertTrue(acquired.wait(5))
+        waiter.join()
+
+
+class TestGetWithRetries(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.policy = RetryPolicy(attempts=4, base_delay=0.1, max_delay=1.0)
+        self.stats = ClientStats()
+
+    def get(self, session, **kwargs):
+        return get_with_retries(session, 'https://registry.example/pkg', self.policy, stats=self.stats,
+                                sleep=self.sleeps.append, **kwargs)
+
+    def test_retries_server_errors_and_honours_retry_after(self):
+        throttled = FakeResponse(429, {'Retry-After': '2'})
+        session = FakeSession([FakeResponse(503), throttled, FakeResponse(200)])
+
+        response = self.get(session)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.calls, 3)
+        self.assertTrue(throttled.closed)
+        self.assertLessEqual(self.sleeps[0], 0.1)
+        self.assertGreaterEqual(self.sleeps[1], 2)
+        self.assertEqual(self.stats.snapshot(), {'requests': 3, 'retries': 2, 'coalesced': 0})
+
+    def test_attempts_hold_and_report_to_the_limiter(self):
+        limiter = AdaptiveLimit(initial=4)
+        session = FakeSession([FakeResponse(503), FakeResponse(200)])
+
+        self.get(session, limiter=limiter)
+
+        self.assertEqual(limiter.snapshot(), {'limit': 2, 'peak': 1, 'decreases': 1})
+
+    def test_timeouts_count_as_congestion(self):
+        limiter = AdaptiveLimit(initial=4, latency_tolerance=None)
+        session = FakeSession([requests.ReadTimeout('slow'), FakeResponse(200)])
+
+        self.assertEqual(self.get(session, limiter=limiter).status_code, 200)
+        self.assertEqual(limiter.snapshot(), {'limit': 2, 'peak': 1, 'decreases': 1})
+
+    def test_connection_errors_are_retried(self):
+        session = FakeSession([requests.ConnectionError('reset'), FakeResponse(200)])
+
+        self.assertEqual(self.get(session).status_code, 200)
+
+    def test_gives_up_after_the_last_attempt(self):
+        session = FakeSession([FakeResponse(500) for _ in range(4)])
+        self.assertEqual(self.get(session).status_code, 500)
+
+        session = FakeSession([requests.Timeout('slow') for _ in range(4)])
+        with self.assertRaises(requests.Timeout):
+            self.get(session)
+        self.assertEqual(session.calls, 4)
+
+    def test_client_errors_are_not_retried(self):
+        session = FakeSession([FakeResponse(404)])
+
+        self.assertEqual(self.get(session).status_code, 404)
+        self.assertEqual(self.sleeps, [])
+
+    def test_broken_stream_is_requested_again(self):
+        session = FakeSession([FakeResponse(200), FakeResponse(200)])
+        attempts = []
+
+        def consume(response):
+            attempts.append(response)
+            if len(attempts) == 1:
+                raise requests.exceptions.ChunkedEncodingError('connection dropped')
+            return 'done'
+
+        self.assertEqual(self.get(session, consume=consume), 'done')
+        self.assertTrue(attempts[0].closed)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('3'), 3.0)
+        self.assertAlmostEqual(parse_retry_after(formatdate(1000030, usegmt=True), now=1000000), 30, delta=1)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestRegistryFailures(RegistryTestCase):
+    def test_concurrent_packument_requests_are_coalesced(self):
+        server = self.serve(latency=0.05)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            packuments = list(executor.map(lambda _: npm_api.fetch_packument('Module-A'), range(8)))
+
+        self.assertEqual(server.stats.snapshot()['requests']['packument'], 1)
+        self.assertTrue(all(packument is packuments[0] for packument in packuments))
+
+    def test_transient_errors_are_retried_during_install(self):
+        server = self.serve(error_rate=0.3, throttle_rate=0.1, seed=3)
+
+        self.install({'Module-A': '^1.0.0', 'Module-C': '^1.0.0'})
+
+        statuses = server.stats.snapshot()['statuses']
+        self.assertTrue(statuses.get(500) or statuses.get(429))
+        self.assertTrue(os.path.exists(os.path.join(self.project_dir, 'package-lock.json')))
+
+    def test_requests_to_a_stalled_registry_time_out(self):
+        self.serve(latency=2.0)
+        requests_before = npm_api.get_client_stats()['requests']
+        started = time.monotonic()
+
+        with self.assertRaises(InstallError) as context:
+            self.install({'Module-A': '^1.0.0'}, jobs=1, fetch_timeout=0.1)
+
+        # Every attempt gives up after the read timeout instead of waiting for the answer
+        self.assertLess(time.monotonic() - started, 2.0)
+        self.assertIn('timed out', str(context.exception))
+        self.assertEqual(npm_api.get_client_stats()['requests'] - requests_before, self.retry_policy.attempts)
+
+    def test_tarball_timeouts_shrink_the_tarball_limit(self):
+        server = self.serve(latency=1.0)
+        npm_api.configure_registry(RegistryConfig(server.url, fetch_timeout=0.05))
+        npm_api.configure_concurrency(tarball=AdaptiveLimit(initial=8, latency_tolerance=None))
+        npm_api.configure_retries(RetryPolicy(attempts=2, base_delay=0.001))
+        tarball_url = self.registry.packuments['Module-B']['versions']['1.0.0']['dist']['tarball']
+
+        with self.assertRaises(requests.Timeout):
+            npm_api.download_package('Module-B', '1.0.0', os.path.join(self.tmp_dir, 'Module-B'), tarball_url)
+
+        # The tarball limit reacts to errors only, and each timed-out attempt is one
+        self.assertEqual(npm_api.get_concurrency_stats()['tarball'], {'limit': 2, 'peak': 1, 'decreases': 2})
+
+    def test_unresolvable_packages_fail_the_install(self):
+        self.serve()
+
+        with self.assertRaises(InstallError) as context:
+            self.install({'Module-A': '^1.0.0', 'Module-Z': '^1.0.0'})
+
+        self.assertIn('Module-Z', str(context.exception))
+        self.assertFalse(os.path.exists(os.path.join(self.project_dir, 'package-lock.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
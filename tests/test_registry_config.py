@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.registry_server import LocalRegistryServer
+from benchmarks.synthetic_registry import FixtureRegistry
+from src.utils.registry_config import DEFAULT_FETCH_TIMEOUT, RegistryConfig, load_registry_config, parse_npmrc
+import src.utils.npm_api as npm_api
+from tests.registry_fixture import RegistryTestCase
+
+
+class TestRegistryConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.user_npmrc = os.path.join(self.tmp_dir, 'user.npmrc')
+        self.project_dir = os.path.join(self.tmp_dir, 'project')
+        os.makedirs(self.project_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_parse_npmrc(self):
+        settings = parse_npmrc("; comment\n# another\nregistry = https://mirror.example/\n"
+                               "@corp:registry=\"https://npm.corp.example/${TEAM}\"\nnot a setting\n",
+                               env={'TEAM': 'web'})
+
+        self.assertEqual(settings, {'registry': 'https://mirror.example/',
+                                    '@corp:registry': 'https://npm.corp.example/web'})
+
+    def test_later_sources_override_earlier_ones(self):
+        self.write(self.user_npmrc, "registry=https://user.example\n@corp:registry=https://corp-user.example\n")
+        self.write(os.path.join(self.project_dir, '.npmrc'), "registry=https://project.example/\n")
+        env = {'NPM_CONFIG_USERCONFIG': self.user_npmrc}
+
+        config = load_registry_config(self.project_dir, env=env)
+        self.assertEqual(config.registry, 'https://project.example')
+        self.assertEqual(config.scopes, {'@corp': 'https://corp-user.example'})
+
+        env['npm_config_@corp:registry'] = 'https://corp-env.example'
+        env['npm_config_registry'] = 'https://env.example'
+        config = load_registry_config(self.project_dir, env=env)
+        self.assertEqual((config.registry, config.scopes['@corp']), ('https://env.example', 'https://corp-env.example'))
+
+        env['NPM_REGISTRY_URL'] = 'http://127.0.0.1:4873/'
+        self.assertEqual(load_registry_config(self.project_dir, env=env).registry, 'http://127.0.0.1:4873')
+
+    def test_fetch_timeout_is_read_in_milliseconds(self):
+        self.write(self.user_npmrc, "fetch-timeout=30000\n")
+        env = {'NPM_CONFIG_USERCONFIG': self.user_npmrc}
+        self.assertEqual(load_registry_config(self.project_dir, env=env).fetch_timeout, 30.0)
+
+        env['npm_config_fetch_timeout'] = '1500'
+        self.assertEqual(load_registry_config(self.project_dir, env=env).fetch_timeout, 1.5)
+
+        env['npm_config_fetch_timeout'] = 'soon'
+        self.assertEqual(load_registry_config(self.project_dir, env=env).fetch_timeout, 30.0)
+
+    def test_defaults_to_the_public_registry(self):
+        config = load_registry_config(self.project_dir, env={'NPM_CONFIG_USERCONFIG': self.user_npmrc})
+
+        self.assertEqual(config.registry_for('lodash'), 'https://registry.npmjs.org')
+        self.assertEqual(config.fetch_timeout, DEFAULT_FETCH_TIMEOUT)
+
+    def test_scoped_packages_use_their_scope_registry(self):
+        config = RegistryConfig('https://public.example', {'@corp': 'https://corp.example/'})
+
+        self.assertEqual(config.registry_for('@corp/tools'), 'https://corp.example')
+        self.assertEqual(config.registry_for('@other/tools'), 'https://public.example')
+        self.assertEqual(config.registry_for('tools'), 'https://public.example')
+
+
+class TestNetworkModes(RegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.serve()
+
+    def use(self, network_mode, registry_url=None, scopes=None):
+        npm_api.configure_packument_cache(os.path.join(self.tmp_dir, 'metadata'))
+        npm_api.configure_registry(RegistryConfig(registry_url or self.server.url, scopes), network_mode)
+
+    def requests_made(self):
+        return self.server.stats.snapshot()['requests']['total']
+
+    def test_offline_answers_from_cached_metadata_only(self):
+        self.use('online')
+        npm_api.fetch_packument('Module-A')
+        before = self.requests_made()
+
+        self.use('offline')
+        info = npm_api.fetch_package_info('Module-A', '1.1.0')
+        version = npm_api.get_latest_satisfying_version('Module-A', '^1.0.0')
+
+        self.assertEqual(info['dependencies'], {'Module-B': '^1.0.0'})
+        self.assertEqual(version, '1.1.0')
+        self.assertEqual(self.requests_made(), before)
+        with self.assertRaises(npm_api.OfflineError):
+            npm_api.fetch_packument('Module-B')
+        with self.assertRaises(npm_api.OfflineError):
+            npm_api.download_package('Module-A', '1.1.0', os.path.join(self.tmp_dir, 'Module-A'))
+
+    def test_prefer_offline_skips_revalidation_but_fetches_misses(self):
+        self.use('online')
+        npm_api.fetch_packument('Module-A')
+
+        self.use('prefer-offline')
+        npm_api.fetch_packument('Module-A')
+        npm_api.fetch_packument('Module-B')
+
+        self.assertEqual(self.server.stats.snapshot()['statuses'], {200: 2})
+
+    def test_scoped_packages_are_fetched_from_their_registry(self):
+        scoped = FixtureRegistry({'@corp/tools': {'versions': {'1.0.0': {}}}})
+        with LocalRegistryServer(scoped) as corp_server:
+            # The default registry is unreachable; only the scope registry may be asked
+            self.use('online', registry_url='http://127.0.0.1:9', scopes={'@corp': corp_server.url})
+            info = npm_api.fetch_package_info('@corp/tools', '1.0.0')
+
+        self.assertEqual(info['name'], '@corp/tools')
+
+    def test_offline_reinstall_from_cache(self):
+        self.install({'Module-A': '^1.0.0', 'Module-C': '^1.0.0'}, jobs=1)
+        shutil.rmtree(self.node_modules_path)
+        os.remove(os.path.join(self.project_dir, 'package-lock.json'))
+        before = self.requests_made()
+
+        resolver = self.install(jobs=1, network_mode='offline')
+
+        self.assertEqual(self.requests_made(), before)
+        self.assertEqual(len(resolver.installation_order), 4)
+        self.assertTrue(os.path.isdir(os.path.join(self.node_modules_path, 'Module-B')))
+
+        with self.assertRaises(npm_api.OfflineError):
+            self.install({'Module-E': '^2.0.0'}, jobs=1, network_mode='offline')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import time
+import unittest
+
+import requests
+
+from benchmarks.registry_server import LocalRegistryServer
+from benchmarks.run import run_install
+from benchmarks.synthetic_registry import FixtureRegistry, SyntheticRegistry
+from src.utils.registry_client import RetryPolicy
+import src.utils.npm_api as npm_api
+from tests.registry_fixture import FIXTURES_DIR, RegistryTestCase
+
+
+class TestLocalRegistryServer(RegistryTestCase):
+    def test_npm_api_resolves_and_downloads_over_http(self):
+        server = self.serve()
+
+        version = npm_api.get_latest_satisfying_version('Module-B', '^1.0.0')
+        info = npm_api.fetch_package_info('Module-A', '2.0.0')
+        target = os.path.join(self.tmp_dir, 'Module-A')
+        npm_api.download_package('Module-A', '2.0.0', target, info['dist']['tarball'], info['dist']['integrity'])
+
+        self.assertEqual(version, '1.5.0')
+        self.assertEqual(info['dependencies'], {'Module-B': '^1.0.0'})
+        self.assertTrue(info['dist']['tarball'].startswith(server.url))
+        self.assertTrue(os.path.isfile(os.path.join(target, 'package.json')))
+        stats = server.stats.snapshot()
+        self.assertEqual(stats['requests']['total'], 3)
+        # Keep-alive: the three requests share one pooled connection
+        self.assertEqual(stats['connections'], 1)
+
+    def test_install_reuses_connections_and_downloads_in_parallel(self):
+        self.registry = SyntheticRegistry(nodes=20, fanout=2)
+        server = self.serve(latency=0.02)
+
+        self.install(self.registry.root_dependencies, jobs=1)
+        sequential = server.stats.snapshot()
+        shutil.rmtree(os.path.join(self.tmp_dir, 'cache'))
+        shutil.rmtree(self.node_modules_path)
+        os.remove(os.path.join(self.project_dir, 'package-lock.json'))
+        server.stats.reset()
+        self.install(jobs=8)
+        parallel = server.stats.snapshot()
+
+        # Pooled keep-alive connections carry many requests each
+        self.assertLess(sequential['connections'], sequential['requests']['total'])
+        self.assertLess(parallel['connections'], parallel['requests']['total'])
+        self.assertEqual(sequential['max_concurrent_requests'], 1)
+        self.assertGreater(parallel['max_concurrent_requests'], 1)
+        self.assertEqual(parallel['requests']['tarball'], 20)
+
+    def test_packuments_revalidate_with_etag(self):
+        server = self.serve()
+        npm_api.configure_packument_cache(os.path.join(self.tmp_dir, 'metadata'))
+        self.addCleanup(npm_api.configure_packument_cache, None)
+        npm_api.fetch_packument('Module-C')
+
+        npm_api.configure_packument_cache(os.path.join(self.tmp_dir, 'metadata'))
+        npm_api.fetch_packument('Module-C')
+
+        self.assertEqual(server.stats.snapshot()['statuses'], {200: 1, 304: 1})
+
+    def test_resolution_uses_abbreviated_packuments(self):
+        self.registry = SyntheticRegistry(nodes=3, fanout=1)
+        server = self.serve()
+
+        abbreviated = npm_api.fetch_packument('pkg-00000')
+        abbreviated_bytes = server.stats.snapshot()['bytes_sent']
+        full = npm_api.get_session().get(f"{server.url}/pkg-00000", headers={'Accept': 'application/json'}).json()
+
+        self.assertNotIn('readme', abbreviated)
+        self.assertIn('readme', full)
+        self.assertEqual(abbreviated['versions']['2.1.0']['dependencies'], full['versions']['2.1.0']['dependencies'])
+        self.assertLess(abbreviated_bytes * 3, server.stats.snapshot()['bytes_sent'] - abbreviated_bytes)
+
+    def test_entries_from_before_abbreviated_requests_are_replaced(self):
+        self.registry = SyntheticRegistry(nodes=1)
+        server = self.serve()
+        metadata_dir = os.path.join(self.tmp_dir, 'metadata')
+        response = npm_api.get_session().get(f"{server.url}/pkg-00000", headers={'Accept': 'application/json'})
+        # Written by a version that fetched full documents and did not record the representation
+        os.makedirs(metadata_dir)
+        with open(os.path.join(metadata_dir, 'pkg-00000.json'), 'w') as f:
+            json.dump({'etag': response.headers['ETag'], 'last_modified': None, 'data': response.json()}, f)
+        self.addCleanup(npm_api.configure_packument_cache, None)
+
+        npm_api.configure_packument_cache(metadata_dir)
+        replaced = npm_api.fetch_packument('pkg-00000')
+        npm_api.configure_packument_cache(metadata_dir)
+        npm_api.fetch_packument('pkg-00000')
+
+        # The full document's ETag is not sent for the abbreviated one, which then revalidates
+        self.assertNotIn('readme', replaced)
+        self.assertEqual(server.stats.snapshot()['statuses'], {200: 2, 304: 1})
+        self.assertTrue(npm_api._packument_cache.load('pkg-00000')['abbreviated'])
+
+    def test_throttled_requests_get_429_with_retry_after(self):
+        self.serve(throttle_rate=1.0, retry_after=3)
+        npm_api.configure_retries(RetryPolicy(attempts=1))
+
+        with self.assertRaises(requests.HTTPError) as context:
+            npm_api.fetch_packument('Module-A')
+
+        self.assertEqual(context.exception.response.status_code, 429)
+        self.assertEqual(context.exception.response.headers['Retry-After'], '3')
+
+    def test_error_rate_fails_a_share_of_requests(self):
+        server = self.serve(error_rate=0.5, seed=1)
+        session = npm_api.get_session()
+
+        statuses = [session.get(f"{server.url}/Module-A").status_code for _ in range(40)]
+
+        self.assertIn(500, statuses)
+        self.assertIn(200, statuses)
+
+    def test_latency_and_bandwidth_slow_responses(self):
+        self.registry = FixtureRegistry.from_directory(FIXTURES_DIR, payload_size=64 * 1024)
+        server = self.serve(latency=0.05, bandwidth=512 * 1024)
+        tarball_url = self.registry.packuments['Module-A']['versions']['1.0.0']['dist']['tarball']
+
+        start = time.perf_counter()
+        size = len(npm_api.get_session().get(tarball_url).content)
+        elapsed = time.perf_counter() - start
+
+        # 50 ms of latency plus the body at 512 KB/s
+        self.assertGreaterEqual(elapsed, 0.05 + size / (512 * 1024) * 0.8)
+        self.assertEqual(server.stats.snapshot()['bytes_sent'], size)
+
+    def test_benchmark_install_over_http(self):
+        registry = SyntheticRegistry(nodes=20, fanout=2)
+        with LocalRegistryServer(registry) as server:
+            result = run_install(registry, jobs=4, server=server)
+
+        self.assertEqual(result['installed'], 20)
+        self.assertEqual(result['requests']['tarball'], 20)
+        self.assertEqual(result['statuses'], {'200': result['requests']['total']})
+        self.assertLessEqual(result['connections'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
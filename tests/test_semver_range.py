@@ -0,0 +1,54 @@
+import unittest
+from src.utils.semver_range import VersionIndex, compile_range, parse_version
+
+
+class TestSemverRange(unittest.TestCase):
+    def assertSatisfies(self, requirement, versions, expected):
+        version_range = compile_range(requirement)
+        for version in versions:
+            self.assertEqual(version_range.test(version), version in expected, f"{version} vs {requirement}")
+
+    def test_parse_version_ordering(self):
+        ordered = ['1.0.0-alpha', '1.0.0-alpha.1', '1.0.0-alpha.beta', '1.0.0-beta.2', '1.0.0-beta.11',
+                   '1.0.0-rc.1', '1.0.0', '1.0.1', '1.10.0', '2.0.0']
+        keys = [parse_version(v) for v in ordered]
+        self.assertEqual(keys, sorted(keys))
+        self.assertIsNone(parse_version('not-a-version'))
+
+    def test_caret_and_tilde(self):
+        versions = ['0.0.3', '0.0.4', '0.2.3', '0.2.9', '0.3.0', '1.2.3', '1.2.9', '1.3.0', '2.0.0']
+        self.assertSatisfies('^1.2.3', versions, {'1.2.3', '1.2.9', '1.3.0'})
+        self.assertSatisfies('^0.2.3', versions, {'0.2.3', '0.2.9'})
+        self.assertSatisfies('^0.0.3', versions, {'0.0.3'})
+        self.assertSatisfies('~1.2.3', versions, {'1.2.3', '1.2.9'})
+        self.assertSatisfies('~1', versions, {'1.2.3', '1.2.9', '1.3.0'})
+
+    def test_x_ranges_hyphens_and_alternatives(self):
+        versions = ['0.9.0', '1.0.0', '1.2.0', '1.5.7', '2.0.0', '2.3.1', '3.0.0']
+        self.assertSatisfies('1.x', versions, {'1.0.0', '1.2.0', '1.5.7'})
+        self.assertSatisfies('1.2.*', versions, {'1.2.0'})
+        self.assertSatisfies('*', versions, set(versions))
+        self.assertSatisfies('1.2 - 2', versions, {'1.2.0', '1.5.7', '2.0.0', '2.3.1'})
+        self.assertSatisfies('>=1 <2', versions, {'1.0.0', '1.2.0', '1.5.7'})
+        self.assertSatisfies('<1.0.0 || >=2.3.0', versions, {'0.9.0', '2.3.1', '3.0.0'})
+        self.assertSatisfies('1.2.0', versions, {'1.2.0'})
+
+    def test_prereleases_need_matching_tuple(self):
+        versions = ['1.2.3-alpha.3', '1.2.3-alpha.7', '1.2.3', '3.4.5-alpha.9']
+        self.assertSatisfies('>1.2.3-alpha.3', versions, {'1.2.3-alpha.7', '1.2.3'})
+        self.assertSatisfies('^1.0.0', versions, {'1.2.3'})
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            compile_range('latest')
+
+    def test_version_index_max_satisfying(self):
+        index = VersionIndex([f'{major}.{minor}.0' for major in range(30) for minor in range(40)] + ['5.0.0-rc.1'])
+        self.assertEqual(index.max_satisfying(compile_range('^5.2.0')), '5.39.0')
+        self.assertEqual(index.max_satisfying(compile_range('<5.0.0-rc.2')), '5.0.0-rc.1')
+        self.assertEqual(index.max_satisfying(compile_range('~12.3 || 4.x')), '12.3.0')
+        self.assertIsNone(index.max_satisfying(compile_range('>=31')))
+
+
+if __name__ == '__main__':
+    unittest.main()
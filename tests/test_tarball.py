@@ -0,0 +1,111 @@
+import base64
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+from src.utils.tarball import dist_integrity, extract_tarball, parse_integrity
+
+
+def make_tarball(members):
+    """
+    Pack members into a .tgz in memory.
+
+    Args:
+    members (list): (name, content) pairs for files, or (name, TarInfo type, link target) for links
+
+    Returns:
+    bytes: The gzipped tarball
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as gz, tarfile.open(fileobj=gz, mode='w') as tar:
+        for member in members:
+            info = tarfile.TarInfo(member[0])
+            if len(member) == 3:
+                info.type, info.linkname = member[1], member[2]
+                tar.addfile(info)
+            else:
+                info.size = len(member[1])
+                tar.addfile(info, io.BytesIO(member[1]))
+    return buffer.getvalue()
+
+
+def sri(algorithm, data):
+    return f"{algorithm}-{base64.b64encode(hashlib.new(algorithm, data).digest()).decode()}"
+
+
+class TestExtractTarball(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.target_dir = os.path.join(self.test_dir, 'node_modules', 'left-pad')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def extract(self, data, integrity=None):
+        return extract_tarball(io.BytesIO(data), self.target_dir, integrity=integrity, chunk_size=16)
+
+    def extracted_files(self):
+        return sorted(os.path.relpath(os.path.join(root, name), self.test_dir)
+                      for root, _, files in os.walk(self.test_dir) for name in files)
+
+    def test_extracts_below_the_top_level_folder(self):
+        data = make_tarball([('package/package.json', b'{}'), ('package/lib/index.js', b'module.exports = 1')])
+
+        integrity = self.extract(data, integrity=sri('sha512', data))
+
+        self.assertEqual(integrity, sri('sha512', data))
+        with open(os.path.join(self.target_dir, 'lib', 'index.js'), 'rb') as f:
+            self.assertEqual(f.read(), b'module.exports = 1')
+
+    def test_integrity_mismatch_is_rejected_and_cleaned_up(self):
+        data = make_tarball([('package/package.json', b'{}')])
+
+        with self.assertRaises(ValueError):
+            self.extract(data, integrity=sri('sha512', b'something else'))
+
+        # Neither the package nor its temporary directory is left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.target_dir)), [])
+
+    def test_mismatch_keeps_the_previous_install(self):
+        self.extract(make_tarball([('package/package.json', b'{"version": "1.0.0"}')]))
+
+        with self.assertRaises(ValueError):
+            self.extract(make_tarball([('package/package.json', b'{}')]), integrity=sri('sha512', b'other'))
+
+        with open(os.path.join(self.target_dir, 'package.json'), 'rb') as f:
+            self.assertEqual(f.read(), b'{"version": "1.0.0"}')
+
+    def test_legacy_shasum_is_checked_as_sha1(self):
+        data = make_tarball([('package/package.json', b'{}')])
+        integrity = dist_integrity({'shasum': hashlib.sha1(data).hexdigest()})
+
+        self.assertEqual(integrity, sri('sha1', data))
+        self.assertEqual(parse_integrity(f"{integrity} sha512-{'A' * 88}")[0], 'sha512')
+        self.assertEqual(self.extract(data, integrity=integrity), integrity)
+        with self.assertRaises(ValueError):
+            self.extract(data, integrity=dist_integrity({'shasum': hashlib.sha1(b'other').hexdigest()}))
+
+    def test_members_outside_the_package_are_skipped(self):
+        data = make_tarball([
+            ('package/package.json', b'{}'),
+            ('package/../../escaped.js', b'parent'),
+            ('/package/absolute.js', b'absolute'),
+            ('package/link', tarfile.SYMTYPE, '../../..'),
+            ('package/hardlink', tarfile.LNKTYPE, '/etc/passwd'),
+            ('package/link/through-link.js', b'link'),
+        ])
+
+        self.extract(data)
+
+        # Links are not created, so the file below one lands in a plain directory inside the package
+        self.assertEqual(self.extracted_files(), ['node_modules/left-pad/link/through-link.js',
+                                                  'node_modules/left-pad/package.json'])
+        self.assertFalse(os.path.islink(os.path.join(self.target_dir, 'link')))
+
+
+if __name__ == '__main__':
+    unittest.main()